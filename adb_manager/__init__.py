@@ -1,7 +1,40 @@
 # adb_manager/__init__.py
-from .utils import execute_command, get_connected_devices, get_device_info, capture_screenshot, capture_screenrecord, stop_screenrecord, get_device_model_serial
-from .file_manager import FileManagerPage
-from .apk_manager import APKManagerPage
-from .network_manager import NetworkManagerPage
-from .tools import ToolsPage
-from .terminal import TerminalPage
\ No newline at end of file
+from .adb_client import AdbClient, AdbError, AdbCommandError, adb
+from .devices import DeviceProperties, DeviceRegistry, DeviceSelection, device_registry, device_selection, get_device_properties, invalidate_device_properties
+from .fleet import DeviceResult, FleetResult
+from .transfer import TransferControl, TransferProgress, TransferScheduler, pull, pull_many, push_many
+from .dedup import ObjectStore, object_store
+from .listing import ListingCache, RemoteEntry, iter_directory, list_directory, listing_cache
+from .mirror import MirrorManifest, mirror
+from .packages import PackageInventory, PackageTable, package_inventory
+from .install import InstallJob, InstallProgress, collect_install_jobs
+from .extract import ExtractManifest, extract_apks
+from .ui_dispatcher import UiDispatcher, ui
+from .aio import AsyncAdbClient, EventLoopThread, async_adb, call_ui, event_loop, gather_devices, stream_process
+from .tasks import Task, TaskExecutor, tasks
+from . import services
+from .startup import StartupTimer, startup
+from .utils import get_connected_devices, get_device_info, capture_screenshot, capture_screenrecord, stop_screenrecord, get_device_model_serial
+
+# The Tk pages are imported on first use, so the CLI and the services run without Tk or Pillow
+_GUI_EXPORTS = {
+    "FileManagerPage": ".file_manager",
+    "APKManagerPage": ".apk_manager",
+    "NetworkManagerPage": ".network_manager",
+    "ToolsPage": ".tools",
+    "TerminalPage": ".terminal",
+    "DeviceSelector": ".device_selector",
+    "TaskListWindow": ".task_list",
+    "TaskStatus": ".task_list",
+    "IconCache": ".icons",
+    "icon_cache": ".icons",
+}
+
+
+def __getattr__(name):
+    if name not in _GUI_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(_GUI_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
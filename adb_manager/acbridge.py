@@ -0,0 +1,234 @@
+# acbridge.py
+"""Sync with the ACBridge companion app, which exports app labels and icons.
+
+The app writes `.acbridge` (labels), `.sizes` and `icons.zip` into
+REMOTE_DIR when its activity starts. Instead of sleeping a fixed 20 s
+per launch, the files are stat'ed with a backoff until all of them are
+newer than before the launch and have stopped growing, or, since the app
+may leave unchanged data alone, until none of them has changed for
+QUIET_PERIOD; then the ones that differ from the local copies are pulled
+at once.
+"""
+import asyncio
+import json
+import os
+import posixpath
+import shutil
+import subprocess
+import time
+from .adb_client import AdbError, adb
+from .aio import async_adb
+from .transfer import pull_many
+
+ACBRIDGE_PACKAGE = "com.cybercat.acbridge"
+ACBRIDGE_ACTIVITY = ".MainActivity"
+ACBRIDGE_DIR = "./tools/ACBridge"
+ACBRIDGE_APK = os.path.join(ACBRIDGE_DIR, "acbridge.apk")
+ACBRIDGE_SETTINGS = os.path.join(ACBRIDGE_DIR, "settings")
+ICONS_DIR = os.path.join(ACBRIDGE_DIR, "icons")
+ICONS_INDEX = os.path.join(ACBRIDGE_DIR, "icons.index.json")  # CRC and size of every extracted icon
+REMOTE_DIR = "/storage/emulated/0/.adac"
+OUTPUTS = {".acbridge": "acbridge", ".sizes": "sizes", "icons.zip": "icons.zip"}  # Remote name -> local name
+
+POLL_INTERVAL = 0.25  # First wait between stats of the output files
+POLL_MAX_INTERVAL = 2.0
+QUIET_PERIOD = 2.0  # Seconds without any change to the output files after which the export counts as done
+FIRST_LAUNCH_TIMEOUT = 10  # A fresh install may only set itself up on its first launch
+READY_TIMEOUT = 20  # After this the files already on the device are used, as the old fixed sleep did
+
+
+class AcbridgeUpdate:
+    """What one sync did."""
+
+    def __init__(self, waited, pulled, skipped, icons=None):
+        self.waited = waited  # Seconds from the launch until the data was ready
+        self.pulled = pulled  # Local paths that were transferred
+        self.skipped = skipped  # Local paths that already matched the device
+        self.icons = icons  # IconExtraction, or None when icons.zip did not change
+
+    def summary(self):
+        summary = (f"data ready after {self.waited:.1f} s, {len(self.pulled)} file(s) pulled, "
+                   f"{len(self.skipped)} unchanged")
+        return summary + (f"; {self.icons.summary()}" if self.icons else "")
+
+
+def stat_outputs(serial, client=adb):
+    """Remote name -> SyncStat (or None) of every output file, over one sync session."""
+    with client.sync(serial) as sync:
+        return {name: sync.stat(posixpath.join(REMOTE_DIR, name)) for name in OUTPUTS}
+
+
+def is_current(local_path, info):
+    """True when `local_path` has the remote file's size and mtime (pulls keep the mtime)."""
+    try:
+        local = os.stat(local_path)
+    except OSError:
+        return False
+    return local.st_size == info.size and int(local.st_mtime) == info.mtime
+
+
+async def wait_for_outputs(serial, baseline, timeout, client=adb, quiet=QUIET_PERIOD):
+    """Stat the output files with a backoff until they are all present and stable.
+
+    The files are stable once two stats in a row agree, so a file that
+    is still being written is not pulled half done. They are ready when
+    every file is newer than `baseline`, or when nothing has changed for
+    `quiet` seconds, as happens when the app has nothing new to write.
+    Returns the stats, or None if the files were not ready within
+    `timeout`.
+    """
+    deadline = time.monotonic() + timeout
+    interval = POLL_INTERVAL
+    previous = baseline
+    last_change = time.monotonic()
+    while True:
+        current = await asyncio.to_thread(stat_outputs, serial, client)
+        now = time.monotonic()
+        if current != previous:
+            last_change = now
+        present = all(info is not None for info in current.values())
+        rewritten = all(info != baseline.get(name) for name, info in current.items())
+        if present and current == previous and (rewritten or now - last_change >= quiet):
+            return current
+        if now >= deadline:
+            return None
+        previous = current
+        await asyncio.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+        interval = min(interval * 1.5, POLL_MAX_INTERVAL)
+
+
+async def _step(call, *args, **kwargs):
+    """Setup steps are best effort; one failing should not abort the update."""
+    try:
+        return await call(*args, **kwargs)
+    except subprocess.CalledProcessError as e:
+        print(f"Error: {e}")
+
+
+async def install(serial, client=async_adb, sync_client=adb):
+    """Install ACBridge with its settings file and the permissions it needs."""
+    await _step(asyncio.to_thread, sync_client.install, ACBRIDGE_APK, serial=serial)
+    await _step(client.check_call, f"mkdir -p {REMOTE_DIR}", serial=serial)
+    await client.run(f"rm -f {REMOTE_DIR}/settings", serial=serial)
+    await _step(asyncio.to_thread, sync_client.push, ACBRIDGE_SETTINGS, REMOTE_DIR, serial=serial)
+    for permission in ("android.permission.WRITE_EXTERNAL_STORAGE", "android.permission.PACKAGE_USAGE_STATS"):
+        await _step(client.check_call, f"pm grant {ACBRIDGE_PACKAGE} {permission}", serial=serial)
+
+
+async def update(serial, client=async_adb, sync_client=adb, first_launch_timeout=FIRST_LAUNCH_TIMEOUT,
+                 ready_timeout=READY_TIMEOUT):
+    """Have ACBridge export its data and pull whatever changed; returns an AcbridgeUpdate."""
+    installed = ACBRIDGE_PACKAGE in (await client.run(f"pm list packages {ACBRIDGE_PACKAGE}", serial=serial)).stdout
+    if not installed:
+        await install(serial, client, sync_client)
+    baseline = await asyncio.to_thread(stat_outputs, serial, sync_client)
+    started = time.perf_counter()
+    outputs = None
+    timeouts = [ready_timeout] if installed else [first_launch_timeout, ready_timeout]
+    for timeout in timeouts:
+        await _step(client.check_call, f"am start -n {ACBRIDGE_PACKAGE}/{ACBRIDGE_ACTIVITY}", serial=serial)
+        outputs = await wait_for_outputs(serial, baseline, timeout, sync_client)
+        if outputs is not None:
+            break
+    if outputs is None:
+        # The export did not settle in time; use what is there
+        outputs = await asyncio.to_thread(stat_outputs, serial, sync_client)
+        missing = [name for name, info in outputs.items() if info is None]
+        if missing:
+            raise AdbError(f"ACBridge did not write {', '.join(missing)} in {REMOTE_DIR}")
+    waited = time.perf_counter() - started
+
+    items, skipped = [], []
+    for name, info in outputs.items():
+        local_path = os.path.join(ACBRIDGE_DIR, OUTPUTS[name])
+        if is_current(local_path, info):
+            skipped.append(local_path)
+        else:
+            items.append((posixpath.join(REMOTE_DIR, name), local_path))
+    if items:
+        await asyncio.to_thread(pull_many, items, serial=serial, client=sync_client)
+    pulled = [local_path for _remote, local_path in items]
+    icons_zip = os.path.join(ACBRIDGE_DIR, "icons.zip")
+    icons = None
+    if icons_zip in pulled or not os.path.isdir(ICONS_DIR):
+        icons = await asyncio.to_thread(extract_icons, icons_zip, ICONS_DIR)
+    return AcbridgeUpdate(waited, pulled, skipped, icons)
+
+
+class IconExtraction:
+    """What one extraction of icons.zip wrote."""
+
+    def __init__(self):
+        self.written = 0  # Members written because they were new or changed
+        self.unchanged = 0  # Members already on disk with the same CRC and size
+        self.removed = 0  # Icons of apps that are no longer in the archive
+        self.bytes_written = 0
+
+    def summary(self):
+        return (f"{self.written} icon(s) written ({self.bytes_written} bytes), {self.unchanged} unchanged, "
+                f"{self.removed} removed")
+
+
+def load_icon_index(path=ICONS_INDEX):
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_icon_index(index, path=ICONS_INDEX):
+    partial = path + ".part"
+    with open(partial, "w", encoding="utf-8") as file:
+        json.dump(index, file)
+    os.replace(partial, path)
+
+
+def extract_icons(zip_path, destination=ICONS_DIR, index_path=ICONS_INDEX):
+    """Write the members of `zip_path` that changed since the last extraction; returns an IconExtraction.
+
+    The CRC and size of every extracted member are kept in `index_path`,
+    so an update that changed two icons writes two files instead of
+    the whole archive. Unchanged icons keep their mtime, which also
+    spares the thumbnail cache from hashing them again.
+    """
+    import zipfile  # Only an update needs it
+    index = load_icon_index(index_path)
+    result = IconExtraction()
+    current = {}
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            for info in zip_ref.infolist():
+                name = info.filename
+                if info.is_dir() or posixpath.isabs(name) or ".." in name.split("/"):
+                    continue  # Only plain files inside `destination`
+                target = os.path.join(destination, *name.split("/"))
+                entry = [info.CRC, info.file_size]
+                current[name] = entry
+                if index.get(name) == entry and _has_size(target, info.file_size):
+                    result.unchanged += 1
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with zip_ref.open(info) as source, open(target + ".part", "wb") as file:
+                    shutil.copyfileobj(source, file)
+                os.replace(target + ".part", target)
+                result.written += 1
+                result.bytes_written += info.file_size
+    except zipfile.BadZipFile as e:
+        raise AdbError(f"{zip_path} is not a valid icon archive: {e}") from None
+    for name in index.keys() - current.keys():
+        try:
+            os.remove(os.path.join(destination, *name.split("/")))
+            result.removed += 1
+        except OSError:
+            pass
+    if current != index:
+        save_icon_index(current, index_path)
+    return result
+
+
+def _has_size(path, size):
+    try:
+        return os.path.getsize(path) == size
+    except OSError:
+        return False
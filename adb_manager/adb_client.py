@@ -0,0 +1,570 @@
+# adb_client.py
+import os
+import socket
+import stat
+import struct
+import subprocess
+import threading
+import posixpath
+import shlex
+from collections import namedtuple
+from contextlib import contextmanager
+
+ADB_PATH = os.environ.get("ADB_PATH", "adb")
+ADB_SERVER_HOST = os.environ.get("ANDROID_ADB_SERVER_ADDRESS", "127.0.0.1")
+ADB_SERVER_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", "5037"))
+
+SYNC_DATA_MAX = 64 * 1024  # Largest DATA packet adbd accepts
+
+# Shell protocol v2 packet ids
+SHELL_STDIN = 0
+SHELL_STDOUT = 1
+SHELL_STDERR = 2
+SHELL_EXIT = 3
+SHELL_CLOSE_STDIN = 4
+
+_LEGACY_EXIT_MARKER = "__adb_manager_rc="
+
+SyncStat = namedtuple("SyncStat", ["mode", "size", "mtime"])
+SyncDirEntry = namedtuple("SyncDirEntry", ["name", "mode", "size", "mtime"])
+
+
+class AdbError(subprocess.CalledProcessError):
+    """Raised when the ADB server or the device rejects a request.
+
+    It subclasses CalledProcessError so the pages' existing
+    `except subprocess.CalledProcessError` handlers cover both the
+    old `adb` subprocess path and the socket client.
+    """
+
+    def __init__(self, message, cmd=None, returncode=1, output=None, stderr=None):
+        super().__init__(returncode, cmd, output, stderr)
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class AdbCommandError(AdbError):
+    """Raised by check_call/check_output when a shell command exits non-zero."""
+
+    def __init__(self, cmd, returncode, output=None, stderr=None):
+        message = f"Command '{cmd}' returned non-zero exit status {returncode}."
+        if stderr:
+            message += f" {stderr.strip() if isinstance(stderr, str) else stderr.strip().decode(errors='replace')}"
+        super().__init__(message, cmd=cmd, returncode=returncode, output=output, stderr=stderr)
+
+
+class AdbConnection:
+    """A single socket to the ADB server speaking the smart-socket protocol."""
+
+    def __init__(self, host, port, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def send_request(self, request):
+        """Send a length-prefixed request and wait for OKAY/FAIL."""
+        data = request.encode("utf-8")
+        self.sock.sendall(b"%04x" % len(data) + data)
+        self.read_status(request)
+
+    def read_status(self, request=None):
+        status = self.read_exactly(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbError(self.read_string(), cmd=request)
+        raise AdbError(f"Unexpected response from ADB server: {status!r}", cmd=request)
+
+    def read_exactly(self, size):
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = self.sock.recv_into(view[received:], size - received)
+            if not count:
+                raise AdbError("Connection closed by ADB server")
+            received += count
+        return bytes(buffer)
+
+    def read_string(self):
+        length = int(self.read_exactly(4), 16)
+        return self.read_exactly(length).decode("utf-8", errors="replace")
+
+    def recv(self, size=SYNC_DATA_MAX):
+        return self.sock.recv(size)
+
+    def read_all(self):
+        chunks = []
+        while True:
+            chunk = self.sock.recv(SYNC_DATA_MAX)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def sendall(self, data):
+        self.sock.sendall(data)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class SyncConnection:
+    """A `sync:` session on one device; stays open across STAT/LIST/RECV/SEND requests."""
+
+    def __init__(self, connection, features=()):
+        self.connection = connection
+        self.stat_v2 = "stat_v2" in features
+        self.ls_v2 = "ls_v2" in features
+        self.healthy = True
+
+    def _send(self, command, path):
+        data = path.encode("utf-8")
+        self.connection.sendall(command + struct.pack("<I", len(data)) + data)
+
+    def stat(self, path, follow_links=True):
+        """Return a SyncStat for `path`, or None when it does not exist.
+
+        Without stat_v2 the device only answers lstat(), so symlinks are
+        reported as links regardless of `follow_links`.
+        """
+        if self.stat_v2:
+            self._send(b"STA2" if follow_links else b"LST2", path)
+            reply = self.connection.read_exactly(72)
+            if reply[:4] not in (b"STA2", b"LST2"):
+                self.healthy = False
+                raise AdbError(f"Unexpected sync reply {reply[:4]!r}", cmd=path)
+            (error, _dev, _ino, mode, _nlink, _uid, _gid, size,
+             _atime, mtime, _ctime) = struct.unpack("<IQQIIIIQqqq", reply[4:])
+            if error:
+                return None
+            return SyncStat(mode, size, mtime)
+        self._send(b"STAT", path)
+        reply = self.connection.read_exactly(16)
+        if reply[:4] != b"STAT":
+            self.healthy = False
+            raise AdbError(f"Unexpected sync reply {reply[:4]!r}", cmd=path)
+        mode, size, mtime = struct.unpack("<III", reply[4:])
+        if mode == 0 and size == 0 and mtime == 0:
+            return None
+        return SyncStat(mode, size, mtime)
+
+    def iter_list(self, path):
+        """Yield SyncDirEntry items for `path` as they arrive (without `.`/`..`).
+
+        The generator must be exhausted; abandoning it leaves the session
+        unusable and it is dropped instead of going back to the pool.
+        """
+        self.healthy = False
+        if self.ls_v2:
+            self._send(b"LIS2", path)
+            while True:
+                header = self.connection.read_exactly(76)
+                if header[:4] == b"DONE":
+                    break
+                if header[:4] != b"DNT2":
+                    raise AdbError(f"Unexpected sync reply {header[:4]!r}", cmd=path)
+                (_error, _dev, _ino, mode, _nlink, _uid, _gid, size,
+                 _atime, mtime, _ctime, namelen) = struct.unpack("<IQQIIIIQqqqI", header[4:])
+                name = self.connection.read_exactly(namelen).decode("utf-8", errors="replace")
+                if name not in (".", ".."):
+                    yield SyncDirEntry(name, mode, size, mtime)
+        else:
+            self._send(b"LIST", path)
+            while True:
+                header = self.connection.read_exactly(20)
+                if header[:4] == b"DONE":
+                    break
+                if header[:4] != b"DENT":
+                    raise AdbError(f"Unexpected sync reply {header[:4]!r}", cmd=path)
+                mode, size, mtime, namelen = struct.unpack("<IIII", header[4:])
+                name = self.connection.read_exactly(namelen).decode("utf-8", errors="replace")
+                if name not in (".", ".."):
+                    yield SyncDirEntry(name, mode, size, mtime)
+        self.healthy = True
+
+    def list(self, path):
+        return list(self.iter_list(path))
+
+    def recv(self, path, write):
+        """Stream the remote file at `path` to the `write` callable; returns the byte count."""
+        self.healthy = False
+        self._send(b"RECV", path)
+        total = 0
+        while True:
+            header = self.connection.read_exactly(8)
+            command = header[:4]
+            length = struct.unpack("<I", header[4:])[0]
+            if command == b"DATA":
+                chunk = self.connection.read_exactly(length)
+                write(chunk)
+                total += length
+            elif command == b"DONE":
+                break
+            elif command == b"FAIL":
+                message = self.connection.read_exactly(length).decode("utf-8", errors="replace")
+                raise AdbError(f"{path}: {message}", cmd=path)
+            else:
+                raise AdbError(f"Unexpected sync reply {command!r}", cmd=path)
+        self.healthy = True
+        return total
+
+    def send(self, path, chunks, mode=0o644, mtime=0):
+        """Write the byte `chunks` to the remote `path`; returns the byte count."""
+        self.healthy = False
+        self._send(b"SEND", f"{path},{stat.S_IFREG | mode}")
+        total = 0
+        for chunk in chunks:
+            for offset in range(0, len(chunk), SYNC_DATA_MAX):
+                piece = chunk[offset:offset + SYNC_DATA_MAX]
+                self.connection.sendall(b"DATA" + struct.pack("<I", len(piece)) + piece)
+                total += len(piece)
+        self.connection.sendall(b"DONE" + struct.pack("<I", int(mtime)))
+        reply = self.connection.read_exactly(8)
+        if reply[:4] == b"FAIL":
+            length = struct.unpack("<I", reply[4:])[0]
+            message = self.connection.read_exactly(length).decode("utf-8", errors="replace")
+            raise AdbError(f"{path}: {message}", cmd=path)
+        if reply[:4] != b"OKAY":
+            raise AdbError(f"Unexpected sync reply {reply[:4]!r}", cmd=path)
+        self.healthy = True
+        return total
+
+    def close(self):
+        if self.healthy:
+            try:
+                self.connection.sendall(b"QUIT" + struct.pack("<I", 0))
+            except OSError:
+                pass
+        self.connection.close()
+
+
+def _read_file_chunks(path):
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(SYNC_DATA_MAX)
+            if not chunk:
+                return
+            yield chunk
+
+
+class AdbClient:
+    """Talks to the ADB server on port 5037 directly instead of forking `adb`.
+
+    Methods mirror the subprocess API (`run`, `check_call`, `check_output`)
+    so call sites read the same as before. `serial=None` targets the only
+    attached device, like a bare `adb shell`. Sync sessions are pooled per
+    device; shell services consume their socket, so each command opens a
+    fresh (loopback) connection instead.
+    """
+
+    def __init__(self, host=ADB_SERVER_HOST, port=ADB_SERVER_PORT, adb_path=ADB_PATH, max_idle_sync=4):
+        self.host = host
+        self.port = port
+        self.adb_path = adb_path
+        self.max_idle_sync = max_idle_sync
+        self._sync_pool = {}
+        self._features = {}
+        self._lock = threading.Lock()
+
+    # -- server connection -------------------------------------------------
+
+    def connect(self, timeout=None):
+        try:
+            return AdbConnection(self.host, self.port, timeout)
+        except ConnectionRefusedError:
+            if not self.start_server():
+                raise
+            return AdbConnection(self.host, self.port, timeout)
+
+    def start_server(self):
+        """Start a local ADB server; the only place the client still forks `adb`."""
+        if self.host not in ("127.0.0.1", "localhost"):
+            return False
+        try:
+            result = subprocess.run([self.adb_path, "-P", str(self.port), "start-server"], capture_output=True)
+        except FileNotFoundError:
+            return False
+        return result.returncode == 0
+
+    def kill_server(self):
+        self.close_all()
+        try:
+            with self.connect() as conn:
+                conn.send_request("host:kill")
+        except (ConnectionRefusedError, AdbError):
+            pass
+
+    def host_command(self, request):
+        """Run a `host:` request that answers with a length-prefixed string."""
+        with self.connect() as conn:
+            conn.send_request(request)
+            return conn.read_string()
+
+    def version(self):
+        return int(self.host_command("host:version"), 16)
+
+    def devices(self):
+        """Return (serial, state) tuples as listed by `adb devices`."""
+        output = self.host_command("host:devices")
+        return [tuple(line.split("\t", 1)) for line in output.splitlines() if "\t" in line]
+
+    def features(self, serial=None):
+        with self._lock:
+            if serial in self._features:
+                return self._features[serial]
+        request = f"host-serial:{serial}:features" if serial else "host:features"
+        try:
+            features = set(filter(None, self.host_command(request).split(",")))
+        except AdbError:
+            features = set()
+        with self._lock:
+            self._features[serial] = features
+        return features
+
+    def open_transport(self, serial=None):
+        conn = self.connect()
+        try:
+            conn.send_request(f"host:transport:{serial}" if serial else "host:transport-any")
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def open_service(self, service, serial=None):
+        """Open a device service (`shell:`, `exec:`, `sync:`...) and return its connection."""
+        conn = self.open_transport(serial)
+        try:
+            conn.send_request(service)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    # -- shell ----------------------------------------------------------------
+
+    def run(self, command, serial=None, check=False, text=True):
+        """Run a shell command on the device and return a CompletedProcess."""
+        if "shell_v2" in self.features(serial):
+            returncode, stdout, stderr = self._run_shell_v2(command, serial)
+        else:
+            returncode, stdout, stderr = self._run_shell_legacy(command, serial)
+        if text:
+            stdout = stdout.decode("utf-8", errors="replace")
+            stderr = stderr.decode("utf-8", errors="replace")
+        if check and returncode != 0:
+            raise AdbCommandError(command, returncode, stdout, stderr)
+        return subprocess.CompletedProcess(command, returncode, stdout, stderr)
+
+    def check_call(self, command, serial=None):
+        self.run(command, serial=serial, check=True)
+        return 0
+
+    def check_output(self, command, serial=None, text=True):
+        return self.run(command, serial=serial, check=True, text=text).stdout
+
+    def _run_shell_v2(self, command, serial):
+        with self.open_service(f"shell,v2,raw:{command}", serial) as conn:
+            conn.sendall(struct.pack("<BI", SHELL_CLOSE_STDIN, 0))
+            stdout, stderr, returncode = [], [], 255
+            while True:
+                try:
+                    header = conn.read_exactly(5)
+                except AdbError:
+                    break
+                packet_id, length = struct.unpack("<BI", header)
+                data = conn.read_exactly(length) if length else b""
+                if packet_id == SHELL_STDOUT:
+                    stdout.append(data)
+                elif packet_id == SHELL_STDERR:
+                    stderr.append(data)
+                elif packet_id == SHELL_EXIT:
+                    returncode = data[0] if data else 0
+                    break
+            return returncode, b"".join(stdout), b"".join(stderr)
+
+    def _run_shell_legacy(self, command, serial):
+        # Pre-Nougat devices have no exit status channel; append one to stdout.
+        wrapped = f"{command} ; echo {_LEGACY_EXIT_MARKER}$?"
+        with self.open_service(f"shell:{wrapped}", serial) as conn:
+            output = conn.read_all().replace(b"\r\n", b"\n")
+        head, marker, tail = output.rpartition(_LEGACY_EXIT_MARKER.encode())
+        if not marker:
+            return 255, output, b""
+        try:
+            returncode = int(tail.strip() or 255)
+        except ValueError:
+            returncode = 255
+        return returncode, head, b""
+
+    def shell_stream(self, command, serial=None):
+        """Yield raw stdout chunks of a long-running command as they arrive."""
+        with self.open_service(f"exec:{command}", serial) as conn:
+            while True:
+                chunk = conn.recv(SYNC_DATA_MAX)
+                if not chunk:
+                    return
+                yield chunk
+
+    # -- device services ------------------------------------------------------
+
+    def device_service(self, service, serial=None):
+        """Run a one-shot device service such as `reboot:` and return its reply text."""
+        with self.open_service(service, serial) as conn:
+            return conn.read_all().decode("utf-8", errors="replace").strip()
+
+    def reboot(self, serial=None, mode=""):
+        self.drop_device(serial)
+        return self.device_service(f"reboot:{mode}", serial)
+
+    def tcpip(self, port, serial=None):
+        self.drop_device(serial)
+        return self.device_service(f"tcpip:{port}", serial)
+
+    def connect_device(self, address):
+        return self.host_command(f"host:connect:{address}")
+
+    def disconnect_device(self, address=""):
+        return self.host_command(f"host:disconnect:{address}")
+
+    # -- sync -------------------------------------------------------------------
+
+    @contextmanager
+    def sync(self, serial=None):
+        """Borrow a pooled `sync:` session for `serial`."""
+        connection = self._acquire_sync(serial)
+        try:
+            yield connection
+        except BaseException:
+            connection.healthy = False
+            connection.close()
+            raise
+        self._release_sync(serial, connection)
+
+    def _acquire_sync(self, serial):
+        with self._lock:
+            idle = self._sync_pool.get(serial)
+            if idle:
+                return idle.pop()
+        return SyncConnection(self.open_service("sync:", serial), self.features(serial))
+
+    def _release_sync(self, serial, connection):
+        if connection.healthy:
+            with self._lock:
+                idle = self._sync_pool.setdefault(serial, [])
+                if len(idle) < self.max_idle_sync:
+                    idle.append(connection)
+                    return
+        connection.close()
+
+    def drop_device(self, serial):
+        """Forget pooled sessions and cached features for a device that went away."""
+        with self._lock:
+            idle = self._sync_pool.pop(serial, [])
+            self._features.pop(serial, None)
+        for connection in idle:
+            connection.close()
+
+    def close_all(self):
+        with self._lock:
+            pools = list(self._sync_pool.values())
+            self._sync_pool.clear()
+            self._features.clear()
+        for idle in pools:
+            for connection in idle:
+                connection.close()
+
+    def stat(self, path, serial=None):
+        with self.sync(serial) as sync:
+            return sync.stat(path)
+
+    def listdir(self, path, serial=None):
+        with self.sync(serial) as sync:
+            return sync.list(path)
+
+    def pull(self, remote_path, local_path, serial=None):
+        """Copy a remote file or directory tree to `local_path` (same rules as `adb pull`)."""
+        with self.sync(serial) as sync:
+            info = sync.stat(remote_path)
+            if info is None:
+                raise AdbError(f"remote object '{remote_path}' does not exist", cmd=remote_path)
+            name = posixpath.basename(remote_path.rstrip("/"))
+            if os.path.isdir(local_path):
+                local_path = os.path.join(local_path, name)
+            if stat.S_ISDIR(info.mode):
+                self._pull_tree(sync, remote_path.rstrip("/") or "/", local_path)
+            else:
+                self._pull_file(sync, remote_path, local_path, info.mtime)
+        return local_path
+
+    def _pull_tree(self, sync, remote_dir, local_dir):
+        os.makedirs(local_dir, exist_ok=True)
+        for entry in sync.list(remote_dir):
+            remote_path = posixpath.join(remote_dir, entry.name)
+            local_path = os.path.join(local_dir, entry.name)
+            if stat.S_ISLNK(entry.mode):
+                target = sync.stat(remote_path)
+                if target is None:
+                    continue
+                entry = entry._replace(mode=target.mode, mtime=target.mtime)
+            if stat.S_ISDIR(entry.mode):
+                self._pull_tree(sync, remote_path, local_path)
+            elif stat.S_ISREG(entry.mode):
+                self._pull_file(sync, remote_path, local_path, entry.mtime)
+
+    def _pull_file(self, sync, remote_path, local_path, mtime):
+        with open(local_path, "wb") as file:
+            sync.recv(remote_path, file.write)
+        if mtime:
+            os.utime(local_path, (mtime, mtime))
+
+    def push(self, local_path, remote_path, serial=None):
+        """Copy a local file or directory tree to `remote_path` (same rules as `adb push`)."""
+        with self.sync(serial) as sync:
+            target = sync.stat(remote_path)
+            if target is not None and stat.S_ISDIR(target.mode):
+                remote_path = posixpath.join(remote_path, os.path.basename(os.path.normpath(local_path)))
+            if os.path.isdir(local_path):
+                self._push_tree(sync, local_path, remote_path, serial)
+            else:
+                self._push_file(sync, local_path, remote_path)
+        return remote_path
+
+    def _push_tree(self, sync, local_dir, remote_dir, serial):
+        self.check_call(f"mkdir -p {shlex.quote(remote_dir)}", serial=serial)
+        for name in sorted(os.listdir(local_dir)):
+            local_path = os.path.join(local_dir, name)
+            remote_path = posixpath.join(remote_dir, name)
+            if os.path.isdir(local_path):
+                self._push_tree(sync, local_path, remote_path, serial)
+            else:
+                self._push_file(sync, local_path, remote_path)
+
+    def _push_file(self, sync, local_path, remote_path):
+        info = os.stat(local_path)
+        sync.send(remote_path, _read_file_chunks(local_path), mode=stat.S_IMODE(info.st_mode), mtime=info.st_mtime)
+
+    def install(self, apk_path, serial=None, options=""):
+        """Install an APK the way legacy `adb install` does: push, `pm install`, clean up."""
+        remote_path = f"/data/local/tmp/{os.path.basename(apk_path)}"
+        self.push(apk_path, remote_path, serial=serial)
+        try:
+            command = " ".join(part for part in ("pm install", options, shlex.quote(remote_path)) if part)
+            result = self.run(command, serial=serial)
+        finally:
+            self.run(f"rm -f {shlex.quote(remote_path)}", serial=serial)
+        if result.returncode != 0 or "Success" not in result.stdout:
+            raise AdbCommandError(f"pm install {apk_path}", result.returncode or 1, result.stdout, result.stderr or result.stdout)
+        return result.stdout
+
+
+adb = AdbClient()
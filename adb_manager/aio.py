@@ -0,0 +1,330 @@
+# aio.py
+import asyncio
+import codecs
+import struct
+import subprocess
+import threading
+import time
+from .adb_client import (ADB_PATH, ADB_SERVER_HOST, ADB_SERVER_PORT, SHELL_CLOSE_STDIN, SHELL_EXIT, SHELL_STDERR,
+                         SHELL_STDOUT, SYNC_DATA_MAX, _LEGACY_EXIT_MARKER, AdbClient, AdbCommandError, AdbError, adb)
+from .fleet import DeviceResult, FleetResult
+from .ui_dispatcher import ui
+
+MAX_ASYNC_DEVICE_CALLS = 256  # Device operations in flight at once on the loop
+STREAM_CHUNK_SIZE = 64 * 1024  # Bytes read at a time from a streamed process; also the longest line held back
+
+
+class AsyncAdbConnection:
+    """asyncio counterpart of AdbConnection: one socket to the ADB server."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def send_request(self, request):
+        data = request.encode("utf-8")
+        self.writer.write(b"%04x" % len(data) + data)
+        await self.writer.drain()
+        await self.read_status(request)
+
+    async def read_status(self, request=None):
+        status = await self.read_exactly(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbError(await self.read_string(), cmd=request)
+        raise AdbError(f"Unexpected response from ADB server: {status!r}", cmd=request)
+
+    async def read_exactly(self, size):
+        try:
+            return await self.reader.readexactly(size)
+        except asyncio.IncompleteReadError:
+            raise AdbError("Connection closed by ADB server") from None
+
+    async def read_string(self):
+        length = int(await self.read_exactly(4), 16)
+        return (await self.read_exactly(length)).decode("utf-8", errors="replace")
+
+    async def recv(self, size=SYNC_DATA_MAX):
+        return await self.reader.read(size)
+
+    async def read_all(self):
+        return await self.reader.read()
+
+    async def sendall(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+
+
+class AsyncAdbClient:
+    """The shell and host half of AdbClient on asyncio streams.
+
+    Every call is a coroutine, so hundreds of shell commands and output
+    streams can be in flight on one thread. The method names and return
+    values match AdbClient (`run` returns a CompletedProcess, failures
+    raise AdbError / AdbCommandError). Transfers stay on AdbClient's
+    pooled sync sessions.
+    """
+
+    def __init__(self, host=ADB_SERVER_HOST, port=ADB_SERVER_PORT, adb_path=ADB_PATH):
+        self.host = host
+        self.port = port
+        self.adb_path = adb_path
+        self._features = {}
+
+    async def connect(self):
+        try:
+            return await AsyncAdbConnection.open(self.host, self.port)
+        except ConnectionRefusedError:
+            # Starting the server forks `adb`; keep that off the loop
+            starter = AdbClient(self.host, self.port, self.adb_path)
+            if not await asyncio.get_running_loop().run_in_executor(None, starter.start_server):
+                raise
+            return await AsyncAdbConnection.open(self.host, self.port)
+
+    async def host_command(self, request):
+        async with await self.connect() as conn:
+            await conn.send_request(request)
+            return await conn.read_string()
+
+    async def devices(self):
+        output = await self.host_command("host:devices")
+        return [tuple(line.split("\t", 1)) for line in output.splitlines() if "\t" in line]
+
+    async def features(self, serial=None):
+        if serial in self._features:
+            return self._features[serial]
+        request = f"host-serial:{serial}:features" if serial else "host:features"
+        try:
+            features = set(filter(None, (await self.host_command(request)).split(",")))
+        except AdbError:
+            features = set()
+        self._features[serial] = features
+        return features
+
+    async def open_service(self, service, serial=None):
+        conn = await self.connect()
+        try:
+            await conn.send_request(f"host:transport:{serial}" if serial else "host:transport-any")
+            await conn.send_request(service)
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
+
+    async def run(self, command, serial=None, check=False, text=True):
+        if "shell_v2" in await self.features(serial):
+            returncode, stdout, stderr = await self._run_shell_v2(command, serial)
+        else:
+            returncode, stdout, stderr = await self._run_shell_legacy(command, serial)
+        if text:
+            stdout = stdout.decode("utf-8", errors="replace")
+            stderr = stderr.decode("utf-8", errors="replace")
+        if check and returncode != 0:
+            raise AdbCommandError(command, returncode, stdout, stderr)
+        return subprocess.CompletedProcess(command, returncode, stdout, stderr)
+
+    async def check_call(self, command, serial=None):
+        await self.run(command, serial=serial, check=True)
+        return 0
+
+    async def check_output(self, command, serial=None, text=True):
+        return (await self.run(command, serial=serial, check=True, text=text)).stdout
+
+    async def _run_shell_v2(self, command, serial):
+        async with await self.open_service(f"shell,v2,raw:{command}", serial) as conn:
+            await conn.sendall(struct.pack("<BI", SHELL_CLOSE_STDIN, 0))
+            stdout, stderr, returncode = [], [], 255
+            while True:
+                try:
+                    header = await conn.read_exactly(5)
+                except AdbError:
+                    break
+                packet_id, length = struct.unpack("<BI", header)
+                data = await conn.read_exactly(length) if length else b""
+                if packet_id == SHELL_STDOUT:
+                    stdout.append(data)
+                elif packet_id == SHELL_STDERR:
+                    stderr.append(data)
+                elif packet_id == SHELL_EXIT:
+                    returncode = data[0] if data else 0
+                    break
+            return returncode, b"".join(stdout), b"".join(stderr)
+
+    async def _run_shell_legacy(self, command, serial):
+        wrapped = f"{command} ; echo {_LEGACY_EXIT_MARKER}$?"
+        async with await self.open_service(f"shell:{wrapped}", serial) as conn:
+            output = (await conn.read_all()).replace(b"\r\n", b"\n")
+        head, marker, tail = output.rpartition(_LEGACY_EXIT_MARKER.encode())
+        if not marker:
+            return 255, output, b""
+        try:
+            returncode = int(tail.strip() or 255)
+        except ValueError:
+            returncode = 255
+        return returncode, head, b""
+
+    async def shell_stream(self, command, serial=None):
+        """Yield raw stdout chunks of a long-running command (logcat, getevent...) as they arrive."""
+        async with await self.open_service(f"exec:{command}", serial) as conn:
+            while True:
+                chunk = await conn.recv(SYNC_DATA_MAX)
+                if not chunk:
+                    return
+                yield chunk
+
+    def drop_device(self, serial):
+        self._features.pop(serial, None)
+
+    async def device_service(self, service, serial=None):
+        async with await self.open_service(service, serial) as conn:
+            return (await conn.read_all()).decode("utf-8", errors="replace").strip()
+
+
+async def stream_process(argv, on_process=None):
+    """Run a local program and yield its output line by line (stderr folded into stdout).
+
+    The output is read in fixed-size chunks and split here rather than
+    with readline(), which fails on lines longer than its buffer. A line
+    that grows past STREAM_CHUNK_SIZE without ending is yielded in parts.
+    `on_process` receives the asyncio Process once it has started, for
+    callers that need to signal it. Raises FileNotFoundError like Popen.
+    """
+    process = await asyncio.create_subprocess_exec(*argv, stdout=asyncio.subprocess.PIPE,
+                                                   stderr=asyncio.subprocess.STDOUT)
+    if on_process is not None:
+        on_process(process)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")  # Keeps characters split across chunks whole
+    try:
+        pending = ""
+        while True:
+            chunk = await process.stdout.read(STREAM_CHUNK_SIZE)
+            pending += decoder.decode(chunk, final=not chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line + "\n"
+            if not chunk:
+                break
+            if len(pending) >= STREAM_CHUNK_SIZE:
+                yield pending
+                pending = ""
+        if pending:
+            yield pending
+        await process.wait()
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def gather_devices(action, serials, *args, limit=MAX_ASYNC_DEVICE_CALLS, **kwargs):
+    """Await `action(serial, *args, **kwargs)` on every serial, at most `limit` at a time.
+
+    Exceptions are captured per device rather than raised; the results
+    come back as a FleetResult in the order the serials were given.
+    """
+    started = time.perf_counter()
+    serials = list(dict.fromkeys(serials))
+    semaphore = asyncio.Semaphore(limit)
+
+    async def call(serial):
+        begin = time.perf_counter()
+        async with semaphore:
+            try:
+                value = await action(serial, *args, **kwargs)
+            except Exception as e:
+                return DeviceResult(serial, error=e, seconds=time.perf_counter() - begin)
+        return DeviceResult(serial, value=value, seconds=time.perf_counter() - begin)
+
+    results = await asyncio.gather(*(call(serial) for serial in serials))
+    return FleetResult(list(results), time.perf_counter() - started)
+
+
+class EventLoopThread:
+    """The app's one asyncio loop, running on a daemon thread next to the Tk loop.
+
+    `submit()` schedules a coroutine from any thread and returns a
+    concurrent Future; `run()` waits for it. Coroutines reach the widgets
+    with `await call_ui(...)`, which goes through the UI dispatcher.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        with self._lock:
+            if self._loop is None:
+                ready = threading.Event()
+
+                def serve():
+                    self._loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(self._loop)
+                    ready.set()
+                    self._loop.run_forever()
+
+                threading.Thread(target=serve, name="asyncio-loop", daemon=True).start()
+                ready.wait()
+            return self._loop
+
+    def submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout=None):
+        """Run `coroutine` on the loop and wait for its result; not from the loop thread itself."""
+        return self.submit(coroutine).result(timeout)
+
+    def call_soon(self, callback, *args):
+        """Run a plain callback on the loop thread (asyncio objects are not thread-safe)."""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+
+async def call_ui(callback, *args):
+    """Run `callback(*args)` on the Tk thread and return its result without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def run():
+        try:
+            result = callback(*args)
+        except Exception as e:
+            loop.call_soon_threadsafe(_settle, future, None, e)
+        else:
+            loop.call_soon_threadsafe(_settle, future, result, None)
+
+    if ui.root is None:
+        return callback(*args)
+    ui.post(run)
+    return await future
+
+
+def _settle(future, result, error):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+async_adb = AsyncAdbClient(adb.host, adb.port, adb.adb_path)
+event_loop = EventLoopThread()
@@ -1,19 +1,31 @@
 # apk_manager.py
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog
 import subprocess
 import os
-import threading  # Import threading module
-from PIL import Image, ImageTk
-from .utils import format_package_info, get_device_model_serial
-import zipfile
-from time import sleep
+from . import services
+from .devices import device_selection
+from .fleet import report_fleet_result
+from .icons import thumbnail_cache
+from .install import InstallProgress
+from .progress_window import InstallProgressWindow, TransferProgressWindow
+from .search_index import SearchIndex
+from .tasks import QUEUED, TRANSFER, tasks
+from .transfer import TransferCancelled, TransferControl, TransferProgress
+from .ui_dispatcher import messagebox, ui
+from .virtual_tree import VirtualTreeview
+
+SEARCH_DELAY_MS = 150  # Pause in typing before the list is filtered
 
 class APKManagerPage(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
-        self.package_icons = {}
         self.row_height = 60
+        # Rows are (package name, app name, version, enabled); search app name, package name, then version
+        self.search_index = SearchIndex(fields=lambda row: (row[1], row[0], row[2]))
+        self.rows = {}  # Serial -> {package name: row}; unchanged packages keep their row, and with it their Tk item
+        self.shown_serial = None
+        self.search_after_id = None
         self.formatted_info = None
 
         # Search Bar and Buttons Frame
@@ -27,8 +39,10 @@ class APKManagerPage(ttk.Frame):
         # Update Button
         self.update_button = ttk.Button(self.search_frame, text="Update", command=self.setup_acbridge)
         self.update_button.pack(side=tk.LEFT, padx=5)
-        # Search Entry
-        self.search_entry = ttk.Entry(self.search_frame, width=30)
+        # Search Entry; the list is filtered as you type
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        self.search_entry = ttk.Entry(self.search_frame, width=30, textvariable=self.search_var)
         self.search_entry.pack(side=tk.LEFT, padx=5)
         # Search Button
         self.search_button = ttk.Button(self.search_frame, text="Search", command=self.search_apk)
@@ -41,15 +55,23 @@ class APKManagerPage(ttk.Frame):
         self.style = ttk.Style()
         self.style.configure("Custom.Treeview", rowheight=self.row_height)
 
-        self.package_tree = ttk.Treeview(self, columns=("Package", "App Name"), height=5, style="Custom.Treeview")
+        self.package_tree = ttk.Treeview(self, columns=("Package", "App Name", "Version", "State"), height=5, style="Custom.Treeview")
         self.package_tree.heading("#0", text="App Icon")
         self.package_tree.heading("#1", text="App Name")
         self.package_tree.heading("#2", text="Package")
+        self.package_tree.heading("#3", text="Version")
+        self.package_tree.heading("#4", text="State")
+        self.package_tree.column("Version", width=120)
+        self.package_tree.column("State", width=80)
         self.package_tree.pack(fill=tk.BOTH, expand=True)
 
         self.package_scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.package_tree.yview)
         self.package_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.package_tree.configure(yscrollcommand=self.package_scrollbar.set)
+
+        # Rows live in a plain list; thumbnails are only loaded for the rows on screen
+        self.tree_view = VirtualTreeview(self.package_tree, self.make_row, self.package_scrollbar,
+                                         on_view=lambda: ui.post(self.load_visible_icons, key=("apk-icons", id(self))),
+                                         on_select=self.on_select_package)
 
         # Buttons Frame (Footer)
         self.button_frame_1 = ttk.Frame(self)
@@ -75,101 +97,138 @@ class APKManagerPage(ttk.Frame):
         self.save_button = ttk.Button(self.button_frame_1, text="Extract APK", command=self.save_actions, state=tk.DISABLED)
         self.save_button.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
 
-        # Second Row: 2 Buttons (Left to Right)
+        # Second Row: 3 Buttons (Left to Right)
         self.launch_app_button = ttk.Button(self.button_frame_2, text="Launch App", command=self.launch_app, state=tk.DISABLED)
         self.launch_app_button.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
         
         self.install_apk_button = ttk.Button(self.button_frame_2, text="Install APK", command=self.install_apk)
         self.install_apk_button.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
-        
 
-        self.package_tree.bind("<<TreeviewSelect>>", self.on_select_package)
+        self.install_folder_button = ttk.Button(self.button_frame_2, text="Install Folder", command=self.install_folder)
+        self.install_folder_button.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+        
 
     def install_apk(self):
-        filepath = filedialog.askopenfilename(filetypes=[("APK files", "*.apk")])
-        if filepath:
-            def run():
-                try:
-                    subprocess.check_call(["adb", "install", filepath])
-                    messagebox.showinfo("Success", "APK installed successfully!")
-                except subprocess.CalledProcessError as e:
-                    messagebox.showerror("Error", f"Error installing APK: {e}")
+        filepaths = filedialog.askopenfilenames(filetypes=[("APK files", "*.apk *.apks *.xapk *.apkm"), ("All files", "*.*")])
+        if filepaths:
+            name = os.path.basename(filepaths[0]) if len(filepaths) == 1 else f"{len(filepaths)} packages"
+            self.install_packages(list(filepaths), f"Install {name}")
 
-            # Start the operation in a separate thread
-            thread = threading.Thread(target=run)
-            thread.start()
+    def install_folder(self):
+        folder = filedialog.askdirectory()
+        if folder:
+            self.install_packages([folder], f"Install {os.path.basename(os.path.normpath(folder))}")
 
-    def resize_image(self, image_path, width, height):
-        image = Image.open(image_path)
-        resized_image = image.resize((width, height))
-        return ImageTk.PhotoImage(resized_image)
+    def install_packages(self, paths, name):
+        """Install on every target device at once, with per-device and per-package state in one window."""
+        progress, control = InstallProgress(), TransferControl()
 
-    def search_apk(self):
-        """Filter the APK list based on the search query."""
-        search_query = self.search_entry.get().strip().lower()
-        if not search_query:
-            messagebox.showwarning("Empty Search", "Please enter a search term.")
-            return
-
-        # Clear the current treeview
-        self.package_tree.delete(*self.package_tree.get_children())
+        async def run():
+            try:
+                result = await services.install_packages(paths, await services.target_devices(), progress,
+                                                         control=control)
+            except (subprocess.CalledProcessError, OSError) as e:
+                progress.finish(e)
+                messagebox.showerror("Error", f"Error installing APKs: {e}")
+                return
+            finally:
+                if not progress.finished:
+                    progress.finish()
+            report_fleet_result(result, "APKs installed successfully!", "Error installing APKs")
+            if result.succeeded:
+                self.refresh_package_list()
+
+        task = tasks.submit(run, name=name, on_cancel=control.cancel, lane=TRANSFER)  # Stops the pushes under way too
+        InstallProgressWindow(self, name, progress, on_cancel=task.cancel)
+
+    def schedule_search(self):
+        """Search once typing pauses for SEARCH_DELAY_MS, not on every keystroke."""
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(SEARCH_DELAY_MS, self.search_apk)
 
-        # Filter packages based on the search query
-        for package_name, app_name in self.package_to_app.items():
-            if search_query in app_name.lower():
-                icon_path = f"./tools/ACBridge/icons/{package_name}.png"
-                if os.path.exists(icon_path):
-                    resized_icon = self.resize_image(icon_path, 50, 50)
-                    self.package_icons[package_name] = resized_icon
-                    self.package_tree.insert("", "end", values=(app_name, package_name), image=resized_icon)
-                else:
-                    self.package_tree.insert("", "end", values=(app_name, package_name))
+    def search_apk(self):
+        """Filter the APK list based on the search query, best matches first."""
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        self.tree_view.reorder(self.search_index.search(self.search_var.get()))
 
     def clear_search(self):
         """Clear the search and show the full list of APKs."""
-        self.search_entry.delete(0, tk.END)
-        self.refresh_package_list()
+        self.search_var.set("")
+        self.search_apk()
 
     def refresh_package_list(self):
-        """Refresh the list of installed packages."""
-        def run():
-            self.package_tree.delete(*self.package_tree.get_children())
+        """Refresh the list of installed packages: one inventory call, applied as a diff to the last one."""
+        async def run():
             try:
-                output = subprocess.check_output(["adb", "shell", "pm", "list", "packages"], universal_newlines=True)
-                packages = output.strip().split('\n')
-                package_names = [package.split(':')[1] for package in packages]
-
-                formatted_info = None
-                file_path = "./tools/ACBridge/acbridge"
-                with open(file_path, "r", encoding="utf-8") as file:
-                    input_string = file.read()
-                    formatted_info = format_package_info(input_string)
-
-                self.package_to_app = {entry['package_name']: entry['app_name'] for entry in formatted_info}
-                sorted_package_names = sorted(package_names, key=lambda x: self.package_to_app.get(x, '').lower())
-
-                for package_name in sorted_package_names:
-                    app_name = self.package_to_app.get(package_name, None)
-                    icon_path = f"./tools/ACBridge/icons/{package_name}.png"
-                    if os.path.exists(icon_path):
-                        resized_icon = self.resize_image(icon_path, 50, 50)
-                        self.package_icons[package_name] = resized_icon
-                        self.package_tree.insert("", "end", values=(app_name, package_name), image=resized_icon)
-                    else:
-                        if app_name:
-                            self.package_tree.insert("", "end", values=(app_name, package_name))
-                        else:
-                            self.package_tree.insert("", "end", values=(package_name,))
+                device_serial = await services.active_device()
+                table, diff = await services.inventory_packages(device_serial)
+                try:
+                    app_names = services.load_app_names()
+                except OSError:
+                    app_names = {}  # No ACBridge export yet; package names stand in for labels
+                previous = self.rows.get(device_serial, {})
+                rows = {}
+                for package_name in table.names:
+                    row = (package_name, app_names.get(package_name), table.get(package_name, "version_name"),
+                           table.get(package_name, "enabled"))
+                    rows[package_name] = previous[package_name] if previous.get(package_name) == row else row
+                self.rows[device_serial] = rows
+                ordered = sorted(rows.values(), key=lambda row: (row[1] or row[0]).lower())
+                index = SearchIndex(ordered, fields=self.search_index.fields)  # Built here, off the Tk thread
+                thumbnail_cache.scan()  # The icons may have been updated since the last refresh
+                ui.post(self.show_packages, index, device_serial)
             except Exception as e:
                 messagebox.showerror("Error", f"Error: {e}")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="List packages", serial=device_selection.active(wait=False), key="list-packages")
+
+    def show_packages(self, index, device_serial):
+        """Fill the package list from a SearchIndex of package rows; runs on the Tk thread."""
+        self.search_index = index
+        rows = index.search(self.search_var.get())
+        if device_serial == self.shown_serial:
+            self.tree_view.reorder(rows)  # Same device: the selected packages stay selected
+        else:
+            self.tree_view.set_rows(rows)
+        self.shown_serial = device_serial
+
+    def make_row(self, row):
+        package_name, app_name, version_name, enabled = row
+        values = (app_name or package_name, package_name, version_name, "enabled" if enabled else "disabled")
+        return "", values, thumbnail_cache.peek(package_name)
 
-    def on_select_package(self, event):
-        selected_item = self.package_tree.selection()
-        if selected_item:
+    def load_visible_icons(self):
+        """Give the rows on screen their thumbnails; scrolling calls this again for the next rows.
+
+        The icons are read, hashed and resized in a task; the Tk thread only
+        builds the PhotoImages.
+        """
+        def run():
+            package_names = ui.call(lambda: [row[0] for row, _item in self.tree_view.visible()])
+            prepared = {package_name: thumbnail_cache.prepare(package_name)
+                        for package_name in package_names if thumbnail_cache.has(package_name)}
+            thumbnail_cache.save_index()
+            ui.call(self.show_icons, prepared)
+
+        tasks.submit(run, name="Load app icons", key=("apk-icons", id(self)))
+
+    def show_icons(self, prepared):
+        """Set the thumbnails `load_visible_icons` prepared on the rows still on screen."""
+        for (package_name, *_details), item in self.tree_view.visible():
+            if package_name in prepared:
+                image = thumbnail_cache.image(package_name, prepared[package_name])
+                if image is not None:
+                    self.package_tree.item(item, image=image)
+
+    def selected_packages(self):
+        """Package names of the selected rows, including rows scrolled out of the tree."""
+        return [row[0] for row in self.tree_view.selected_rows()]
+
+    def on_select_package(self, event=None):
+        if self.tree_view.selected:
             self.enable_button.config(state=tk.NORMAL)
             self.disable_button.config(state=tk.NORMAL)
             self.clear_data_button.config(state=tk.NORMAL)
@@ -185,174 +244,110 @@ class APKManagerPage(ttk.Frame):
             self.launch_app_button.config(state=tk.DISABLED)
 
     def enable_package(self):
-        selected_item = self.package_tree.selection()
-        if selected_item:
-            package_name = self.package_tree.item(selected_item, "values")[1]
-            def run():
+        selected_packages = self.selected_packages()
+        if selected_packages:
+            package_name = selected_packages[0]
+            async def run():
                 try:
-                    subprocess.check_call(["adb", "shell", "pm", "enable", "--user", "0", package_name])
+                    await services.set_package_enabled(package_name, True, await services.active_device())
                     messagebox.showinfo("Success", f"Package {package_name} enabled successfully!")
                 except subprocess.CalledProcessError as e:
                     messagebox.showerror("Error", f"Error enabling package {package_name}: {e}")
 
-            # Start the operation in a separate thread
-            thread = threading.Thread(target=run)
-            thread.start()
+            tasks.submit(run, name=f"Enable {package_name}", serial=device_selection.active(wait=False), key=("enable", package_name))
 
     def disable_package(self):
-        selected_item = self.package_tree.selection()
-        if selected_item:
-            package_name = self.package_tree.item(selected_item, "values")[1]
-            def run():
+        selected_packages = self.selected_packages()
+        if selected_packages:
+            package_name = selected_packages[0]
+            async def run():
                 try:
-                    subprocess.check_call(["adb", "shell", "pm", "disable-user", "--user", "0", package_name])
+                    await services.set_package_enabled(package_name, False, await services.active_device())
                     messagebox.showinfo("Success", f"Package {package_name} disabled successfully!")
                 except subprocess.CalledProcessError as e:
                     messagebox.showerror("Error", f"Error disabling package {package_name}: {e}")
 
-            # Start the operation in a separate thread
-            thread = threading.Thread(target=run)
-            thread.start()
+            tasks.submit(run, name=f"Disable {package_name}", serial=device_selection.active(wait=False), key=("disable", package_name))
 
     def clear_app_data(self):
-        selected_item = self.package_tree.selection()
-        if selected_item:
-            package_name = self.package_tree.item(selected_item, "values")[1]
-            def run():
+        selected_packages = self.selected_packages()
+        if selected_packages:
+            package_name = selected_packages[0]
+            async def run():
                 try:
-                    subprocess.check_call(["adb", "shell", "pm", "clear", "--user", "0", package_name])
+                    await services.clear_package_data(package_name, await services.active_device())
                     messagebox.showinfo("Success", f"App data cleared for package {package_name}!")
                 except subprocess.CalledProcessError as e:
                     messagebox.showerror("Error", f"Error clearing app data for package {package_name}: {e}")
 
-            # Start the operation in a separate thread
-            thread = threading.Thread(target=run)
-            thread.start()
+            tasks.submit(run, name=f"Clear data of {package_name}", serial=device_selection.active(wait=False), key=("clear", package_name))
 
     def uninstall_package(self):
-        selected_item = self.package_tree.selection()
-        if selected_item:
-            package_name = self.package_tree.item(selected_item, "values")[1]
-            def run():
+        selected_packages = self.selected_packages()
+        if selected_packages:
+            package_name = selected_packages[0]
+            async def run():
                 try:
-                    subprocess.check_call(["adb", "shell", "pm", "uninstall", "--user", "0", package_name])
+                    await services.uninstall_package(package_name, await services.active_device())
                     messagebox.showinfo("Success", f"Package {package_name} uninstalled successfully!")
                 except subprocess.CalledProcessError as e:
                     messagebox.showerror("Error", f"Error uninstalling package {package_name}: {e}")
 
-            # Start the operation in a separate thread
-            thread = threading.Thread(target=run)
-            thread.start()
+            tasks.submit(run, name=f"Uninstall {package_name}", serial=device_selection.active(wait=False), key=("uninstall", package_name))
 
     def save_actions(self):
-        selected_item = self.package_tree.selection()
-        if selected_item:
-            package_name = self.package_tree.item(selected_item, "values")[1]
-            def run():
-                try:
-                    output = subprocess.check_output(["adb", "shell", "pm", "path", package_name], universal_newlines=True)
-                    path = output.split(":")[1].strip()
-                    device_model, device_serial = get_device_model_serial(0)
-                    if device_model and device_serial:
-                        sanitized_model = device_model.replace(":", "_").replace(".", "_")
-                        sanitized_serial = device_serial.replace(":", "_").replace(".", "_")
-                        os.makedirs(f"./device-pull/{sanitized_model}-{sanitized_serial}/Downloadapk", exist_ok=True)
-                        subprocess.check_call(["adb", "shell", "cp", "-r", path, f"/storage/emulated/0/{package_name}.apk"])
-                        subprocess.check_call(["adb", "pull", f"/storage/emulated/0/{package_name}.apk", f"./device-pull/{sanitized_model}-{sanitized_serial}/Downloadapk/{package_name}.apk"])
-                        subprocess.check_call(["adb", "shell", "rm", f"/storage/emulated/0/{package_name}.apk"])
-                        messagebox.showinfo("Success", f"APK for package {package_name} saved successfully!")
-                    else:
-                        os.makedirs(f"./device-pull/{device_model}-{device_serial}/Downloadapk", exist_ok=True)
-                        subprocess.check_call(["adb", "shell", "cp", "-r", path, f"/storage/emulated/0/{package_name}.apk"])
-                        subprocess.check_call(["adb", "pull", f"/storage/emulated/0/{package_name}.apk", f"./device-pull/{device_model}-{device_serial}/Downloadapk/{package_name}.apk"])
-                        subprocess.check_call(["adb", "shell", "rm", f"/storage/emulated/0/{package_name}.apk"])
-                        messagebox.showinfo("Success", f"APK for package {package_name} saved successfully!")
-                except subprocess.CalledProcessError as e:
-                    messagebox.showerror("Error", f"Error saving APK for package {package_name}: {e}")
+        package_names = self.selected_packages()
+        if not package_names:
+            return
+        device_serial = device_selection.active(wait=False)
+        title = f"Extracting {package_names[0]}" if len(package_names) == 1 else f"Extracting {len(package_names)} APKs"
+        progress, control = TransferProgress(), TransferControl()
+        window = TransferProgressWindow(self, title, progress, f"APKs for {', '.join(package_names)} saved successfully!",
+                                        "Error saving APK", control)
 
-            # Start the operation in a separate thread
-            thread = threading.Thread(target=run)
-            thread.start()
+        async def run():
+            try:
+                extracted, missing, stats = await services.extract_apks(package_names, await services.active_device(),
+                                                                        progress=progress, control=control)
+                saved = f" {stats.summary()}." if stats.linked_files else ""
+                window.success_message = f"Saved the APKs of {len(extracted)} package(s).{saved}"
+                if missing:
+                    window.success_message += f"\nNo APK found for: {', '.join(missing)}"
+                progress.finish()
+            except (OSError, subprocess.CalledProcessError) as e:
+                progress.finish(e)
+
+        def cancel():
+            control.cancel()
+            if task.state == QUEUED:
+                progress.finish(TransferCancelled())  # It never started, so close its window here
+
+        task = tasks.submit(run, name=title, serial=device_serial, key=("extract", tuple(package_names)), on_cancel=cancel,
+                            lane=TRANSFER)
 
     def launch_app(self):
-        selected_item = self.package_tree.selection()
-        if selected_item:
-            package_name = self.package_tree.item(selected_item, "values")[1]
-            def run():
+        selected_packages = self.selected_packages()
+        if selected_packages:
+            package_name = selected_packages[0]
+            async def run():
                 try:
-                    subprocess.check_call(["adb", "shell", "monkey", "-p", package_name, "-c", "android.intent.category.LAUNCHER", "1"])
+                    await services.launch_app(package_name, await services.active_device())
                     messagebox.showinfo("Success", f"Successfully launched {package_name}!")
                 except subprocess.CalledProcessError as e:
                     messagebox.showerror("Error", f"Error launching {package_name}: {e}")
 
-            # Start the operation in a separate thread
-            thread = threading.Thread(target=run)
-            thread.start()
+            tasks.submit(run, name=f"Launch {package_name}", serial=device_selection.active(wait=False), key=("launch", package_name))
         else:
             messagebox.showerror("Error", "No package selected!")
 
     def setup_acbridge(self):
-        package_name = "com.cybercat.acbridge"
-        activity_name = ".MainActivity"
-        icons_destination_path = "./tools/ACBridge/icons"
-        acbridge_destination_path = "./tools/ACBridge/"
-
-        def check_acbridge_installed(package_name):
-            check_command = f"adb shell pm list packages {package_name}"
-            result = subprocess.run(check_command, shell=True, capture_output=True, text=True)
-            return package_name in result.stdout
-
-        def run():
-            if not check_acbridge_installed(package_name):
-                apk_path = "./tools/ACBridge/acbridge.apk"
-                install_command = f"adb install {apk_path}"
-                os.system(install_command)
-                sleep(1)
-
-                mkdir_command = f"adb shell mkdir -p /storage/emulated/0/.adac"
-                os.system(mkdir_command)
-
-                remove_settings_command = f"adb shell rm /storage/emulated/0/.adac/settings"
-                os.system(remove_settings_command)
-
-                push_settings_command = f"adb push ./tools/ACBridge/settings /storage/emulated/0/.adac"
-                os.system(push_settings_command)
-
-                write_permission_command = f"adb shell pm grant {package_name} android.permission.WRITE_EXTERNAL_STORAGE"
-                os.system(write_permission_command)
-                sleep(1)
-
-                usage_stats_permission_command = f"adb shell pm grant {package_name} android.permission.PACKAGE_USAGE_STATS"
-                os.system(usage_stats_permission_command)
-                sleep(1)
-
-                launch_command = f"adb shell am start -n {package_name}/{activity_name}"
-                os.system(launch_command)
-                sleep(20)
-
-                launch_command = f"adb shell am start -n {package_name}/{activity_name}"
-                os.system(launch_command)
-                sleep(20)
-            else:
-                launch_command = f"adb shell am start -n {package_name}/{activity_name}"
-                os.system(launch_command)
-                sleep(20)
-
-            pull_icons_command = "adb pull /storage/emulated/0/.adac/icons.zip ./tools/ACBridge/"
-            os.system(pull_icons_command)
-
-            pull_acbridge_command = "adb pull /storage/emulated/0/.adac/.acbridge ./tools/ACBridge/acbridge"
-            os.system(pull_acbridge_command)
-
-            pull_sizes_command = "adb pull /storage/emulated/0/.adac/.sizes ./tools/ACBridge/sizes"
-            os.system(pull_sizes_command)
-
-            with zipfile.ZipFile("./tools/ACBridge/icons.zip", "r") as zip_ref:
-                zip_ref.extractall(icons_destination_path)
-
+        async def run():
+            try:
+                result = await services.update_acbridge(await services.active_device())
+            except (subprocess.CalledProcessError, OSError) as e:
+                messagebox.showerror("Update Data", f"Error updating ACBridge data: {e}")
+                return
             self.refresh_package_list()
-            messagebox.showinfo("Update Data", "Data has been updated successfully!")
+            messagebox.showinfo("Update Data", f"Data has been updated successfully ({result.summary()})!")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Update ACBridge data", serial=device_selection.active(wait=False), key="acbridge", lane=TRANSFER)
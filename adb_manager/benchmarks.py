@@ -0,0 +1,637 @@
+# benchmarks.py
+"""Benchmarks that run against the fake ADB server.
+
+Run them all with `python -m adb_manager.benchmarks`, or pass benchmark
+names to run a subset.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from .adb_client import AdbClient
+from .aio import AsyncAdbClient, EventLoopThread, gather_devices
+from .devices import DEVICE_INFO_PROPERTIES, get_device_properties, invalidate_device_properties
+from .fake_adb import FakeAdbServer, FakeDevice
+from .fleet import DeviceResult, FleetResult
+from .dedup import ObjectStore
+from .listing import ListingCache, RemoteEntry, iter_directory, list_directory
+from .mirror import mirror
+from .tasks import TaskExecutor
+from .ui_dispatcher import UiDispatcher
+from .transfer import pull, push_many
+
+
+def _thread_fan_out(action, serials, workers=8):
+    """Call `action(serial)` for every serial on a thread pool; the baseline the coroutines are compared with."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def call(serial):
+        begin = time.perf_counter()
+        try:
+            value = action(serial)
+        except Exception as e:
+            return DeviceResult(serial, error=e, seconds=time.perf_counter() - begin)
+        return DeviceResult(serial, value=value, seconds=time.perf_counter() - begin)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(call, serials))
+    return FleetResult(results, time.perf_counter() - started)
+
+
+def _report(name, seconds, count, extra=""):
+    per_call = seconds / count * 1000 if count else 0.0
+    print(f"{name:<36} {count:>6} calls  {seconds:8.3f} s  {per_call:8.3f} ms/call  {extra}")
+
+
+def bench_shell(iterations=200):
+    """Shell round trips: socket client vs. forking the `adb` binary."""
+    with FakeAdbServer([FakeDevice("emulator-5554")]) as server:
+        client = AdbClient(port=server.port)
+        client.run("true")  # warm the features cache
+        start = time.perf_counter()
+        for _ in range(iterations):
+            client.run("echo ok")
+        _report("shell via socket client", time.perf_counter() - start, iterations)
+
+        adb_path = shutil.which(client.adb_path)
+        if adb_path is None:
+            print(f"{'shell via adb subprocess':<36} skipped: `{client.adb_path}` not found on PATH")
+            return
+        count = max(iterations // 10, 1)
+        start = time.perf_counter()
+        for _ in range(count):
+            subprocess.run([adb_path, "-P", str(server.port), "shell", "echo", "ok"], capture_output=True)
+        _report("shell via adb subprocess", time.perf_counter() - start, count)
+        start = time.perf_counter()
+        for _ in range(count):
+            subprocess.run(f"{adb_path} -P {server.port} shell echo ok", shell=True, capture_output=True)
+        _report("shell via adb subprocess (sh -c)", time.perf_counter() - start, count)
+
+
+def bench_sync_stat(iterations=1000):
+    """Pooled sync session: STAT requests reuse one connection."""
+    with FakeAdbServer([FakeDevice("emulator-5554")]) as server:
+        client = AdbClient(port=server.port)
+        client.stat("/sdcard")
+        start = time.perf_counter()
+        for _ in range(iterations):
+            client.stat("/sdcard")
+        _report("sync STAT (pooled session)", time.perf_counter() - start, iterations,
+                f"connections opened: {server.stats['sync']}")
+
+
+def bench_device_info(iterations=20, latency=0.005):
+    """Tools page device info: one getprop per key vs. one cached getprop dump."""
+    with FakeAdbServer([FakeDevice("emulator-5554", latency=latency)]) as server:
+        client = AdbClient(port=server.port)
+        client.features("emulator-5554")
+
+        before = server.stats["round_trips"]
+        start = time.perf_counter()
+        for _ in range(iterations):
+            {field: client.run(f"getprop {key}", serial="emulator-5554").stdout.strip()
+             for field, key in DEVICE_INFO_PROPERTIES}
+        _report("device info, getprop per key", time.perf_counter() - start, iterations,
+                f"round trips: {server.stats['round_trips'] - before}")
+
+        before = server.stats["round_trips"]
+        start = time.perf_counter()
+        for _ in range(iterations):
+            invalidate_device_properties("emulator-5554")
+            get_device_properties("emulator-5554", client=client).as_info()
+        _report("device info, one getprop dump", time.perf_counter() - start, iterations,
+                f"round trips: {server.stats['round_trips'] - before}")
+
+        before = server.stats["round_trips"]
+        start = time.perf_counter()
+        for _ in range(iterations):
+            get_device_properties("emulator-5554", client=client).as_info()
+        _report("device info, cached snapshot", time.perf_counter() - start, iterations,
+                f"round trips: {server.stats['round_trips'] - before}")
+        invalidate_device_properties("emulator-5554")
+
+
+def bench_fleet(device_count=20, latency=0.02, rounds=3):
+    """Toggle Wi-Fi on a rack of simulated devices: one at a time vs. a thread per device in flight."""
+    devices = [FakeDevice(f"rack-{index:02d}", latency=latency) for index in range(device_count)]
+    with FakeAdbServer(devices) as server:
+        client = AdbClient(port=server.port)
+        serials = [device.serial for device in devices]
+        for serial in serials:
+            client.features(serial)
+
+        def toggle(serial):
+            return client.check_output("svc wifi enable", serial=serial)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for serial in serials:
+                toggle(serial)
+        seconds = time.perf_counter() - start
+        _report("fleet toggle, sequential", seconds, rounds * device_count,
+                f"{rounds * device_count / seconds:7.1f} devices/s")
+
+        for workers in (4, 8, device_count):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                result = _thread_fan_out(toggle, serials, workers)
+            seconds = time.perf_counter() - start
+            _report(f"fleet toggle, {workers} workers", seconds, rounds * device_count,
+                    f"{rounds * device_count / seconds:7.1f} devices/s  ({len(result.succeeded)}/{len(result)} ok)")
+
+
+def bench_transfer(file_count=24, latency=0.01, bandwidth=20 * 1024 * 1024):
+    """Pull and push a mixed-size tree: one file at a time vs. the transfer scheduler.
+
+    The fake device sleeps `latency` per RECV/SEND and caps every sync
+    stream at `bandwidth` bytes/s, like adbd does over USB.
+    """
+    device = FakeDevice("emulator-5554", bandwidth=bandwidth)
+    sizes = [4 * 1024 * 1024] + [256 * 1024] * (file_count // 2) + [16 * 1024] * (file_count - 1 - file_count // 2)
+    for index, size in enumerate(sizes):
+        device.add_file(f"/sdcard/DCIM/file-{index:03d}.bin", bytes(size))
+    total_mb = sum(sizes) / (1024 * 1024)
+    with FakeAdbServer([device]) as server, tempfile.TemporaryDirectory() as local:
+        client = AdbClient(port=server.port)
+        client.features("emulator-5554")
+        device.latency = latency  # Only transfers pay the per-file latency
+
+        start = time.perf_counter()
+        client.pull("/sdcard/DCIM", os.path.join(local, "sequential"), serial="emulator-5554")
+        seconds = time.perf_counter() - start
+        _report("pull, sequential (adb pull)", seconds, len(sizes), f"{total_mb / seconds:7.2f} MB/s")
+        for workers in (1, 4, 8):
+            start = time.perf_counter()
+            pull("/sdcard/DCIM", os.path.join(local, f"parallel-{workers}"), serial="emulator-5554",
+                 resume=False, client=client, workers=workers)
+            seconds = time.perf_counter() - start
+            _report(f"pull, scheduler {workers} worker(s)", seconds, len(sizes), f"{total_mb / seconds:7.2f} MB/s")
+
+        start = time.perf_counter()
+        client.push(os.path.join(local, "sequential"), "/sdcard/up-sequential", serial="emulator-5554")
+        seconds = time.perf_counter() - start
+        _report("push, sequential (adb push)", seconds, len(sizes), f"{total_mb / seconds:7.2f} MB/s")
+        for workers in (1, 4, 8):
+            start = time.perf_counter()
+            push_many([(os.path.join(local, "sequential"), f"/sdcard/up-{workers}")], serial="emulator-5554",
+                      client=client, workers=workers)
+            seconds = time.perf_counter() - start
+            _report(f"push, scheduler {workers} worker(s)", seconds, len(sizes), f"{total_mb / seconds:7.2f} MB/s")
+
+
+def bench_mirror(file_count=2000, file_size=32 * 1024, latency=0.002, bandwidth=20 * 1024 * 1024):
+    """Download All of an unchanged /sdcard: full pull vs. mirror re-sync."""
+    device = FakeDevice("emulator-5554", bandwidth=bandwidth)
+    for index in range(file_count):
+        device.add_file(f"/sdcard/DCIM/{index % 40:02d}/IMG_{index:05d}.jpg", bytes(file_size), mtime=1700000000 + index)
+    with FakeAdbServer([device]) as server, tempfile.TemporaryDirectory() as local:
+        client = AdbClient(port=server.port)
+        client.features("emulator-5554")
+        device.latency = latency
+
+        start = time.perf_counter()
+        pull("/sdcard/", os.path.join(local, "full"), serial="emulator-5554", resume=False, client=client)
+        _report("download all, full pull", time.perf_counter() - start, 1, f"{file_count} files")
+
+        result = mirror("/sdcard/", os.path.join(local, "mirror"), serial="emulator-5554", client=client)
+        for index in range(5):
+            device.add_file(f"/sdcard/DCIM/new/IMG_{index}.jpg", bytes(file_size))
+        start = time.perf_counter()
+        result = mirror("/sdcard/", os.path.join(local, "mirror"), serial="emulator-5554", client=client)
+        _report("download all, mirror re-sync", time.perf_counter() - start, 1, result.summary())
+
+
+def bench_dedup(device_count=5, file_count=40, file_size=256 * 1024, bandwidth=20 * 1024 * 1024):
+    """Download All on identical phones: plain mirror vs. mirror through the object store."""
+    devices = [FakeDevice(f"rack-{index:02d}", bandwidth=bandwidth) for index in range(device_count)]
+    for device in devices:
+        for index in range(file_count):
+            device.add_file(f"/sdcard/Ringtones/tone-{index:03d}.ogg", bytes([index]) * file_size, mtime=1700000000)
+    with FakeAdbServer(devices) as server, tempfile.TemporaryDirectory() as local:
+        client = AdbClient(port=server.port)
+        for label, store in (("plain", None), ("object store", ObjectStore(os.path.join(local, ".objects")))):
+            before = server.stats["sync:RECV"]
+            start = time.perf_counter()
+            for device in devices:
+                mirror("/sdcard/", os.path.join(local, label, device.serial), serial=device.serial, client=client, store=store)
+            seconds = time.perf_counter() - start
+            _report(f"download all x{device_count}, {label}", seconds, device_count,
+                    f"files transferred: {server.stats['sync:RECV'] - before}")
+        objects, size = ObjectStore(os.path.join(local, ".objects")).usage()
+        print(f"{'':<36} object store: {objects} objects, {size / (1024 * 1024):.2f} MB for "
+              f"{device_count * file_count * file_size / (1024 * 1024):.2f} MB of device data")
+
+
+def bench_listing(folder_count=10, latency=0.01, rounds=20):
+    """File manager navigation into a subfolder and back: device listing vs. listing cache."""
+    device = FakeDevice("emulator-5554")
+    for index in range(folder_count):
+        for child in range(50):
+            device.add_file(f"/sdcard/Folder{index:02d}/file-{child:03d}.txt", b"x")
+    with FakeAdbServer([device]) as server:
+        client = AdbClient(port=server.port)
+        client.features("emulator-5554")
+        device.latency = latency
+        paths = [f"/sdcard/Folder{index % folder_count:02d}" for index in range(rounds)]
+
+        start = time.perf_counter()
+        for path in paths:
+            list_directory(path, "emulator-5554", client)
+            list_directory("/sdcard", "emulator-5554", client)
+        _report("navigate in/back, no cache", time.perf_counter() - start, rounds * 2)
+
+        cache = ListingCache(client)
+        cache.prefetch("/sdcard", cache.get("/sdcard", "emulator-5554"), "emulator-5554", limit=folder_count)
+        time.sleep(folder_count * latency * 3)  # Let the prefetch thread finish
+        before = server.stats["round_trips"]
+        start = time.perf_counter()
+        for path in paths:
+            cache.get(path, "emulator-5554")
+            cache.get("/sdcard", "emulator-5554")
+        _report("navigate in/back, cache + prefetch", time.perf_counter() - start, rounds * 2,
+                f"round trips: {server.stats['round_trips'] - before}")
+
+
+def bench_listing_stream(entry_count=20000, bandwidth=2 * 1024 * 1024):
+    """A big folder over a slow (Wi-Fi) link: first rows from the streaming listing vs. the full listing."""
+    device = FakeDevice("192.168.1.20:5555")
+    for index in range(entry_count):
+        device.add_file(f"/sdcard/DCIM/Camera/IMG_{index:06d}.jpg", b"")
+    with FakeAdbServer([device]) as server:
+        client = AdbClient(port=server.port)
+        client.features(device.serial)
+        device.bandwidth = bandwidth
+
+        start = time.perf_counter()
+        list_directory("/sdcard/DCIM/Camera", device.serial, client)
+        _report("full listing before first row", time.perf_counter() - start, 1, f"{entry_count} entries")
+
+        start = time.perf_counter()
+        first = None
+        for batch in iter_directory("/sdcard/DCIM/Camera", device.serial, client):
+            if first is None:
+                first = time.perf_counter() - start
+        _report("streaming listing, first batch", first, 1, f"complete after {time.perf_counter() - start:.3f} s")
+
+
+def bench_tree(entry_count=100000):
+    """Time to first paint of a 100k-entry folder: every row as a Tk item vs. the virtual tree."""
+    import stat
+    import tkinter as tk
+    from tkinter import ttk
+    from .virtual_tree import VirtualTreeview
+
+    entries = [RemoteEntry(f"IMG_{index:06d}.jpg", stat.S_IFREG | 0o660, 3 * 1024 * 1024, 1700000000 + index)
+               for index in range(entry_count)]
+    start = time.perf_counter()
+    rows = sorted((entry for entry in entries if "img" in entry.name.lower()), key=lambda entry: entry.mtime, reverse=True)
+    rows.sort(key=lambda entry: not entry.is_dir)
+    _report("filter + sort backing array", time.perf_counter() - start, 1, f"{len(rows)} rows")
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"{'first paint':<36} skipped: no display ({e})")
+        return
+    root.withdraw()
+
+    def make_row(entry):
+        return entry.name, ("/sdcard/DCIM/Camera", f"{entry.size}", entry.modified()), None
+
+    for label, virtual in (("all rows as Tk items", False), ("virtual tree", True)):
+        tree = ttk.Treeview(root, columns=("Path", "Size", "Modified"))
+        tree.pack()
+        start = time.perf_counter()
+        if virtual:
+            VirtualTreeview(tree, make_row).set_rows(rows)
+        else:
+            for entry in rows:
+                text, values, _ = make_row(entry)
+                tree.insert("", "end", text=text, values=values)
+        root.update_idletasks()
+        _report(f"first paint, {label}", time.perf_counter() - start, 1, f"Tk items: {len(tree.get_children())}")
+        tree.destroy()
+    root.destroy()
+
+
+def bench_ui(line_count=100000, frame_interval=0.016):
+    """A command spewing output into the terminal: one UI event per line vs. coalesced, frame-budgeted events.
+
+    No Tk here; the drain loop stands in for the Tk main loop and the
+    callbacks for Text inserts (a fixed cost per call plus a cost per line).
+    """
+    import threading
+
+    def insert(text):
+        time.sleep(0.00002)  # Fixed cost of one widget update
+        sum(range(len(text) * 4))
+
+    for label, coalesce in (("event per line, unbounded frames", False), ("coalesced, frame budget", True)):
+        dispatcher = UiDispatcher(frame_budget=float("inf") if not coalesce else 0.008)
+        buffer, lock = [], threading.Lock()
+
+        def flush():
+            with lock:
+                text = "".join(buffer)
+                buffer.clear()
+            insert(text)
+
+        def worker():
+            for index in range(line_count):
+                line = f"line {index}\n"
+                if coalesce:
+                    with lock:
+                        buffer.append(line)
+                    dispatcher.post(flush, key="terminal")
+                else:
+                    dispatcher.post(insert, line)
+
+        thread = threading.Thread(target=worker)
+        start = time.perf_counter()
+        thread.start()
+        while thread.is_alive() or dispatcher.pending():
+            dispatcher.drain()
+            time.sleep(frame_interval)
+        thread.join()
+        _report(label, time.perf_counter() - start, 1,
+                f"{dispatcher.events} UI calls, max frame {dispatcher.max_frame * 1000:.1f} ms, "
+                f"max queue wait {dispatcher.max_latency * 1000:.1f} ms")
+
+
+def bench_tasks(clicks=60, refreshes=30, latency=0.02):
+    """Button mashing: a thread per click vs. the bounded task executor.
+
+    Volume key presses each need a run; repeated refreshes of the same
+    folder fold into one queued task. The peak counts concurrent shell
+    connections to the ADB server.
+    """
+    import threading
+
+    with FakeAdbServer([FakeDevice("emulator-5554", latency=latency)]) as server:
+        client = AdbClient(port=server.port)
+        client.run("true")
+        lock = threading.Lock()
+        gauge = {"now": 0, "peak": 0, "calls": 0}
+
+        def shell(command):
+            with lock:
+                gauge["now"] += 1
+                gauge["calls"] += 1
+                gauge["peak"] = max(gauge["peak"], gauge["now"])
+            try:
+                client.run(command)
+            finally:
+                with lock:
+                    gauge["now"] -= 1
+
+        clicks_in_order = ["input keyevent KEYCODE_VOLUME_UP"] * clicks + ["ls /sdcard"] * refreshes
+        for label, pooled in (("thread per click", False), ("task executor", True)):
+            gauge.update(now=0, peak=0, calls=0)
+            executor = TaskExecutor()
+            submitted = []
+            start = time.perf_counter()
+            for command in clicks_in_order:
+                if pooled:
+                    key = command if command.startswith("ls") else None
+                    submitted.append(executor.submit(shell, command, serial="emulator-5554", key=key))
+                else:
+                    thread = threading.Thread(target=shell, args=(command,))
+                    thread.start()
+                    submitted.append(thread)
+            for item in submitted:
+                item.wait() if pooled else item.join()
+            _report(label, time.perf_counter() - start, len(clicks_in_order),
+                    f"{gauge['calls']} adb calls, peak {gauge['peak']} at once")
+
+
+def bench_aio(device_count=50, commands=4, latency=0.05):
+    """Many device operations at once: a thread pool vs. coroutines on one loop thread."""
+    import threading
+
+    devices = [FakeDevice(f"rack-{index:02d}", latency=latency) for index in range(device_count)]
+    with FakeAdbServer(devices) as server:
+        serials = [device.serial for device in devices]
+        calls = device_count * commands
+
+        client = AdbClient(port=server.port)
+        for serial in serials:
+            client.features(serial)
+
+        peak_threads = [0]
+
+        def toggle(serial):
+            for _ in range(commands):
+                client.check_output("svc wifi enable", serial=serial)
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+
+        threads_before = threading.active_count()
+        start = time.perf_counter()
+        result = _thread_fan_out(toggle, serials)
+        _report("thread pool, 8 threads", time.perf_counter() - start, calls,
+                f"{len(result.succeeded)}/{len(result)} ok, +{peak_threads[0] - threads_before} threads")
+
+        async_client = AsyncAdbClient(port=server.port)
+        loop = EventLoopThread()
+
+        async def toggle_async(serial):
+            for _ in range(commands):
+                await async_client.check_output("svc wifi enable", serial=serial)
+
+        async def warm():
+            for serial in serials:
+                await async_client.features(serial)
+
+        loop.run(warm())
+        threads_before = threading.active_count()
+        start = time.perf_counter()
+        result = loop.run(gather_devices(toggle_async, serials))
+        _report("coroutines on one loop thread", time.perf_counter() - start, calls,
+                f"{len(result.succeeded)}/{len(result)} ok, +{threading.active_count() - threads_before} threads")
+
+
+def bench_thumbnails(package_count=400, visible=12, icon_size=192):
+    """The package list's icons: resizing every row's PNG per refresh vs. the thumbnail cache (cold, warm)."""
+    import tkinter as tk
+    from .icons import ThumbnailCache
+
+    try:
+        from PIL import Image, ImageTk
+    except ImportError:
+        print(f"{'thumbnails':<36} skipped: Pillow is not installed")
+        return
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"{'thumbnails':<36} skipped: no display ({e})")
+        return
+    root.withdraw()
+    workdir = tempfile.mkdtemp(prefix="adb-manager-bench-")
+    try:
+        source_dir = os.path.join(workdir, "icons")
+        os.makedirs(source_dir)
+        packages = [f"com.example.app{index:04d}" for index in range(package_count)]
+        for index, package in enumerate(packages):
+            Image.new("RGBA", (icon_size, icon_size), (index % 256, 80, 160, 255)).save(
+                os.path.join(source_dir, f"{package}.png"))
+
+        start = time.perf_counter()
+        images = []
+        for package in packages:
+            icon_path = os.path.join(source_dir, f"{package}.png")
+            if os.path.exists(icon_path):
+                images.append(ImageTk.PhotoImage(Image.open(icon_path).resize((50, 50))))
+        _report("refresh, resize every row", time.perf_counter() - start, package_count)
+
+        cache_dir = os.path.join(workdir, "thumbnails")
+        for label, cache in (("refresh, cache cold", ThumbnailCache(source_dir, cache_dir)),
+                             ("refresh, cache warm (new process)", ThumbnailCache(source_dir, cache_dir))):
+            start = time.perf_counter()
+            cache.scan()
+            for package in packages[:visible]:
+                if cache.has(package):
+                    cache.get(package)
+            cache.save_index()
+            _report(label, time.perf_counter() - start, visible,
+                    f"{cache.resized} resized, {cache.disk_hits} from disk")
+        start = time.perf_counter()
+        for package in packages[:visible]:
+            cache.get(package)
+        _report("refresh, cache in memory", time.perf_counter() - start, visible, f"{cache.memory_hits} memory hits")
+    finally:
+        root.destroy()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_search(package_count=2000, typed="whatsapp"):
+    """Search-as-you-type over the package list: a scan per keystroke vs. the trigram index."""
+    import random
+    import string
+    from .search_index import SearchIndex
+
+    rng = random.Random(1)
+    rows = [(f"com.{''.join(rng.choices(string.ascii_lowercase, k=8))}.{''.join(rng.choices(string.ascii_lowercase, k=6))}",
+             " ".join("".join(rng.choices(string.ascii_letters, k=rng.randint(3, 9))) for _ in range(2)))
+            for _ in range(package_count)]
+    rows.append(("com.whatsapp", "WhatsApp"))
+    queries = [typed[:length] for length in range(1, len(typed) + 1)]
+
+    start = time.perf_counter()
+    for query in queries:
+        matches = [row for row in rows if query in row[1].lower()]
+    _report("scan per keystroke (app name only)", time.perf_counter() - start, len(queries), f"{len(matches)} match")
+
+    start = time.perf_counter()
+    index = SearchIndex(rows, fields=lambda row: (row[1], row[0]))
+    _report("build trigram index", time.perf_counter() - start, 1, f"{len(index.trigrams)} trigrams")
+    start = time.perf_counter()
+    for query in queries:
+        matches = index.search(query)
+    _report("index per keystroke (names, fuzzy)", time.perf_counter() - start, len(queries),
+            f"{len(matches)} matches, first {matches[0][0]}")
+
+
+def bench_icon_extraction(icon_count=400, changed=2, icon_size=4096):
+    """Extracting the ACBridge icons.zip after an update: extractall vs. only the changed members."""
+    import zipfile
+    from .acbridge import extract_icons
+
+    workdir = tempfile.mkdtemp(prefix="adb-manager-bench-")
+    try:
+        zip_path = os.path.join(workdir, "icons.zip")
+        packages = [f"com.example.app{index:04d}.png" for index in range(icon_count)]
+
+        def write_zip(version):
+            with zipfile.ZipFile(zip_path, "w") as archive:
+                for index, name in enumerate(packages):
+                    stamp = version if index < changed else 0
+                    archive.writestr(name, bytes([index % 256, stamp]) * (icon_size // 2))
+
+        write_zip(0)
+        start = time.perf_counter()
+        with zipfile.ZipFile(zip_path, "r") as archive:
+            archive.extractall(os.path.join(workdir, "all"))
+        written = sum(info.file_size for info in zipfile.ZipFile(zip_path).infolist())
+        _report("extractall", time.perf_counter() - start, icon_count, f"{written} bytes written")
+
+        destination = os.path.join(workdir, "icons")
+        index_path = os.path.join(workdir, "icons.index.json")
+        for label, version in (("incremental, first update", 0), ("incremental, unchanged", 0),
+                               (f"incremental, {changed} changed", 1)):
+            write_zip(version)
+            start = time.perf_counter()
+            result = extract_icons(zip_path, destination, index_path)
+            _report(label, time.perf_counter() - start, icon_count, result.summary())
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_install(apk_count=10, device_count=10, apk_size=256 * 1024, latency=0.005):
+    """Installing a folder of APKs on many devices: one `install` at a time vs. the batch pipeline."""
+    import asyncio
+    from .install import InstallProgress
+    from .services import install_packages
+
+    workdir = tempfile.mkdtemp(prefix="adb-manager-bench-")
+    try:
+        paths = []
+        for index in range(apk_count):
+            path = os.path.join(workdir, f"app{index:02d}.apk")
+            with open(path, "wb") as file:
+                file.write(f"package=com.example.app{index:02d}\n".encode() + os.urandom(apk_size))
+            paths.append(path)
+        devices = [FakeDevice(f"emulator-{5554 + 2 * index}", latency=latency) for index in range(device_count)]
+        serials = [device.serial for device in devices]
+        with FakeAdbServer(devices) as server:
+            client = AdbClient(port=server.port)
+            start = time.perf_counter()
+            for serial in serials:
+                for path in paths:
+                    client.install(path, serial=serial)
+            _report("install one at a time", time.perf_counter() - start, apk_count * device_count)
+
+            progress = InstallProgress()
+            start = time.perf_counter()
+            result = asyncio.run(install_packages([workdir], serials, progress, client=client))
+            _report("batch install, devices in parallel", time.perf_counter() - start, apk_count * device_count,
+                    f"{len(result.succeeded)}/{len(result)} devices ok, {progress.done_bytes // (1024 * 1024)} MB pushed")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    "shell": bench_shell,
+    "sync_stat": bench_sync_stat,
+    "device_info": bench_device_info,
+    "fleet": bench_fleet,
+    "transfer": bench_transfer,
+    "mirror": bench_mirror,
+    "dedup": bench_dedup,
+    "listing": bench_listing,
+    "listing_stream": bench_listing_stream,
+    "tree": bench_tree,
+    "ui": bench_ui,
+    "tasks": bench_tasks,
+    "aio": bench_aio,
+    "thumbnails": bench_thumbnails,
+    "search": bench_search,
+    "icon_extraction": bench_icon_extraction,
+    "install": bench_install,
+}
+
+
+def main(argv=None):
+    names = (argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            return 2
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
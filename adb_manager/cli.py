@@ -0,0 +1,264 @@
+# cli.py
+"""Command-line front end for the device operations in services.py.
+
+    python -m adb_manager devices
+    python -m adb_manager -s emulator-5554 ls /sdcard
+    python -m adb_manager --all wifi off
+
+Commands that fan out (`shell`, radio toggles, `install`, `screenshot`)
+run on every device given with `-s` (or all online devices with
+`--all`); the others use the first one. Without `-s` the only online
+device is used.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+from . import services
+from .adb_client import adb
+from .aio import async_adb
+from .transfer import TransferProgress
+from .utils import format_size
+
+RADIO_COMMANDS = {
+    "wifi": ("svc wifi enable", "svc wifi disable"),
+    "bluetooth": ("svc bluetooth enable", "svc bluetooth disable"),
+    "data": ("svc data enable", "svc data disable"),
+    "airplane": ("cmd connectivity airplane-mode enable", "cmd connectivity airplane-mode disable"),
+}
+
+
+class CliError(Exception):
+    pass
+
+
+async def resolve_serials(args):
+    online = [serial for serial, state in await services.list_devices() if state == "device"]
+    if args.all:
+        serials = online
+    elif args.serial:
+        serials = args.serial
+    elif len(online) == 1:
+        serials = online
+    elif not online:
+        raise CliError("No device connected.")
+    else:
+        raise CliError(f"More than one device connected; pick one with -s ({', '.join(online)}).")
+    if not serials:
+        raise CliError("No device connected.")
+    return serials
+
+
+def print_fleet(result):
+    for device in result:
+        if device.ok:
+            value = device.value.strip() if isinstance(device.value, str) else device.value
+            print(f"{device.serial}: ok" + (f"\n{value}" if value else ""))
+        else:
+            print(f"{device.serial}: error: {device.error}", file=sys.stderr)
+    return 0 if result.ok else 1
+
+
+def print_transfer(progress, action):
+    print(f"{action} {progress.done_files} file(s), {format_size(progress.done_bytes)} "
+          f"at {format_size(progress.rate())}/s")
+
+
+async def cmd_devices(args, serials):
+    for serial, state in await services.list_devices():
+        print(f"{serial}\t{state}")
+    return 0
+
+
+async def cmd_info(args, serials):
+    for key, value in (await services.device_info(serials[0])).items():
+        print(f"{key.replace('_', ' ').title()}: {value}")
+    return 0
+
+
+async def cmd_ls(args, serials):
+    for entry in await services.list_dir(args.path, serials[0]):
+        kind = "d" if entry.is_dir else "l" if entry.is_link else "-"
+        print(f"{kind} {entry.size:>12} {entry.modified()} {entry.name}")
+    return 0
+
+
+async def cmd_pull(args, serials):
+    local_dir = args.output or await services.device_pull_path(serials[0])
+    progress = TransferProgress()
+    await services.pull_paths(args.paths, local_dir, serials[0], progress)
+    print_transfer(progress, "Pulled")
+    return 0
+
+
+async def cmd_push(args, serials):
+    progress = TransferProgress()
+    await services.push_paths(args.paths, args.destination, serials[0], progress)
+    print_transfer(progress, "Pushed")
+    return 0
+
+
+async def cmd_mirror(args, serials):
+    local_path = args.output or os.path.join(await services.device_pull_path(serials[0]), "sdcard")
+    result = await services.mirror_directory(args.path, local_path, serials[0], TransferProgress(), args.prune)
+    print(f"{local_path}: {result.summary()}")
+    return 0
+
+
+async def cmd_rm(args, serials):
+    await services.delete_paths(args.paths, serials[0])
+    return 0
+
+
+async def cmd_mkdir(args, serials):
+    await services.make_directory(args.path, serials[0])
+    return 0
+
+
+async def cmd_shell(args, serials):
+    return print_fleet(await services.run_on_devices(" ".join(args.shell_command), serials))
+
+
+async def cmd_radio(args, serials):
+    enable, disable = RADIO_COMMANDS[args.command]
+    return print_fleet(await services.run_on_devices(enable if args.state == "on" else disable, serials))
+
+
+async def cmd_ip(args, serials):
+    ip_address = await services.get_ip_address(serials[0])
+    if not ip_address:
+        raise CliError("Could not retrieve IP address. Ensure Wi-Fi is enabled.")
+    print(ip_address)
+    return 0
+
+
+async def cmd_connect(args, serials):
+    if not await services.connect_tcpip(args.ip_address, serials[0]):
+        raise CliError("Failed to connect to ADB over TCP/IP.")
+    print(f"Connected to {args.ip_address}:5555")
+    return 0
+
+
+async def cmd_disconnect(args, serials):
+    print(await services.disconnect_tcpip())
+    return 0
+
+
+async def cmd_reboot(args, serials):
+    await services.reboot(serials[0], args.mode)
+    return 0
+
+
+async def cmd_screenshot(args, serials):
+    return print_fleet(await services.take_screenshots(serials))
+
+
+async def cmd_packages(args, serials):
+    table, _diff = await services.inventory_packages(serials[0])
+    for package in sorted(table, key=lambda package: package["name"]):
+        state = "enabled" if package["enabled"] else "disabled"
+        kind = "system" if package["system"] else "user"
+        print(f"{package['name']}\t{package['version_name'] or package['version_code']}\t{state}\t{kind}\t"
+              f"{format_size(package['size'])}")
+    return 0
+
+
+async def cmd_acbridge(args, serials):
+    print((await services.update_acbridge(serials[0])).summary())
+    return 0
+
+
+async def cmd_package(args, serials):
+    actions = {
+        "enable": lambda: services.set_package_enabled(args.package, True, serials[0]),
+        "disable": lambda: services.set_package_enabled(args.package, False, serials[0]),
+        "clear": lambda: services.clear_package_data(args.package, serials[0]),
+        "uninstall": lambda: services.uninstall_package(args.package, serials[0]),
+        "launch": lambda: services.launch_app(args.package, serials[0]),
+    }
+    await actions[args.command]()
+    return 0
+
+
+async def cmd_install(args, serials):
+    return print_fleet(await services.install_packages(args.paths, serials))
+
+
+async def cmd_extract(args, serials):
+    extracted, missing, stats = await services.extract_apks(args.packages, serials[0], args.output)
+    for package, local_paths in extracted.items():
+        print(f"{package}: " + ", ".join(local_paths))
+    if stats.linked_files:
+        print(stats.summary())
+    for package in missing:
+        print(f"{package}: no APK found", file=sys.stderr)
+    return 1 if missing else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m adb_manager", description="Manage Android devices over ADB without the GUI.")
+    parser.add_argument("-s", "--serial", action="append", help="device to use; repeat to fan out to several")
+    parser.add_argument("--all", action="store_true", help="use every online device")
+    parser.add_argument("-H", "--host", help="ADB server host")
+    parser.add_argument("-P", "--port", type=int, help="ADB server port")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def command(name, handler, help, needs_device=True):
+        sub = commands.add_parser(name, help=help)
+        sub.set_defaults(handler=handler, needs_device=needs_device)
+        return sub
+
+    command("devices", cmd_devices, "list devices", needs_device=False)
+    command("info", cmd_info, "show device properties")
+    command("ls", cmd_ls, "list a remote folder").add_argument("path", nargs="?", default="/sdcard/")
+    sub = command("pull", cmd_pull, "copy remote files or folders to this machine")
+    sub.add_argument("paths", nargs="+")
+    sub.add_argument("-o", "--output", help="local folder (default: the device folder under device-pull)")
+    sub = command("push", cmd_push, "copy local files or folders to the device")
+    sub.add_argument("paths", nargs="+")
+    sub.add_argument("destination")
+    sub = command("mirror", cmd_mirror, "bring a local copy of a remote folder up to date")
+    sub.add_argument("path", nargs="?", default="/sdcard/")
+    sub.add_argument("-o", "--output")
+    sub.add_argument("--prune", action="store_true", help="delete local files that were removed on the device")
+    command("rm", cmd_rm, "delete remote files or folders").add_argument("paths", nargs="+")
+    command("mkdir", cmd_mkdir, "create a remote folder").add_argument("path")
+    command("shell", cmd_shell, "run a shell command").add_argument("shell_command", nargs=argparse.REMAINDER)
+    for name in RADIO_COMMANDS:
+        command(name, cmd_radio, f"turn {name} on or off").add_argument("state", choices=("on", "off"))
+    command("ip", cmd_ip, "show the Wi-Fi IP address")
+    command("connect", cmd_connect, "switch to ADB over TCP/IP and connect").add_argument("ip_address")
+    command("disconnect", cmd_disconnect, "disconnect ADB over TCP/IP", needs_device=False)
+    command("reboot", cmd_reboot, "reboot the device").add_argument("mode", nargs="?", default="",
+                                                                      choices=("", "recovery", "bootloader"))
+    command("screenshot", cmd_screenshot, "save a screenshot into the device folder")
+    command("packages", cmd_packages, "list installed packages with version, state, kind and size")
+    command("acbridge", cmd_acbridge, "update app names and icons through the ACBridge companion app")
+    for name in ("enable", "disable", "clear", "uninstall", "launch"):
+        command(name, cmd_package, f"{name} a package").add_argument("package")
+    command("install", cmd_install, "install APKs, split bundles (.apks/.xapk/.apkm) or folders of them").add_argument(
+        "paths", nargs="+")
+    sub = command("extract", cmd_extract, "save the base and split APKs of packages")
+    sub.add_argument("packages", nargs="+")
+    sub.add_argument("-o", "--output", help="local folder (default: Downloadapk in the device folder)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    for client in (adb, async_adb):
+        if args.host:
+            client.host = args.host
+        if args.port:
+            client.port = args.port
+
+    async def run():
+        serials = await resolve_serials(args) if args.needs_device else []
+        return await args.handler(args, serials)
+
+    try:
+        return asyncio.run(run())
+    except (CliError, ValueError, OSError, subprocess.CalledProcessError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
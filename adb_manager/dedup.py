@@ -0,0 +1,170 @@
+# dedup.py
+import hashlib
+import os
+import shlex
+import shutil
+import stat
+import threading
+from .adb_client import adb
+from .transfer import replace_file
+
+OBJECTS_DIR = "./device-pull/.objects"
+HASH_BATCH = 64  # Paths per device-side sha256sum call
+HASH_CHUNK_SIZE = 1024 * 1024
+OBJECT_MODE = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH  # Objects are read-only, so no device tree can edit the shared content
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remote_sha256(paths, serial=None, client=adb, on_batch=None):
+    """Hash remote files on the device with `sha256sum`; returns {path: hex digest}.
+
+    Paths are hashed in batches so a big tree costs a handful of round
+    trips. Files the device cannot hash are simply missing from the
+    result, and a device without `sha256sum` yields an empty dict.
+    `on_batch(done, total)` is called after every batch.
+    """
+    digests = {}
+    paths = list(paths)
+    for index in range(0, len(paths), HASH_BATCH):
+        batch = paths[index:index + HASH_BATCH]
+        result = client.run("sha256sum " + " ".join(shlex.quote(path) for path in batch), serial=serial)
+        if result.returncode == 127:
+            return {}
+        for line in result.stdout.splitlines():
+            digest, _, path = line.partition("  ")
+            if len(digest) == 64 and path in batch:
+                digests[path] = digest
+        if on_batch is not None:
+            on_batch(index + len(batch), len(paths))
+    return digests
+
+
+class DedupStats:
+    """What the store saved during one pull."""
+
+    def __init__(self):
+        self.linked_files = 0
+        self.linked_bytes = 0  # Not transferred: the object was already in the store
+        self.duplicate_bytes = 0  # Transferred, but stored once on disk
+        self._lock = threading.Lock()
+
+    def add_linked(self, size):
+        with self._lock:
+            self.linked_files += 1
+            self.linked_bytes += size
+
+    def add_duplicate(self, size):
+        with self._lock:
+            self.duplicate_bytes += size
+
+    def summary(self):
+        mb = 1024 * 1024
+        return (f"{self.linked_files} file(s) ({self.linked_bytes / mb:.2f} MB) reused without transfer, "
+                f"{(self.linked_bytes + self.duplicate_bytes) / mb:.2f} MB of disk saved")
+
+
+class ObjectStore:
+    """Content-addressed copy of everything pulled from any device.
+
+    Objects are named by their SHA-256 and the per-device trees hard-link
+    to them, so identical files pulled from many devices take up disk space
+    once. Pulls replace files rather than writing into them, so a changed
+    file never alters the shared object. Where hard links are not possible
+    the file is copied instead.
+
+    A link shares the object's inode, so nothing may change a linked
+    file's metadata either: objects are made read-only, and a file keeps
+    the mtime of whichever device stored the object first. Mirror keeps
+    each device's mtime in its manifest instead.
+    """
+
+    def __init__(self, root=OBJECTS_DIR):
+        self.root = root
+        self._sizes = None  # Sizes of the stored objects; only files of one of these sizes can be in the store
+        self._lock = threading.Lock()
+
+    def object_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def has(self, digest):
+        return os.path.exists(self.object_path(digest))
+
+    def sizes(self):
+        """The sizes of all stored objects, read from disk once and kept up to date by add()."""
+        with self._lock:
+            if self._sizes is None:
+                self._sizes = set()
+                for dirpath, _, filenames in os.walk(self.root):
+                    for name in filenames:
+                        try:
+                            self._sizes.add(os.path.getsize(os.path.join(dirpath, name)))
+                        except OSError:
+                            pass
+            return self._sizes
+
+    def may_hold(self, size):
+        """False when no stored object has this size, so hashing the file cannot find a match."""
+        return size in self.sizes()
+
+    def _note_size(self, size):
+        with self._lock:
+            if self._sizes is not None:
+                self._sizes.add(size)
+
+    def link(self, digest, local_path):
+        """Make `local_path` a hard link to the stored object."""
+        try:
+            if os.path.samefile(self.object_path(digest), local_path):
+                return  # Already linked; renaming a link over itself would leave the temporary behind
+        except OSError:
+            pass
+        temporary = local_path + ".link"
+        try:
+            os.link(self.object_path(digest), temporary)
+        except OSError:
+            shutil.copyfile(self.object_path(digest), temporary)
+        replace_file(temporary, local_path)
+
+    def add(self, local_path, digest=None):
+        """Put a freshly pulled file into the store and link it back.
+
+        Returns (digest, duplicate): the file's SHA-256, hashed here unless
+        `digest` was given, and True if the store already held the same
+        content, i.e. the local copy was a duplicate.
+        """
+        digest = digest or file_sha256(local_path)
+        object_path = self.object_path(digest)
+        if os.path.exists(object_path):
+            self.link(digest, local_path)
+            return digest, True
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        try:
+            os.link(local_path, object_path)
+        except FileExistsError:
+            self.link(digest, local_path)  # Another worker stored it first
+            return digest, True
+        except OSError:
+            shutil.copyfile(local_path, object_path)
+        os.chmod(object_path, OBJECT_MODE)
+        self._note_size(os.path.getsize(object_path))
+        return digest, False
+
+    def usage(self):
+        """Return (object count, bytes) held by the store."""
+        count = size = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                count += 1
+                size += os.path.getsize(os.path.join(dirpath, name))
+        return count, size
+
+
+object_store = ObjectStore()
+
@@ -0,0 +1,89 @@
+# device_selector.py
+import tkinter as tk
+from tkinter import ttk
+from .devices import device_registry, device_selection
+from .ui_dispatcher import ui
+
+
+class DeviceSelector(ttk.Frame):
+    """Toolbar to choose the active device and the devices actions fan out to."""
+
+    def __init__(self, parent, registry=device_registry, selection=device_selection):
+        super().__init__(parent)
+        self.registry = registry
+        self.selection = selection
+        self.serials = []
+        self.target_vars = {}
+
+        ttk.Label(self, text="Device:").pack(side=tk.LEFT, padx=5)
+        self.device_combo = ttk.Combobox(self, state="readonly", width=40)
+        self.device_combo.pack(side=tk.LEFT, padx=5)
+        self.device_combo.bind("<<ComboboxSelected>>", self.on_device_selected)
+
+        self.targets_button = ttk.Menubutton(self, text="Targets: active device")
+        self.targets_menu = tk.Menu(self.targets_button, tearoff=False)
+        self.targets_button["menu"] = self.targets_menu
+        self.targets_button.pack(side=tk.LEFT, padx=5)
+
+        self.registry.add_listener(lambda added, removed: ui.post(self.reload, key=("device-selector", id(self))))
+        self.registry.start()
+        self.reload()
+
+    def device_label(self, entry):
+        label = entry.serial
+        if entry.model:
+            label += f" ({entry.model})"
+        if not entry.online:
+            label += f" [{entry.state}]"
+        return label
+
+    def reload(self):
+        """Rebuild the device list from the registry without blocking the UI."""
+        entries = self.registry.devices(wait=False)
+        self.serials = [entry.serial for entry in entries]
+        self.device_combo["values"] = [self.device_label(entry) for entry in entries]
+        active = self.selection.active(wait=False)
+        if active in self.serials:
+            self.device_combo.current(self.serials.index(active))
+        else:
+            self.device_combo.set("No device connected")
+
+        self.targets_menu.delete(0, tk.END)
+        self.targets_menu.add_command(label="All online devices", command=self.select_all_targets)
+        self.targets_menu.add_command(label="Active device only", command=self.clear_targets)
+        self.targets_menu.add_separator()
+        previous = {serial for serial, var in self.target_vars.items() if var.get()}
+        self.target_vars = {}
+        for entry in entries:
+            var = tk.BooleanVar(value=entry.serial in previous)
+            self.target_vars[entry.serial] = var
+            self.targets_menu.add_checkbutton(
+                label=self.device_label(entry), variable=var,
+                state=tk.NORMAL if entry.online else tk.DISABLED,
+                command=self.on_targets_changed,
+            )
+        self.on_targets_changed()
+
+    def on_device_selected(self, event=None):
+        index = self.device_combo.current()
+        if 0 <= index < len(self.serials):
+            self.selection.set_active(self.serials[index])
+
+    def select_all_targets(self):
+        online = set(self.registry.serials(online_only=True, wait=False))
+        for serial, var in self.target_vars.items():
+            var.set(serial in online)
+        self.on_targets_changed()
+
+    def clear_targets(self):
+        for var in self.target_vars.values():
+            var.set(False)
+        self.on_targets_changed()
+
+    def on_targets_changed(self):
+        targets = [serial for serial, var in self.target_vars.items() if var.get()]
+        self.selection.set_targets(targets)
+        if targets:
+            self.targets_button.config(text=f"Targets: {len(targets)} device(s)")
+        else:
+            self.targets_button.config(text="Targets: active device")
@@ -0,0 +1,331 @@
+# devices.py
+import threading
+import time
+from .adb_client import AdbError, adb
+
+PROPERTIES_TTL = 60.0  # Seconds a getprop snapshot stays fresh
+
+# Device info field -> system property, in the order the Tools page shows them
+DEVICE_INFO_PROPERTIES = (
+    ("model", "ro.product.model"),
+    ("brand", "ro.product.vendor.brand"),
+    ("chipset", "ro.product.board"),
+    ("android_version", "ro.build.version.release"),
+    ("security_patch", "ro.build.version.security_patch"),
+    ("device", "ro.product.vendor.device"),
+    ("sim", "gsm.sim.operator.alpha"),
+    ("encryption_state", "ro.crypto.state"),
+    ("build_date", "ro.build.date"),
+    ("sdk_version", "ro.build.version.sdk"),
+    ("wifi_interface", "wifi.interface"),
+    ("abi", "ro.product.cpu.abi"),
+)
+
+
+def parse_getprop(output):
+    """Parse `getprop` output (`[key]: [value]` lines) into a dict.
+
+    Values can span several lines, so a property is only closed once a
+    line ends with `]`.
+    """
+    props = {}
+    key, value_lines = None, []
+    for line in output.splitlines():
+        if key is None:
+            if not line.startswith("[") or "]: [" not in line:
+                continue
+            key, _, rest = line[1:].partition("]: [")
+            value_lines = [rest]
+        else:
+            value_lines.append(line)
+        if value_lines[-1].endswith("]"):
+            value_lines[-1] = value_lines[-1][:-1]
+            props[key] = "\n".join(value_lines)
+            key = None
+    return props
+
+
+class DeviceProperties:
+    """A snapshot of a device's system properties taken from one `getprop` call."""
+
+    def __init__(self, serial, props, taken_at=None):
+        self.serial = serial
+        self.props = props
+        self.taken_at = time.monotonic() if taken_at is None else taken_at
+
+    def get(self, key, default=""):
+        return self.props.get(key, default)
+
+    @property
+    def model(self):
+        return self.get("ro.product.model")
+
+    @property
+    def brand(self):
+        return self.get("ro.product.vendor.brand") or self.get("ro.product.brand")
+
+    @property
+    def android_version(self):
+        return self.get("ro.build.version.release")
+
+    @property
+    def sdk_version(self):
+        try:
+            return int(self.get("ro.build.version.sdk"))
+        except ValueError:
+            return None
+
+    @property
+    def abi(self):
+        return self.get("ro.product.cpu.abi")
+
+    def age(self):
+        return time.monotonic() - self.taken_at
+
+    def as_info(self):
+        """Return the field dict shown on the Tools page."""
+        return {field: self.get(key) for field, key in DEVICE_INFO_PROPERTIES}
+
+
+_properties_cache = {}
+_properties_lock = threading.Lock()
+
+
+def get_device_properties(device_serial, max_age=PROPERTIES_TTL, client=adb):
+    """Return a DeviceProperties snapshot, re-reading `getprop` once it is older than `max_age`."""
+    with _properties_lock:
+        snapshot = _properties_cache.get(device_serial)
+    if snapshot is not None and snapshot.age() < max_age:
+        return snapshot
+    output = client.run("getprop", serial=device_serial).stdout
+    snapshot = DeviceProperties(device_serial, parse_getprop(output))
+    if snapshot.props:
+        with _properties_lock:
+            _properties_cache[device_serial] = snapshot
+    return snapshot
+
+
+def invalidate_device_properties(device_serial=None):
+    """Drop the cached snapshot for one device, or for all of them."""
+    with _properties_lock:
+        if device_serial is None:
+            _properties_cache.clear()
+        else:
+            _properties_cache.pop(device_serial, None)
+
+
+class DeviceEntry:
+    """One device as reported by the ADB server (`adb devices -l`)."""
+
+    def __init__(self, serial, state, transport_id=None, product=None, device=None):
+        self.serial = serial
+        self.state = state
+        self.transport_id = transport_id
+        self.product = product
+        self.device = device
+        self.model = None  # Resolved from the getprop snapshot once the device is online
+
+    @property
+    def online(self):
+        return self.state == "device"
+
+    def __repr__(self):
+        return f"DeviceEntry({self.serial!r}, {self.state!r}, model={self.model!r}, transport_id={self.transport_id!r})"
+
+
+def parse_device_list(output):
+    """Parse `adb devices` / `adb devices -l` output into DeviceEntry objects."""
+    entries = []
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 2 or line.startswith("List of devices"):
+            continue
+        fields = dict(part.split(":", 1) for part in parts[2:] if ":" in part)
+        transport_id = fields.get("transport_id")
+        entries.append(DeviceEntry(
+            parts[0], parts[1],
+            transport_id=int(transport_id) if transport_id and transport_id.isdigit() else None,
+            product=fields.get("product"),
+            device=fields.get("device"),
+        ))
+    return entries
+
+
+class DeviceRegistry:
+    """Process-wide view of attached devices, kept current by `host:track-devices`.
+
+    The ADB server pushes the full device list whenever something is
+    plugged in, unplugged or changes state, so lookups never need a round
+    trip. Devices that disappear are dropped at once, together with their
+    pooled sync sessions and cached properties.
+    """
+
+    def __init__(self, client=adb, reconnect_delay=1.0):
+        self.client = client
+        self.reconnect_delay = reconnect_delay
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._listeners = []
+        self._thread = None
+        self._connection = None
+        self._stopped = False
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._track, name="adb-track-devices", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        connection = self._connection
+        if connection is not None:
+            connection.close()
+        with self._lock:
+            self._thread = None
+
+    def add_listener(self, callback):
+        """Call `callback(added, removed)` (serial lists) from the tracker thread on every change."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _track(self):
+        while not self._stopped:
+            try:
+                self._connection = self.client.connect()
+                try:
+                    self._connection.send_request("host:track-devices-l")
+                except AdbError:
+                    self._connection.close()
+                    self._connection = self.client.connect()
+                    self._connection.send_request("host:track-devices")
+                while not self._stopped:
+                    self._update(parse_device_list(self._connection.read_string()))
+            except (OSError, AdbError):
+                if not self._stopped:
+                    self._update([])
+                    time.sleep(self.reconnect_delay)
+            finally:
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+
+    def _update(self, entries):
+        with self._lock:
+            previous = self._entries
+            current = {}
+            for entry in entries:
+                known = previous.get(entry.serial)
+                if known is not None and known.state == entry.state:
+                    entry.model = known.model
+                current[entry.serial] = entry
+            self._entries = current
+        added = [serial for serial in current if serial not in previous or previous[serial].state != current[serial].state]
+        removed = [serial for serial in previous if serial not in current]
+        for serial in removed + [serial for serial in added if serial in previous]:
+            self.client.drop_device(serial)
+            invalidate_device_properties(serial)
+        for serial in added:
+            if current[serial].online:
+                self._resolve_model(current[serial])
+        self._ready.set()
+        if added or removed:
+            for listener in list(self._listeners):
+                listener(added, removed)
+
+    def _resolve_model(self, entry):
+        try:
+            entry.model = get_device_properties(entry.serial, client=self.client).model or None
+        except (OSError, AdbError):
+            entry.model = None
+
+    def _ensure_started(self, timeout=2.0):
+        self.start()
+        if timeout and not self._ready.wait(timeout):
+            # Tracker not answering yet; fall back to a one-off listing
+            try:
+                self._update(parse_device_list(self.client.host_command("host:devices-l")))
+            except (OSError, AdbError):
+                pass
+
+    def devices(self, online_only=False, wait=True):
+        """Return DeviceEntry objects in the order the ADB server lists them.
+
+        With `wait=False` the current view is returned even if the tracker
+        has not reported yet, so the UI thread never blocks on it.
+        """
+        self._ensure_started(timeout=2.0 if wait else 0)
+        with self._lock:
+            entries = list(self._entries.values())
+        return [entry for entry in entries if entry.online] if online_only else entries
+
+    def serials(self, online_only=False, wait=True):
+        return [entry.serial for entry in self.devices(online_only, wait)]
+
+    def get(self, serial):
+        self._ensure_started()
+        with self._lock:
+            return self._entries.get(serial)
+
+    def model(self, serial):
+        entry = self.get(serial)
+        if entry is None or not entry.online:
+            return None
+        if entry.model is None:
+            self._resolve_model(entry)
+        return entry.model
+
+
+device_registry = DeviceRegistry()
+
+
+class DeviceSelection:
+    """Which devices the pages act on: one active device plus the fleet targets.
+
+    Single-device views (file browser, package list) use `active()`;
+    actions that can fan out (install, toggles, screenshots, pulls) use
+    `targets()`, which falls back to the active device.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._active = None
+        self._targets = []
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Call `callback()` whenever the user picks another active device."""
+        self._listeners.append(callback)
+
+    def set_active(self, serial):
+        if serial != self._active:
+            self._active = serial
+            for listener in list(self._listeners):
+                listener()
+
+    def set_targets(self, serials):
+        self._targets = list(serials)
+
+    def active(self, wait=True):
+        """The chosen device if it is online, else the first online device, else None."""
+        online = self.registry.serials(online_only=True, wait=wait)
+        if self._active in online:
+            return self._active
+        return online[0] if online else None
+
+    def targets(self):
+        online = self.registry.serials(online_only=True)
+        targets = [serial for serial in self._targets if serial in online]
+        if targets:
+            return targets
+        active = self.active()
+        return [active] if active else []
+
+
+device_selection = DeviceSelection(device_registry)
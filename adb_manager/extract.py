@@ -0,0 +1,130 @@
+# extract.py
+import json
+import os
+import posixpath
+import threading
+import time
+from .adb_client import adb
+from .dedup import DedupStats, object_store, remote_sha256
+from .transfer import TransferProgress, pull_many
+
+PACKAGE_MARKER = "__adb_manager_package__"  # Echoed before each `pm path`, to tell the packages' lines apart
+PATH_BATCH = 100  # Packages per `pm path` shell call
+MANIFEST_NAME = "extracted.json"
+
+
+def package_paths(packages, serial=None, client=adb):
+    """Package -> its APK paths on the device (base first, then the splits), in a shell call per PATH_BATCH packages."""
+    paths = {}
+    packages = list(packages)
+    for index in range(0, len(packages), PATH_BATCH):
+        batch = packages[index:index + PATH_BATCH]
+        result = client.run("; ".join(f"echo {PACKAGE_MARKER} {name}; pm path {name}" for name in batch), serial=serial)
+        current = None
+        for line in result.stdout.splitlines():
+            if line.startswith(PACKAGE_MARKER):
+                current = paths.setdefault(line[len(PACKAGE_MARKER):].strip(), [])
+            elif current is not None and line.startswith("package:"):
+                current.append(line[len("package:"):].strip())
+    return paths
+
+
+def local_apk_paths(package, remote_paths, local_dir):
+    """`<package>.apk` for a single APK; a `<package>` folder keeping the device's file names for splits."""
+    if len(remote_paths) == 1:
+        return [os.path.join(local_dir, f"{package}.apk")]
+    return [os.path.join(local_dir, package, posixpath.basename(path)) for path in remote_paths]
+
+
+class ExtractManifest:
+    """Package -> what was extracted for it (device, version, files with size and SHA-256).
+
+    It lives next to the extracted APKs as MANIFEST_NAME and is merged on
+    every extraction, so it lists everything that folder holds.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.packages = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        manifest = cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                manifest.packages = json.load(file).get("packages", {})
+        except (OSError, ValueError):
+            pass
+        return manifest
+
+    def record(self, package, entry):
+        with self._lock:
+            self.packages[package] = entry
+
+    def save(self):
+        with self._lock:
+            data = {"packages": dict(sorted(self.packages.items()))}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        partial = self.path + ".part"
+        with open(partial, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=1)
+        os.replace(partial, self.path)
+
+
+def extract_apks(packages, local_dir, serial=None, progress=None, control=None, client=adb, store=object_store,
+                 table=None):
+    """Pull the base and split APKs of `packages` straight from where they are installed.
+
+    The APKs are read with sync RECV from /data/app (or /system), so
+    nothing is copied on the device first, and all files of all packages
+    are pulled in parallel by one pull_many. Files whose device-side
+    SHA-256 is already in the object store are linked instead of
+    transferred. `table` (a PackageTable) adds versions to the manifest.
+    Returns (package -> local paths, packages without an APK path,
+    DedupStats).
+    """
+    progress = progress if progress is not None else TransferProgress()
+    packages = list(dict.fromkeys(packages))
+    paths = package_paths(packages, serial, client)
+    missing = [package for package in packages if not paths.get(package)]
+    extracted = {package: local_apk_paths(package, paths[package], local_dir)
+                 for package in packages if package not in missing}
+    items = [(remote_path, local_path) for package, local_paths in extracted.items()
+             for remote_path, local_path in zip(paths[package], local_paths)]
+
+    stats = DedupStats()
+    # An empty store cannot save a transfer, so nothing is hashed on the device first
+    digests = remote_sha256([remote_path for remote_path, _local in items], serial, client) if store.sizes() else {}
+    pending = []
+    for remote_path, local_path in items:
+        digest = digests.get(remote_path)
+        if digest and store.has(digest):
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            store.link(digest, local_path)
+            stats.add_linked(os.path.getsize(local_path))
+        else:
+            pending.append((remote_path, local_path))
+    if pending:
+        pull_many(pending, serial, progress, resume=True, client=client, control=control)
+    for remote_path, local_path in pending:
+        digests[remote_path], duplicate = store.add(local_path, digests.get(remote_path))
+        if duplicate:
+            stats.add_duplicate(os.path.getsize(local_path))
+
+    manifest = ExtractManifest.load(os.path.join(local_dir, MANIFEST_NAME))
+    extracted_at = time.strftime("%Y-%m-%d %H:%M:%S")
+    for package, local_paths in extracted.items():
+        entry = {"serial": serial, "extracted": extracted_at, "files": []}
+        if table is not None and package in table:
+            entry["version_name"] = table.get(package, "version_name")
+            entry["version_code"] = table.get(package, "version_code")
+        for remote_path, local_path in zip(paths[package], local_paths):
+            entry["files"].append({"remote": remote_path,
+                                   "local": os.path.relpath(local_path, local_dir).replace(os.sep, "/"),
+                                   "size": os.path.getsize(local_path),
+                                   "sha256": digests[remote_path]})
+        manifest.record(package, entry)
+    if extracted:
+        manifest.save()
+    return extracted, missing, stats
@@ -0,0 +1,708 @@
+# fake_adb.py
+"""A local stand-in for the ADB server and its devices.
+
+It speaks enough of the host, shell v2 and sync protocols to drive
+AdbClient without hardware, and counts every request so benchmarks can
+report round trips. Start one with `FakeAdbServer([FakeDevice(...)])`.
+"""
+import hashlib
+import posixpath
+import shlex
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import time
+from collections import Counter
+
+DEFAULT_FEATURES = ("shell_v2", "cmd", "stat_v2", "ls_v2", "fixed_push_mkdir", "apex", "abb", "abb_exec")
+
+DEFAULT_PROPS = {
+    "ro.product.model": "Pixel 7",
+    "ro.product.vendor.brand": "google",
+    "ro.product.board": "gs201",
+    "ro.build.version.release": "14",
+    "ro.build.version.security_patch": "2024-05-05",
+    "ro.product.vendor.device": "panther",
+    "gsm.sim.operator.alpha": "",
+    "ro.crypto.state": "encrypted",
+    "ro.build.date": "Mon Apr 15 12:00:00 UTC 2024",
+    "ro.build.version.sdk": "34",
+    "wifi.interface": "wlan0",
+    "ro.product.cpu.abi": "arm64-v8a",
+}
+
+
+class FakeNode:
+    def __init__(self, mode, data=None, mtime=None):
+        self.mode = mode
+        self.data = data
+        self.mtime = int(mtime if mtime is not None else time.time())
+        self.children = {} if stat.S_ISDIR(mode) else None
+
+    @property
+    def size(self):
+        return len(self.data) if self.data is not None else 4096
+
+
+class FakePackage:
+    def __init__(self, name, version_code=1, version_name="1.0", uid=10000, installer=None, system=False,
+                 enabled=True, size=0, apks=(b"",), installed="2024-01-01 00:00:00"):
+        self.name = name
+        self.version_code = version_code
+        self.version_name = version_name
+        self.uid = uid
+        self.installer = installer
+        self.system = system
+        self.enabled = enabled
+        self.size = size
+        self.apks = apks  # Contents of base.apk, then of each split
+        self.installed = installed
+        self.updated = installed
+        self.folder = f"/data/app/~~{hashlib.sha1(name.encode()).hexdigest()[:8]}==/{name}-1=="
+
+    def apk_paths(self):
+        return [f"{self.folder}/base.apk"] + [f"{self.folder}/split_{index}.apk" for index in range(1, len(self.apks))]
+
+
+class FakeDevice:
+    """An in-memory device: properties, a file tree, installed packages and a small shell."""
+
+    def __init__(self, serial, model=None, props=None, state="device", features=DEFAULT_FEATURES, latency=0.0, bandwidth=None):
+        self.serial = serial
+        self.state = state
+        self.features = tuple(features)
+        self.latency = latency  # Seconds added to every service request and every LIST/RECV/SEND
+        self.bandwidth = bandwidth  # Bytes per second a single sync stream can move, None for unlimited
+        self.transport_id = None
+        self.props = dict(DEFAULT_PROPS)
+        if model:
+            self.props["ro.product.model"] = model
+        if props:
+            self.props.update(props)
+        self.root = FakeNode(stat.S_IFDIR | 0o755)
+        self.add_dir("/sdcard")
+        self.add_dir("/data/local/tmp")
+        self.shell_handlers = {
+            "echo": self._sh_echo,
+            "true": lambda args: (0, b"", b""),
+            "false": lambda args: (1, b"", b""),
+            "getprop": self._sh_getprop,
+            "ls": self._sh_ls,
+            "test": self._sh_test,
+            "mkdir": self._sh_mkdir,
+            "rm": self._sh_rm,
+            "cp": self._sh_cp,
+            "cat": self._sh_cat,
+            "du": self._sh_du,
+            "tail": self._sh_tail,
+            "sha256sum": self._sh_sha256sum,
+            "input": lambda args: (0, b"", b""),
+            "svc": lambda args: (0, b"", b""),
+            "pm": self._sh_pm,
+            "dumpsys": self._sh_dumpsys,
+        }
+        self.packages = {}  # Package name -> FakePackage
+        self.install_sessions = {}  # `pm install-create` session id -> contents of the APKs written so far
+
+    # -- file tree --------------------------------------------------------------
+
+    def lookup(self, path):
+        node = self.root
+        for part in posixpath.normpath(path).split("/"):
+            if not part or part == ".":
+                continue
+            if node.children is None or part not in node.children:
+                return None
+            node = node.children[part]
+        return node
+
+    def _parent(self, path, create=False):
+        parent_path, name = posixpath.split(posixpath.normpath(path))
+        parent = self.lookup(parent_path)
+        if parent is None and create:
+            parent = self.add_dir(parent_path)
+        return parent, name
+
+    def add_dir(self, path, mtime=None):
+        node = self.root
+        for part in posixpath.normpath(path).split("/"):
+            if not part:
+                continue
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = FakeNode(stat.S_IFDIR | 0o771, mtime=mtime)
+            node = child
+        return node
+
+    def add_file(self, path, data=b"", mtime=None, mode=0o660):
+        parent, name = self._parent(path, create=True)
+        node = parent.children[name] = FakeNode(stat.S_IFREG | mode, bytes(data), mtime)
+        return node
+
+    def remove(self, path):
+        parent, name = self._parent(path)
+        if parent is None or parent.children is None or name not in parent.children:
+            return False
+        del parent.children[name]
+        return True
+
+    def add_package(self, name, **kwargs):
+        """Install a FakePackage; its APKs are files under /data/app so they can be pulled."""
+        package = self.packages[name] = FakePackage(name, uid=10000 + len(self.packages), **kwargs)
+        for path, data in zip(package.apk_paths(), package.apks):
+            self.add_file(path, data, mode=0o644)
+        return package
+
+    # -- shell ------------------------------------------------------------------
+
+    def throttle(self, size, latency=True):
+        """Sleep for the simulated per-request latency and the time `size` bytes take on one stream."""
+        delay = self.latency if latency else 0.0
+        if self.bandwidth:
+            delay += size / self.bandwidth
+        if delay:
+            time.sleep(delay)
+
+    def run_shell(self, command):
+        """Return (exit code, stdout, stderr) for a command line; `;`, `&&`, `||` and `$?` work."""
+        try:
+            lexer = shlex.shlex(command, posix=True, punctuation_chars=";&|")
+            lexer.wordchars += "$?*+"
+            tokens = list(lexer)
+        except ValueError as e:
+            return 2, b"", f"sh: {e}\n".encode()
+        returncode, stdout, stderr = 0, [], []
+        args, skip = [], False
+        for token in tokens + [";"]:
+            if token not in (";", "&&", "||"):
+                args.append(str(returncode) if token == "$?" else token.replace("$?", str(returncode)))
+                continue
+            if args and not skip:
+                returncode, out, err = self._run_args(args)
+                stdout.append(out)
+                stderr.append(err)
+            skip = (token == "&&" and returncode != 0) or (token == "||" and returncode == 0)
+            args = []
+        return returncode, b"".join(stdout), b"".join(stderr)
+
+    def _run_args(self, args):
+        handler = self.shell_handlers.get(args[0])
+        if handler is None:
+            return 127, b"", f"/system/bin/sh: {args[0]}: inaccessible or not found\n".encode()
+        return handler(args[1:])
+
+    def _sh_echo(self, args):
+        return 0, (" ".join(args) + "\n").encode(), b""
+
+    def _sh_getprop(self, args):
+        if args:
+            return 0, (self.props.get(args[0], "") + "\n").encode(), b""
+        lines = "".join(f"[{key}]: [{value}]\n" for key, value in sorted(self.props.items()))
+        return 0, lines.encode(), b""
+
+    def _sh_ls(self, args):
+        flags = "".join(arg[1:] for arg in args if arg.startswith("-"))
+        paths = [arg for arg in args if not arg.startswith("-")] or ["/"]
+        node = self.lookup(paths[0])
+        if node is None:
+            return 1, b"", f"ls: {paths[0]}: No such file or directory\n".encode()
+        if node.children is None:
+            return 0, (posixpath.basename(paths[0]) + "\n").encode(), b""
+        names = []
+        if "a" in flags:
+            names += ["./", "../"] if "p" in flags else [".", ".."]
+        for name, child in sorted(node.children.items()):
+            if name.startswith(".") and "a" not in flags:
+                continue
+            names.append(name + "/" if "p" in flags and child.children is not None else name)
+        return 0, "".join(name + "\n" for name in names).encode(), b""
+
+    def _sh_test(self, args):
+        if len(args) != 2:
+            return 2, b"", b""
+        node = self.lookup(args[1])
+        if args[0] == "-d":
+            ok = node is not None and node.children is not None
+        elif args[0] == "-f":
+            ok = node is not None and node.children is None
+        else:
+            ok = node is not None
+        return (0 if ok else 1), b"", b""
+
+    def _sh_mkdir(self, args):
+        parents = "-p" in args
+        for path in (arg for arg in args if not arg.startswith("-")):
+            parent, name = self._parent(path)
+            if parent is None and not parents:
+                return 1, b"", f"mkdir: '{path}': No such file or directory\n".encode()
+            if self.lookup(path) is not None and not parents:
+                return 1, b"", f"mkdir: '{path}': File exists\n".encode()
+            self.add_dir(path)
+        return 0, b"", b""
+
+    def _sh_rm(self, args):
+        force = any(arg.startswith("-") and "f" in arg for arg in args)
+        for path in (arg for arg in args if not arg.startswith("-")):
+            if not self.remove(path) and not force:
+                return 1, b"", f"rm: {path}: No such file or directory\n".encode()
+        return 0, b"", b""
+
+    def _sh_cp(self, args):
+        paths = [arg for arg in args if not arg.startswith("-")]
+        source = self.lookup(paths[0]) if len(paths) == 2 else None
+        if source is None:
+            return 1, b"", b"cp: bad source\n"
+        if source.children is None:
+            self.add_file(paths[1], source.data, source.mtime, stat.S_IMODE(source.mode))
+        else:
+            self._copy_tree(source, paths[1])
+        return 0, b"", b""
+
+    def _copy_tree(self, node, path):
+        self.add_dir(path, node.mtime)
+        for name, child in node.children.items():
+            if child.children is None:
+                self.add_file(posixpath.join(path, name), child.data, child.mtime, stat.S_IMODE(child.mode))
+            else:
+                self._copy_tree(child, posixpath.join(path, name))
+
+    def _sh_cat(self, args):
+        node = self.lookup(args[0]) if args else None
+        if node is None or node.data is None:
+            return 1, b"", b"cat: no such file\n"
+        return 0, node.data, b""
+
+    def _sh_sha256sum(self, args):
+        returncode, stdout, stderr = 0, [], []
+        for path in args:
+            node = self.lookup(path)
+            if node is None or node.data is None:
+                returncode = 1
+                stderr.append(f"sha256sum: {path}: No such file or directory\n")
+            else:
+                stdout.append(f"{hashlib.sha256(node.data).hexdigest()}  {path}\n")
+        return returncode, "".join(stdout).encode(), "".join(stderr).encode()
+
+    def _sh_tail(self, args):
+        if len(args) != 3 or args[0] != "-c" or not args[1].startswith("+"):
+            return 1, b"", b"tail: only -c +N is supported\n"
+        node = self.lookup(args[2])
+        if node is None or node.data is None:
+            return 1, b"", f"tail: {args[2]}: No such file or directory\n".encode()
+        return 0, node.data[int(args[1][1:]) - 1:], b""
+
+    def _sh_du(self, args):
+        path = [arg for arg in args if not arg.startswith("-")][0]
+        node = self.lookup(path)
+        if node is None:
+            return 1, b"", f"du: {path}: No such file or directory\n".encode()
+        return 0, f"{(self._tree_size(node) + 1023) // 1024}\t{path}\n".encode(), b""
+
+    def _sh_pm(self, args):
+        if args[:2] == ["list", "packages"]:
+            flags = {arg for arg in args[2:] if arg.startswith("-")}
+            name_filter = next((arg for arg in args[2:] if not arg.startswith("-")), "")
+            if flags - {"-f", "-U", "-i", "-d", "-e", "-s", "-3", "--show-versioncode"}:
+                return 1, b"", b"Error: Unknown option\n"
+            lines = []
+            for package in sorted(self.packages.values(), key=lambda package: package.name):
+                if name_filter not in package.name:
+                    continue
+                if ("-d" in flags and package.enabled) or ("-e" in flags and not package.enabled):
+                    continue
+                if ("-s" in flags and not package.system) or ("-3" in flags and package.system):
+                    continue
+                line = "package:" + (f"{package.apk_paths()[0]}=" if "-f" in flags else "") + package.name
+                if "--show-versioncode" in flags:
+                    line += f" versionCode:{package.version_code}"
+                if "-U" in flags:
+                    line += f" uid:{package.uid}"
+                if "-i" in flags:
+                    line += f"  installer={package.installer or 'null'}"
+                lines.append(line + "\n")
+            return 0, "".join(lines).encode(), b""
+        if args[0].startswith("install"):
+            return self._sh_pm_install(args)
+        if args[0] in ("grant", "revoke"):
+            return (0, b"", b"") if len(args) == 3 and args[1] in self.packages else (1, b"", b"Error: bad grant\n")
+        names = [arg for arg in args[1:] if not arg.startswith("-") and arg != "0"]
+        package = self.packages.get(names[-1]) if names else None
+        if package is None:
+            return 1, b"", b"Error: package not found\n"
+        if args[0] == "path":
+            return 0, "".join(f"package:{path}\n" for path in package.apk_paths()).encode(), b""
+        if args[0] in ("enable", "disable-user", "disable"):
+            package.enabled = args[0] == "enable"
+            state = "enabled" if package.enabled else "disabled-user"
+            return 0, f"Package {package.name} new state: {state}\n".encode(), b""
+        if args[0] == "clear":
+            return 0, b"Success\n", b""
+        if args[0] == "uninstall":
+            for path in package.apk_paths():
+                self.remove(path)
+            del self.packages[package.name]
+            return 0, b"Success\n", b""
+        return 1, b"", f"Error: unknown command '{args[0]}'\n".encode()
+
+    def _sh_pm_install(self, args):
+        """`pm install` and the install-create/-write/-commit/-abandon session commands."""
+        positional, options = [], iter(args[1:])
+        for arg in options:
+            if arg in ("-S", "-i", "--user"):
+                next(options, None)  # These options take a value
+            elif not arg.startswith("-"):
+                positional.append(arg)
+        if args[0] == "install-create":
+            session = max(self.install_sessions, default=1000) + 1
+            self.install_sessions[session] = []
+            return 0, f"Success: created install session [{session}]\n".encode(), b""
+        if args[0] == "install":
+            node = self.lookup(positional[-1]) if positional else None
+            if node is None or node.data is None:
+                return 1, b"", b"Error: Unable to open file\n"
+            return self._install([node.data])
+        session = int(positional[0]) if positional and positional[0].isdigit() else None
+        if session not in self.install_sessions:
+            return 1, b"", b"Error: invalid session id\n"
+        if args[0] == "install-write" and len(positional) == 3:
+            node = self.lookup(positional[2])
+            if node is None or node.data is None:
+                return 1, b"", b"Error: Unable to open file\n"
+            self.install_sessions[session].append(node.data)
+            return 0, f"Success: streamed {len(node.data)} bytes\n".encode(), b""
+        if args[0] == "install-commit":
+            return self._install(self.install_sessions.pop(session))
+        if args[0] == "install-abandon":
+            del self.install_sessions[session]
+            return 0, b"Success\n", b""
+        return 1, b"", f"Error: unknown command '{args[0]}'\n".encode()
+
+    def _install(self, apks):
+        """Install APK contents; a fake APK names its package on its first line, `package=<name>`."""
+        first_line = apks[0].split(b"\n", 1)[0] if apks else b""
+        if not first_line.startswith(b"package="):
+            return 1, b"Failure [INSTALL_FAILED_INVALID_APK: Failed to parse APK]\n", b""
+        name = first_line[len(b"package="):].decode()
+        previous = self.packages.get(name)
+        if previous is not None:
+            for path in previous.apk_paths():
+                self.remove(path)
+        self.add_package(name, apks=tuple(apks))
+        return 0, b"Success\n", b""
+
+    def _sh_dumpsys(self, args):
+        packages = sorted(self.packages.values(), key=lambda package: package.name)
+        if args == ["package", "packages"]:
+            lines = ["Packages:"]
+            for package in packages:
+                flags = "SYSTEM HAS_CODE" if package.system else "HAS_CODE ALLOW_CLEAR_USER_DATA"
+                lines += [f"  Package [{package.name}] ({id(package):x}):",
+                          f"    userId={package.uid}",
+                          f"    codePath={package.folder}",
+                          f"    versionCode={package.version_code} minSdk=24 targetSdk=34",
+                          f"    versionName={package.version_name}",
+                          f"    pkgFlags=[ {flags} ]",
+                          f"    firstInstallTime={package.installed}",
+                          f"    lastUpdateTime={package.updated}",
+                          f"    User 0: installed=true hidden=false enabled={0 if package.enabled else 3}"]
+            lines += ["", "Hidden system packages:"]
+            return 0, ("\n".join(lines) + "\n").encode(), b""
+        if args == ["diskstats"]:
+            names = ",".join(f'"{package.name}"' for package in packages)
+            sizes = ",".join(str(package.size) for package in packages)
+            zeros = ",".join("0" for _ in packages)
+            lines = ["Latency: 1ms [512B Data Write]", f"Package Names: [{names}]", f"App Sizes: [{sizes}]",
+                     f"App Data Sizes: [{zeros}]", f"Cache Sizes: [{zeros}]"]
+            return 0, ("\n".join(lines) + "\n").encode(), b""
+        return 0, b"", b""
+
+    def _tree_size(self, node):
+        if node.children is None:
+            return node.size
+        return sum(self._tree_size(child) for child in node.children.values())
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def read_exactly(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client went away")
+            data += chunk
+        return data
+
+    def read_request(self):
+        length = int(self.read_exactly(4), 16)
+        return self.read_exactly(length).decode("utf-8")
+
+    def okay(self, payload=None):
+        if payload is None:
+            self.request.sendall(b"OKAY")
+        else:
+            data = payload.encode("utf-8")
+            self.request.sendall(b"OKAY" + b"%04x" % len(data) + data)
+
+    def fail(self, message):
+        data = message.encode("utf-8")
+        self.request.sendall(b"FAIL" + b"%04x" % len(data) + data)
+
+    def handle(self):
+        server = self.server.fake
+        try:
+            request = self.read_request()
+            server.count(request[:request.rindex(":")] if request.startswith("host-serial:") else ":".join(request.split(":", 2)[:2]))
+            self.handle_host(server, request)
+        except (ConnectionError, OSError):
+            pass
+
+    def handle_host(self, server, request):
+        if request == "host:version":
+            self.okay("0029")
+        elif request == "host:devices":
+            self.okay(server.device_list())
+        elif request == "host:devices-l":
+            self.okay(server.device_list(long=True))
+        elif request in ("host:track-devices", "host:track-devices-l"):
+            self.okay()
+            self.track_devices(server, long=request.endswith("-l"))
+        elif request == "host:kill":
+            self.okay()
+        elif request == "host:features" or (request.startswith("host-serial:") and request.endswith(":features")):
+            device = server.find(request[len("host-serial:"):-len(":features")] if request.startswith("host-serial:") else None)
+            if device is None:
+                self.fail("device not found")
+            else:
+                self.okay(",".join(device.features))
+        elif request.startswith("host:connect:") or request.startswith("host:disconnect:"):
+            self.okay(f"{request.split(':', 2)[1]}ed {request.split(':', 2)[2]}")
+        elif request.startswith("host:transport"):
+            serial = request.split(":", 2)[2] if request.startswith("host:transport:") else None
+            device = server.find(serial)
+            if device is None:
+                self.fail("more than one device/emulator" if serial is None and len(server.devices) > 1 else f"device '{serial}' not found")
+                return
+            self.okay()
+            service = self.read_request()
+            server.count(service.split(":", 1)[0])
+            if device.latency:
+                time.sleep(device.latency)
+            self.handle_service(server, device, service)
+        else:
+            self.fail(f"unknown host service '{request}'")
+
+    def track_devices(self, server, long):
+        generation = None
+        while not server.stopping:
+            with server.changed:
+                if generation == server.generation:
+                    server.changed.wait(0.5)
+                    continue
+                generation = server.generation
+                data = server.device_list(long).encode("utf-8")
+            self.request.sendall(b"%04x" % len(data) + data)
+
+    def handle_service(self, server, device, service):
+        if service.startswith("shell,v2"):
+            command = service.split(":", 1)[1]
+            self.okay()
+            returncode, stdout, stderr = device.run_shell(command)
+            packets = b""
+            if stdout:
+                packets += struct.pack("<BI", 1, len(stdout)) + stdout
+            if stderr:
+                packets += struct.pack("<BI", 2, len(stderr)) + stderr
+            packets += struct.pack("<BIB", 3, 1, returncode & 0xFF)
+            self.request.sendall(packets)
+        elif service.startswith("shell:") or service.startswith("exec:"):
+            command = service.split(":", 1)[1]
+            self.okay()
+            returncode, stdout, stderr = device.run_shell(command)
+            self.request.sendall(stdout + stderr)
+        elif service == "sync:":
+            self.okay()
+            self.handle_sync(server, device)
+        elif service.startswith("reboot:"):
+            self.okay()
+        elif service.startswith("tcpip:"):
+            self.okay()
+            self.request.sendall(f"restarting in TCP mode port: {service[6:]}\n".encode())
+        else:
+            self.fail(f"unknown service '{service}'")
+
+    def handle_sync(self, server, device):
+        while True:
+            header = self.read_exactly(8)
+            command, length = header[:4], struct.unpack("<I", header[4:])[0]
+            server.count("sync:" + command.decode("ascii", errors="replace"))
+            if command == b"QUIT":
+                return
+            path = self.read_exactly(length).decode("utf-8")
+            if command == b"STAT":
+                node = device.lookup(path)
+                if node is None:
+                    self.request.sendall(b"STAT" + struct.pack("<III", 0, 0, 0))
+                else:
+                    self.request.sendall(b"STAT" + struct.pack("<III", node.mode, node.size & 0xFFFFFFFF, node.mtime))
+            elif command in (b"STA2", b"LST2"):
+                node = device.lookup(path)
+                if node is None:
+                    self.request.sendall(command + struct.pack("<IQQIIIIQqqq", 2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0))
+                else:
+                    self.request.sendall(command + self._stat_v2(node))
+            elif command in (b"LIST", b"LIS2"):
+                device.throttle(0)
+                self.send_listing(device, path, command == b"LIS2")
+            elif command == b"RECV":
+                node = device.lookup(path)
+                if node is None or node.data is None:
+                    message = b"No such file or directory"
+                    self.request.sendall(b"FAIL" + struct.pack("<I", len(message)) + message)
+                    return
+                data = node.data
+                device.throttle(0)
+                for offset in range(0, len(data), 64 * 1024):
+                    piece = data[offset:offset + 64 * 1024]
+                    device.throttle(len(piece), latency=False)
+                    self.request.sendall(b"DATA" + struct.pack("<I", len(piece)) + piece)
+                self.request.sendall(b"DONE" + struct.pack("<I", 0))
+            elif command == b"SEND":
+                remote_path, _, mode = path.rpartition(",")
+                chunks = []
+                while True:
+                    header = self.read_exactly(8)
+                    kind, size = header[:4], struct.unpack("<I", header[4:])[0]
+                    if kind == b"DATA":
+                        chunks.append(self.read_exactly(size))
+                        device.throttle(size, latency=False)
+                    elif kind == b"DONE":
+                        device.throttle(0)
+                        device.add_file(remote_path, b"".join(chunks), size, stat.S_IMODE(int(mode)))
+                        break
+                    else:
+                        return
+                self.request.sendall(b"OKAY" + struct.pack("<I", 0))
+            else:
+                return
+
+    @staticmethod
+    def _stat_v2(node):
+        return struct.pack("<IQQIIIIQqqq", 0, 0, 0, node.mode, 1, 0, 0, node.size, node.mtime, node.mtime, node.mtime)
+
+    def send_listing(self, device, path, v2):
+        node = device.lookup(path)
+        children = node.children.items() if node is not None and node.children is not None else ()
+        packets = []
+        for name, child in children:
+            encoded = name.encode("utf-8")
+            if v2:
+                packets.append(b"DNT2" + self._stat_v2(child) + struct.pack("<I", len(encoded)) + encoded)
+            else:
+                packets.append(b"DENT" + struct.pack("<IIII", child.mode, child.size & 0xFFFFFFFF, child.mtime, len(encoded)) + encoded)
+            if len(packets) >= 256:
+                data = b"".join(packets)
+                device.throttle(len(data), latency=False)
+                self.request.sendall(data)
+                packets = []
+        if v2:
+            packets.append(b"DONE" + bytes(72))
+        else:
+            packets.append(b"DONE" + bytes(16))
+        self.request.sendall(b"".join(packets))
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class FakeAdbServer:
+    """Serve `devices` on a loopback port; use as a context manager or call start()/stop()."""
+
+    def __init__(self, devices=(), host="127.0.0.1", port=0):
+        self.devices = []
+        self.changed = threading.Condition()
+        self.generation = 0
+        self.stopping = False
+        self._next_transport_id = 1
+        for device in devices:
+            self.add_device(device)
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._server = _ThreadingServer((host, port), _Handler)
+        self._server.fake = self
+        self.host, self.port = self._server.server_address
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopping = True
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_device(self, device):
+        """Plug in a device; trackers see it on their next update."""
+        with self.changed:
+            device.transport_id = self._next_transport_id
+            self._next_transport_id += 1
+            self.devices.append(device)
+            self.generation += 1
+            self.changed.notify_all()
+        return device
+
+    def remove_device(self, serial):
+        """Unplug a device."""
+        with self.changed:
+            self.devices = [device for device in self.devices if device.serial != serial]
+            self.generation += 1
+            self.changed.notify_all()
+
+    def set_state(self, serial, state):
+        with self.changed:
+            for device in self.devices:
+                if device.serial == serial:
+                    device.state = state
+            self.generation += 1
+            self.changed.notify_all()
+
+    def device_list(self, long=False):
+        lines = []
+        for device in list(self.devices):
+            if long:
+                model = device.props.get("ro.product.model", "").replace(" ", "_")
+                product = device.props.get("ro.product.vendor.device", "")
+                lines.append(f"{device.serial:<22} {device.state} product:{product} model:{model} "
+                             f"device:{product} transport_id:{device.transport_id}\n")
+            else:
+                lines.append(f"{device.serial}\t{device.state}\n")
+        return "".join(lines)
+
+    def count(self, kind):
+        with self._stats_lock:
+            self.stats[kind] += 1
+            self.stats["round_trips"] += 1
+
+    def find(self, serial=None):
+        ready = [device for device in self.devices if device.state == "device"]
+        if serial is None:
+            return ready[0] if len(ready) == 1 else None
+        for device in ready:
+            if device.serial == serial:
+                return device
+        return None
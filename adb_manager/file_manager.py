@@ -1,13 +1,22 @@
 # file_manager.py
 import tkinter as tk
-from tkinter import ttk, filedialog, simpledialog, messagebox
+from tkinter import ttk, filedialog, simpledialog
 import subprocess
 import os
 import json
-import threading
-from time import sleep
-from PIL import Image, ImageTk  # For loading PNG icons
-from .utils import execute_command, get_device_model_serial, get_connected_devices
+from .utils import format_size, get_device_model_serial, get_device_pull_path
+from . import services
+from .aio import call_ui, gather_devices
+from .devices import device_registry, device_selection
+from .fleet import report_fleet_result
+from .icons import icon_cache
+from .listing import listing_cache
+from .tasks import QUEUED, TRANSFER, tasks
+from .ui_dispatcher import messagebox, ui
+from .virtual_tree import VirtualTreeview
+from .mirror import manifest_path
+from .progress_window import TransferProgressWindow
+from .transfer import TransferCancelled, TransferControl, TransferProgress
 
 class FileManagerPage(ttk.Frame):
     def __init__(self, parent):
@@ -15,24 +24,43 @@ class FileManagerPage(ttk.Frame):
         self.current_path = "/sdcard/"
         self.path_stack = []  # Stack to keep track of previous directories
         self.copied_paths = []  # List to store multiple copied paths
+        self.entries = {}  # Name -> RemoteEntry for every item of the current folder
+        self.listing = []  # Backing array of the current folder, before filtering
+        self.show_hidden = False
+        self.sort_column, self.sort_reverse = "name", False
+        self.listing_token = 0  # Bumped for every listing shown, so late batches of an older one are dropped
         self.row_height = 25
 
         # Load icon mappings from file
         self.icon_mappings = self.load_icon_mappings("./adb_manager/icon_mappings.json")
 
-        # Load PNG icons
-        self.icons = self.load_icons()
 
         # Style configuration for Treeview
         style = ttk.Style()
         style.configure("Treeview", rowheight=self.row_height)
 
         # File manager Treeview with multiple selection enabled
-        self.file_manager_tree = ttk.Treeview(self, columns=("Path",), selectmode="extended")
-        self.file_manager_tree.heading("#0", text="Name")
+        self.file_manager_tree = ttk.Treeview(self, columns=("Path", "Size", "Modified"), selectmode="extended")
+        self.file_manager_tree.heading("#0", text="Name", command=lambda: self.sort_by("name"))
         self.file_manager_tree.heading("#1", text="Path")
+        self.file_manager_tree.heading("#2", text="Size", command=lambda: self.sort_by("size"))
+        self.file_manager_tree.heading("#3", text="Modified", command=lambda: self.sort_by("modified"))
+        self.file_manager_tree.column("Size", width=100, anchor="e")
+        self.file_manager_tree.column("Modified", width=130)
         self.file_manager_tree.bind("<Double-1>", self.on_double_click)
+        self.file_manager_tree.bind("<Control-a>", self.select_all)
         self.file_manager_tree.grid(row=1, column=0, columnspan=6, sticky="nsew")
+        tree_scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.file_manager_tree.yview)
+        tree_scrollbar.grid(row=1, column=6, sticky="ns")
+
+        # Only the rows scrolled into view get Tk items
+        self.tree_view = VirtualTreeview(self.file_manager_tree, self.make_row, tree_scrollbar)
+
+        # Filter box above the list
+        ttk.Label(self, text="Filter:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *args: self.apply_view())
+        ttk.Entry(self, textvariable=self.filter_var).grid(row=0, column=1, columnspan=5, padx=5, pady=5, sticky="ew")
 
         # Buttons
         self.refresh_button = ttk.Button(self, text="Refresh", command=self.refresh)
@@ -76,6 +104,11 @@ class FileManagerPage(ttk.Frame):
         for i in range(6):
             self.columnconfigure(i, weight=1)
 
+        # Show the new device's files when another device is picked
+        device_selection.add_listener(self.refresh)
+        # Cached listings of a device that went away or came back are stale
+        device_registry.add_listener(self.on_devices_changed)
+
         # Initial refresh to load contents
         self.refresh()
 
@@ -91,81 +124,75 @@ class FileManagerPage(ttk.Frame):
             messagebox.showerror("Error", f"Invalid JSON in icon mappings file: {file_path}")
             return {"default": "file"}  # Fallback to default icon
 
-    def load_icons(self):
-        """Load all PNG icons from the icons folder."""
-        icons = {}
-        for icon_name in self.icon_mappings.values():
-            icon_path = os.path.join("icons", f"{icon_name}.png")
-            if os.path.exists(icon_path):
-                icon = Image.open(icon_path)
-                icon = icon.resize((25, 25), Image.Resampling.LANCZOS)
-                icons[icon_name] = ImageTk.PhotoImage(icon)
-            else:
-                print(f"Warning: Icon not found for {icon_name}")
-                icons[icon_name] = None
-
-        # Ensure the "folder" icon is loaded
-        folder_icon_path = os.path.join("icons", "folder.png")
-        if os.path.exists(folder_icon_path):
-            folder_icon = Image.open(folder_icon_path)
-            folder_icon = folder_icon.resize((25, 25), Image.Resampling.LANCZOS)
-            icons["folder"] = ImageTk.PhotoImage(folder_icon)
-        else:
-            print("Warning: Folder icon not found.")
-            icons["folder"] = None
-
-        # Ensure the "file" icon is loaded as a default
-        file_icon_path = os.path.join("icons", "file.png")
-        if os.path.exists(file_icon_path):
-            file_icon = Image.open(file_icon_path)
-            file_icon = file_icon.resize((25, 25), Image.Resampling.LANCZOS)
-            icons["file"] = ImageTk.PhotoImage(file_icon)
-        else:
-            print("Warning: File icon not found.")
-            icons["file"] = None
-
-        return icons
-
     def get_file_icon(self, filename):
         """Get the icon for a file based on its extension."""
         _, ext = os.path.splitext(filename)
         ext = ext.lower()
         icon_name = self.icon_mappings.get(ext, self.icon_mappings.get("default", "file"))
-        return self.icons.get(icon_name)
-
-    def insert_sorted_items(self, files):
-        folders = []
-        files_list = []
+        return icon_cache.get(icon_name, 25)
+
+    def insert_sorted_items(self, entries, show_hidden=False):
+        """Show RemoteEntry objects; the tree only has items for the rows around the view."""
+        self.listing = list(entries)
+        self.show_hidden = show_hidden
+        self.entries = {entry.name: entry for entry in entries}
+        self.apply_view()
+
+    def apply_view(self):
+        """Filter and sort the backing array, then redraw the first rows."""
+        self.tree_view.set_rows(self.view_rows(self.listing))
+
+    def filter_rows(self, entries):
+        text = self.filter_var.get().lower()
+        return [entry for entry in entries
+                if (self.show_hidden or not entry.hidden) and (not text or text in entry.name.lower())]
+
+    def view_rows(self, entries):
+        """The entries that pass the filter, in the current sort order."""
+        rows = self.filter_rows(entries)
+        # Folders stay on top whichever column is sorted
+        if self.sort_column == "size":
+            rows.sort(key=lambda entry: entry.size, reverse=self.sort_reverse)
+        elif self.sort_column == "modified":
+            rows.sort(key=lambda entry: entry.mtime, reverse=self.sort_reverse)
+        else:
+            rows.sort(key=lambda entry: entry.name.lower(), reverse=self.sort_reverse)
+        rows.sort(key=lambda entry: not entry.is_dir)
+        return rows
 
-        for file in files:
-            if file.endswith('/'):
-                folders.append(file[:-1])  # Remove the trailing `/`
-            else:
-                files_list.append(file)
+    def sort_by(self, column):
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column, self.sort_reverse = column, column != "name"  # Biggest/newest first
+        self.apply_view()
 
-        # Sort folders and files alphabetically
-        folders.sort(key=lambda x: x.lower())
-        files_list.sort(key=lambda x: x.lower())
+    def select_all(self, event=None):
+        self.tree_view.select_all()
+        return "break"
 
-        # Insert folders first
-        for folder in folders:
-            self.file_manager_tree.insert("", "end", text=folder, values=(self.current_path,), image=self.icons.get("folder"))
+    def selected_names(self):
+        """Names of the selected entries, including selected rows that are scrolled out of the tree."""
+        return [entry.name for entry in self.tree_view.selected_rows()]
 
-        # Insert files next
-        for file in files_list:
-            icon = self.get_file_icon(file)
-            if icon is None:
-                icon = self.icons.get("file")  # Use default icon if no specific icon is found
-            self.file_manager_tree.insert("", "end", text=file, values=(self.current_path,), image=icon)
+    def make_row(self, entry):
+        if entry.is_dir:
+            return entry.name, (self.current_path, "", entry.modified()), icon_cache.get("folder", 25)
+        icon = self.get_file_icon(entry.name)
+        if icon is None:
+            icon = icon_cache.get("file", 25)  # Use default icon if no specific icon is found
+        return entry.name, (self.current_path, format_size(entry.size), entry.modified()), icon
 
     def on_double_click(self, event):
-        item = self.file_manager_tree.selection()[0]
-        path = self.file_manager_tree.item(item, "text")
-        full_path = f'"{self.current_path}/{path}"'.replace('//', '/')  # Quote the path
-        if self.check_if_directory(full_path):
+        selected_names = self.selected_names()
+        if not selected_names:
+            return
+        path = selected_names[0]
+        entry = self.entries.get(path)
+        if entry is not None and entry.is_dir:
             self.path_stack.append(self.current_path)  # Push current path to stack
-            self.current_path = full_path.strip('"')  # Update current path (remove quotes)
-            self.refresh()  # Refresh Treeview
+            self.current_path = f"{self.current_path}/{path}".replace('//', '/')  # Update current path
+            self.refresh(cached=True)  # Refresh Treeview
         else:
             messagebox.showerror("Error", "Selected item is not a directory.")
 
@@ -173,285 +200,211 @@ class FileManagerPage(ttk.Frame):
         if self.path_stack:  # Check if there are previous directories in the stack
             previous_path = self.path_stack.pop()  # Pop the previous path
             self.current_path = previous_path  # Update current path
-            self.refresh()  # Refresh Treeview
+            self.refresh(cached=True)  # Refresh Treeview
         else:
             messagebox.showinfo("Info", "No previous directory available.")
 
-    def refresh(self):
-        def run():
-            self.file_manager_tree.delete(*self.file_manager_tree.get_children())
-            try:
-                # Use `ls -p` to append `/` to directories
-                output = subprocess.check_output(
-                    ["adb", "shell", "ls", "-p", f'"{self.current_path}"'],  # Quote the path
-                    universal_newlines=True, encoding="utf-8"
-                )
-                files = output.splitlines()
-                self.insert_sorted_items(files)
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error: {e}")
+    def refresh(self, show_hidden=False, cached=False):
+        """List the current folder; with `cached`, a cached listing is shown without a device call.
+
+        Otherwise the listing streams in: each batch is painted as it
+        arrives and the rows are put in order once the last one is in.
+        """
+        path = self.current_path
+        if cached:
+            entries = listing_cache.peek(path, device_selection.active(wait=False))
+            if entries is not None:
+                self.show_entries(path, entries, show_hidden, device_selection.active(wait=False))
+                return
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        self.listing_token += 1
+        self.insert_sorted_items([], show_hidden)
 
-    def refresh_hidden(self):
         def run():
-            self.file_manager_tree.delete(*self.file_manager_tree.get_children())
+            if path != self.current_path:
+                return  # Navigated elsewhere while this listing was queued
+            # Read when the listing starts, so repeated refreshes folded into this task paint into the newest view
+            token = self.listing_token
+            device_serial = device_selection.active()
             try:
-                # Use `ls -ap` to include hidden files and append `/` to directories
-                output = subprocess.check_output(
-                    ["adb", "shell", "ls", "-ap", f'"{self.current_path}"'],  # Quote the path
-                    universal_newlines=True, encoding="utf-8"
-                )
-                files = output.splitlines()
-                self.insert_sorted_items(files)
+                # Sync LIST gives names, types, sizes and times as it streams
+                for batch in listing_cache.stream(path, serial=device_serial):
+                    ui.post(self.add_entries, token, batch)
             except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error: {e}")
+                ui.post(self.listing_failed, token, e)
+                return
+            ui.post(self.finish_listing, token, path, device_serial)
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name=f"List {path}", serial=device_selection.active(wait=False), key=("list", path))
 
-    def check_if_directory_compress(self, path):
-        """Check if the given path is a directory."""
-        try:
-            # Use `-d` flag to check if the path is a directory, and quote the path
-            subprocess.check_output(["adb", "shell", "test", "-d", f'"{path}"'], stderr=subprocess.STDOUT)
-            return True
-        except subprocess.CalledProcessError:
-            return False
-        
-    def check_if_directory(self, path):
-        try:
-            # Use `-d` flag to check if the path is a directory
-            subprocess.check_output(["adb", "shell", "test", "-d", path], stderr=subprocess.STDOUT)
-            return True
-        except subprocess.CalledProcessError:
-            return False
-
-    def check_if_file(self, path):
-        """Check if the given path is a file."""
-        try:
-            # Use `-f` flag to check if the path is a file, and quote the path
-            subprocess.check_output(["adb", "shell", "test", "-f", f'"{path}"'], stderr=subprocess.STDOUT)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+    def add_entries(self, token, batch):
+        if token != self.listing_token:
+            return  # A newer listing replaced this one
+        self.listing.extend(batch)
+        self.entries.update((entry.name, entry) for entry in batch)
+        self.tree_view.extend_rows(self.filter_rows(batch))
+
+    def finish_listing(self, token, path, device_serial):
+        if token != self.listing_token:
+            return
+        self.tree_view.reorder(self.view_rows(self.listing))
+        # Subfolders are the likely next stops; list them in the background
+        listing_cache.prefetch(path, self.listing, serial=device_serial)
+
+    def listing_failed(self, token, error):
+        if token == self.listing_token:
+            messagebox.showerror("Error", f"Error: {error}")
+
+    def show_entries(self, path, entries, show_hidden, device_serial):
+        self.listing_token += 1  # Drop batches of a listing still streaming in
+        self.insert_sorted_items(entries, show_hidden)
+        # Subfolders are the likely next stops; list them in the background
+        listing_cache.prefetch(path, entries, serial=device_serial)
+
+    def on_devices_changed(self, added, removed):
+        for serial in added + removed:
+            listing_cache.invalidate_device(serial)
+
+    def refresh_hidden(self):
+        self.refresh(show_hidden=True)
 
     def delete(self):
-        def run():
-            selected_items = self.file_manager_tree.selection()  # Get all selected items
-            if not selected_items:
-                messagebox.showwarning("No Selection", "Please select one or more items to delete.")
-                return
+        paths = self.selected_names()  # Get all selected items
+        if not paths:
+            messagebox.showwarning("No Selection", "Please select one or more items to delete.")
+            return
 
-            for item in selected_items:
-                path = self.file_manager_tree.item(item, "text")
+        async def run():
+            device_serial = await services.active_device()
+            for path in paths:
                 full_path = os.path.join(self.current_path, path).replace('\\', '/')
                 try:
-                    subprocess.check_call(["adb", "shell", "rm", "-r", f'"{full_path}"'])
+                    await services.delete_paths([full_path], device_serial)
                     messagebox.showinfo("Success", f"{path} deleted successfully!")
                 except subprocess.CalledProcessError as e:
                     messagebox.showerror("Error", f"Error deleting {path}: {e}")
 
-            self.refresh()  # Refresh the file list after deletion
+            ui.post(self.refresh)  # Refresh the file list after deletion
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name=f"Delete {len(paths)} item(s)", serial=device_selection.active(wait=False), key=("delete", tuple(paths)))
 
     def download(self):
-        def run():
-            device_identifier = 1
-            device_model, device_serial = get_device_model_serial(device_identifier)
-            if device_model and device_serial:
-                selected_items = self.file_manager_tree.selection()  # Get all selected items
-                if not selected_items:
-                    messagebox.showwarning("No Selection", "Please select one or more items to download.")
-                    return
-
-                for item in selected_items:
-                    path = self.file_manager_tree.item(item, "text")
-                    try:
-                        os.makedirs(f"./device-pull/{device_model.replace(':', '_').replace('.', '_')}-{device_serial.replace(':', '_').replace('.', '_')}", exist_ok=True)
-                        file_path = os.path.join(self.current_path, path).replace('\\', '/')
-
-                        # Get the total size of the file/folder in MB
-                        total_size_kb = self.get_remote_file_size_kb(device_serial, file_path)
-                        if total_size_kb == 0:
-                            messagebox.showerror("Error", f"Failed to get file size for {path}.")
-                            continue
-
-                        total_size_mb = total_size_kb / 1024  # Convert KB to MB
-
-                        # Create a progress window
-                        progress_window = tk.Toplevel(self)
-                        progress_window.title(f"Download Progress - {path}")
-                        progress_label = ttk.Label(progress_window, text=f"Downloading {path}...")
-                        progress_label.pack(pady=10)
-                        progress_bar = ttk.Progressbar(progress_window, orient="horizontal", length=300, mode="determinate", maximum=100)
-                        progress_bar.pack(pady=10)
-
-                        # Function to update progress
-                        def update_progress():
-                            while not download_complete:
-                                # Get the current size of the downloaded file in MB
-                                downloaded_size_kb = self.get_local_file_size_kb(f"./device-pull/{device_model.replace(':', '_').replace('.', '_')}-{device_serial.replace(':', '_').replace('.', '_')}/{path}")
-                                downloaded_size_mb = downloaded_size_kb / 1024  # Convert KB to MB
-
-                                # Cap the progress at 100%
-                                progress_percent = min(int((downloaded_size_mb / total_size_mb) * 100), 100)
-                                progress_bar["value"] = progress_percent
-                                progress_label.config(text=f"Downloading {path}... [{progress_percent}%] ({min(downloaded_size_mb, total_size_mb):.2f} MB / {total_size_mb:.2f} MB)")
-                                progress_window.update()
-                                sleep(0.5)
-
-                        # Start the download in a separate thread
-                        download_complete = False
-                        progress_thread = threading.Thread(target=update_progress)
-                        progress_thread.start()
-
-                        # Perform the download
-                        subprocess.check_call(["adb", "-s", device_serial, "pull", file_path, f"./device-pull/{device_model.replace(':', '_').replace('.', '_')}-{device_serial.replace(':', '_').replace('.', '_')}/{path}"])
-                        download_complete = True
-                        progress_thread.join()
-
-                        # Close the progress window
-                        progress_window.destroy()
-                        messagebox.showinfo("Success", f"{path} downloaded successfully!")
-                    except subprocess.CalledProcessError as e:
-                        messagebox.showerror("Error", f"Error downloading {path}: {e}")
-            else:
-                messagebox.showerror("Error", "Failed to get device model and serial number.")
+        targets = device_selection.targets()
+        if len(targets) > 1:
+            self.download_from_targets(targets)
+            return
+
+        device_model, device_serial = get_device_model_serial(device_selection.active())
+        if not (device_model and device_serial):
+            messagebox.showerror("Error", "Failed to get device model and serial number.")
+            return
+        names = self.selected_names()  # Get all selected items
+        if not names:
+            messagebox.showwarning("No Selection", "Please select one or more items to download.")
+            return
+
+        local_dir = get_device_pull_path(device_model, device_serial)
+        remote_paths = [os.path.join(self.current_path, name).replace('\\', '/') for name in names]
+        progress, control = TransferProgress(), TransferControl()
+        title = f"Downloading {names[0]}" if len(names) == 1 else f"Downloading {len(names)} items"
+        TransferProgressWindow(self, title, progress, f"{', '.join(names)} downloaded successfully!", control=control)
+
+        async def run():
+            try:
+                await services.pull_paths(remote_paths, local_dir, device_serial, progress, control)
+                progress.finish()
+            except (OSError, subprocess.CalledProcessError) as e:
+                progress.finish(e)
+
+        self.submit_transfer(run, title, device_serial, progress, control)
+
+    def download_from_targets(self, targets):
+        """Pull the selected items from every target device into that device's folder."""
+        names = self.selected_names()
+        if not names:
+            messagebox.showwarning("No Selection", "Please select one or more items to download.")
+            return
+        remote_paths = [os.path.join(self.current_path, name).replace('\\', '/') for name in names]
+
+        async def pull_items(device_serial):
+            await services.pull_paths(remote_paths, await services.device_pull_path(device_serial), device_serial)
+
+        async def run():
+            result = await gather_devices(pull_items, targets)
+            report_fleet_result(result, "Selected items downloaded successfully!", "Error downloading")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name=f"Download {len(remote_paths)} item(s) from {len(targets)} devices", lane=TRANSFER)
 
     def download_all(self):
-        def run():
-            device_identifier = 1
-            device_model, device_serial = get_device_model_serial(device_identifier)
-            if device_model and device_serial:
-                try:
-                    sanitized_model = device_model.replace(":", "_").replace(".", "_")
-                    sanitized_serial = device_serial.replace(":", "_").replace(".", "_")
-                    os.makedirs(f"./device-pull/{sanitized_model}-{sanitized_serial}", exist_ok=True)
-
-                    # Get the total size of the /sdcard directory in MB
-                    total_size_kb = self.get_remote_file_size_kb(device_serial, "/sdcard/")
-                    if total_size_kb == 0:
-                        messagebox.showerror("Error", "Failed to get directory size.")
-                        return
-                    total_size_mb = total_size_kb / 1024  # Convert KB to MB
-
-                    # Create a progress window
-                    progress_window = tk.Toplevel(self)
-                    progress_window.title("Download Progress")
-                    progress_label = ttk.Label(progress_window, text="Downloading all files from /sdcard...")
-                    progress_label.pack(pady=10)
-                    progress_bar = ttk.Progressbar(progress_window, orient="horizontal", length=300, mode="determinate", maximum=100)
-                    progress_bar.pack(pady=10)
-
-                    # Function to update progress
-                    def update_progress():
-                        while not download_complete:
-                            # Get the current size of the downloaded files in MB
-                            downloaded_size_kb = self.get_local_file_size_kb(f"./device-pull/{sanitized_model}-{sanitized_serial}")
-                            downloaded_size_mb = downloaded_size_kb / 1024  # Convert KB to MB
-
-                            # Cap the progress at 100%
-                            progress_percent = min(int((downloaded_size_mb / total_size_mb) * 100), 100)
-                            progress_bar["value"] = progress_percent
-                            progress_label.config(text=f"Downloading /sdcard... [{progress_percent}%] ({min(downloaded_size_mb, total_size_mb):.2f} MB / {total_size_mb:.2f} MB)")
-                            progress_window.update()
-                            sleep(0.5)
-
-                    # Start the download in a separate thread
-                    download_complete = False
-                    progress_thread = threading.Thread(target=update_progress)
-                    progress_thread.start()
-
-                    # Perform the download
-                    subprocess.check_call(["adb", "-s", device_serial, "pull", "/sdcard/", f"./device-pull/{sanitized_model}-{sanitized_serial}/"])
-                    download_complete = True
-                    progress_thread.join()
-
-                    # Close the progress window
-                    progress_window.destroy()
-                    messagebox.showinfo("Success", "All data from /sdcard downloaded successfully!")
-                except subprocess.CalledProcessError as e:
-                    messagebox.showerror("Error", f"Error: {e}")
-            else:
-                messagebox.showerror("Error", "Failed to get device model and serial number.")
+        """Mirror /sdcard into the device folder, pulling only new or changed files."""
+        device_model, device_serial = get_device_model_serial(device_selection.active())
+        if not (device_model and device_serial):
+            messagebox.showerror("Error", "Failed to get device model and serial number.")
+            return
+
+        local_path = os.path.join(get_device_pull_path(device_model, device_serial), "sdcard")
+        prune = False
+        if os.path.exists(manifest_path(local_path)):
+            prune = messagebox.askyesno("Download All", "Also delete local copies of files that were removed from the device?")
+
+        progress, control = TransferProgress(), TransferControl()
+        window = TransferProgressWindow(self, "Downloading /sdcard", progress, "All data from /sdcard downloaded successfully!", "Error", control)
+
+        async def run():
+            try:
+                result = await services.mirror_directory("/sdcard/", local_path, device_serial, progress, prune, control)
+                window.success_message = f"/sdcard is up to date: {result.summary()}."
+                progress.finish()
+            except (OSError, subprocess.CalledProcessError) as e:
+                progress.finish(e)
+
+        self.submit_transfer(run, "Download /sdcard", device_serial, progress, control)
+
+    def submit_transfer(self, run, name, device_serial, progress, control):
+        """Queue a transfer shown in a progress window; cancelling the task stops the transfer."""
+        def cancel():
+            control.cancel()
+            if task.state == QUEUED:
+                progress.finish(TransferCancelled())  # It never started, so close its window here
+
+        task = tasks.submit(run, name=name, serial=device_serial, on_cancel=cancel, lane=TRANSFER)
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
-        
     def copy(self):
-        selected_items = self.file_manager_tree.selection()  # Get all selected items
-        if selected_items:
+        selected_names = self.selected_names()  # Get all selected items
+        if selected_names:
             self.copied_paths = []  # Store multiple copied paths
-            for item in selected_items:
-                path = self.file_manager_tree.item(item, "text")
+            for path in selected_names:
                 full_path = os.path.join(self.current_path, path).replace('\\', '/')
                 self.copied_paths.append(full_path)
-            print(f"Copied paths: {self.copied_paths}")
 
     def paste(self):
-        def run():
+        async def run():
             if hasattr(self, "copied_paths") and self.copied_paths:
+                device_serial = await services.active_device()
                 for copied_path in self.copied_paths:
                     destination_path = os.path.join(self.current_path, os.path.basename(copied_path)).replace('\\', '/')
                     try:
-                        subprocess.check_call(["adb", "shell", "cp", "-r", f'"{copied_path}"', f'"{destination_path}"'])
+                        await services.copy_path(copied_path, destination_path, device_serial)
                     except subprocess.CalledProcessError as e:
                         messagebox.showerror("Error", f"Error copying {copied_path}: {e}")
-                self.refresh()  # Refresh the file list after pasting
+                ui.post(self.refresh)  # Refresh the file list after pasting
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name=f"Paste {len(self.copied_paths)} item(s)", serial=device_selection.active(wait=False), lane=TRANSFER)
 
     def mkdir(self):
         new_dir_name = simpledialog.askstring("Create Directory", "Enter new directory name:")
         if new_dir_name:
             full_path = os.path.join(self.current_path, new_dir_name).replace('\\', '/')
-            try:
-                subprocess.check_call(["adb", "shell", "mkdir", f'"{full_path}"'])
-                messagebox.showinfo("Success", f"Directory '{new_dir_name}' created successfully!")
-                self.refresh()
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error: {e}")
 
-    def get_remote_file_size_kb(self, device_serial, remote_path):
-        """Get the size of a file or folder on the remote device in KB."""
-        try:
-            # Use `du -ks` to get the size in KB
-            output = subprocess.check_output(
-                ["adb", "-s", device_serial, "shell", "du", "-s", f'"{remote_path}"'],
-                universal_newlines=True
-            )
-            size_kb = int(output.split()[0])  # Size in KB
-            return size_kb
-        except subprocess.CalledProcessError:
-            return 0
-
-    def get_local_file_size_kb(self, local_path):
-        """Get the size of a file or folder on the local machine in KB."""
-        if os.path.isfile(local_path):
-            return os.path.getsize(local_path) / 1024  # Convert bytes to KB
-        elif os.path.isdir(local_path):
-            total_size_bytes = 0
-            for dirpath, _, filenames in os.walk(local_path):
-                for f in filenames:
-                    fp = os.path.join(dirpath, f)
-                    total_size_bytes += os.path.getsize(fp)
-            return total_size_bytes / 1024  # Convert bytes to KB
-        else:
-            return 0
+            async def run():
+                try:
+                    await services.make_directory(full_path, await services.active_device())
+                    messagebox.showinfo("Success", f"Directory '{new_dir_name}' created successfully!")
+                    ui.post(self.refresh)
+                except subprocess.CalledProcessError as e:
+                    messagebox.showerror("Error", f"Error: {e}")
+
+            tasks.submit(run, name=f"Create {new_dir_name}", serial=device_selection.active(wait=False), key=("mkdir", full_path))
 
     def upload(self):
         # Ask the user if they want to upload a folder or files
@@ -461,139 +414,111 @@ class FileManagerPage(ttk.Frame):
             folder_path = filedialog.askdirectory(initialdir="/", title="Select folder to upload")
             if folder_path:
                 # If no item is selected, default to the current directory
-                if not self.file_manager_tree.selection():
+                if not self.selected_names():
                     destination_path = self.current_path
                 else:
                     # If an item is selected, use its path as the destination
-                    selected_item = self.file_manager_tree.selection()[0]
-                    selected_path = self.file_manager_tree.item(selected_item, "text")
+                    selected_path = self.selected_names()[0]
                     destination_path = os.path.join(self.current_path, selected_path).replace('\\', '/')
 
-                # Start the folder upload in a separate thread
-                threading.Thread(target=self.upload_folder, args=(folder_path, destination_path)).start()
+                self.upload_folder(folder_path, destination_path)
         else:  # User wants to upload files
             file_paths = filedialog.askopenfilenames(initialdir="/", title="Select files to upload")
             if file_paths:
                 # If no item is selected, default to the current directory
-                if not self.file_manager_tree.selection():
+                if not self.selected_names():
                     destination_path = self.current_path
                 else:
                     # If an item is selected, use its path as the destination
-                    selected_item = self.file_manager_tree.selection()[0]
-                    selected_path = self.file_manager_tree.item(selected_item, "text")
+                    selected_path = self.selected_names()[0]
                     destination_path = os.path.join(self.current_path, selected_path).replace('\\', '/')
 
-                # Start the file upload in a separate thread
-                threading.Thread(target=self.upload_files, args=(file_paths, destination_path)).start()
+                self.upload_files(file_paths, destination_path)
 
     def upload_folder(self, folder_path, destination_path):
         """Upload a folder (and its contents) to the device in a separate thread."""
-        try:
-            # Upload the folder and its contents to the destination path
-            subprocess.check_call(["adb", "push", folder_path, destination_path])
-            messagebox.showinfo("Success", "Folder uploaded successfully!")
-            self.refresh()  # Refresh the file list after upload
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Error", f"Error uploading folder: {e}")
+        self.push_with_progress([folder_path], destination_path, f"Uploading {os.path.basename(os.path.normpath(folder_path))}",
+                                "Folder uploaded successfully!", "Error uploading folder")
 
     def upload_files(self, file_paths, destination_path):
         """Upload multiple files to the device in a separate thread."""
-        try:
-            for file_path in file_paths:
-                # Upload each file to the destination path
-                subprocess.check_call(["adb", "push", file_path, destination_path])
-            messagebox.showinfo("Success", "All files uploaded successfully!")
-            self.refresh()  # Refresh the file list after upload
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Error", f"Error uploading files: {e}")
+        self.push_with_progress(file_paths, destination_path, f"Uploading {len(file_paths)} file(s)",
+                                "All files uploaded successfully!", "Error uploading files")
+
+    def push_with_progress(self, local_paths, destination_path, title, success_message, error_message):
+        device_serial = device_selection.active()
+        progress, control = TransferProgress(), TransferControl()
+        TransferProgressWindow(self, title, progress, success_message, error_message, control)
+
+        async def run():
+            try:
+                await services.push_paths(local_paths, destination_path, device_serial, progress, control)
+                progress.finish()
+            except (OSError, subprocess.CalledProcessError) as e:
+                progress.finish(e)
+            ui.post(self.refresh)  # Refresh the file list after upload
+
+        self.submit_transfer(run, title, device_serial, progress, control)
 
     def compress(self):
         """Compress a selected folder or file on the device."""
-        selected_item = self.file_manager_tree.selection()
-        if not selected_item:
+        selected_names = self.selected_names()
+        if not selected_names:
             messagebox.showwarning("No Selection", "Please select a file or folder to compress.")
             return
 
-        item = selected_item[0]
-        path = self.file_manager_tree.item(item, "text")
+        path = selected_names[0]
         full_path = os.path.join(self.current_path, path).replace('\\', '/')
 
         # Check if the selected item is a directory or file
-        if not self.check_if_directory_compress(full_path) and not self.check_if_file(full_path):
+        entry = self.entries.get(path)
+        if entry is None or not (entry.is_dir or entry.is_file):
             messagebox.showerror("Error", "Selected item is neither a file nor a directory.")
             return
 
-        # Get the size of the folder/file
-        size_kb = self.get_remote_file_size_kb(get_connected_devices()[0], full_path)
-        if size_kb == 0:
-            messagebox.showerror("Error", "Failed to get size of the selected item.")
-            return
-
-        # Convert size to the appropriate unit
-        if size_kb < 1000:  # Less than 1000 KB
-            size_str = f"{size_kb:.2f} KB"
-        elif size_kb < 1000 * 1000:  # Less than 1000 MB
-            size_mb = size_kb / 1024  # Convert KB to MB
-            size_str = f"{size_mb:.2f} MB"
-        else:  # Greater than or equal to 1000 MB
-            size_gb = size_kb / (1024 * 1024)  # Convert KB to GB
-            size_str = f"{size_gb:.2f} GB"
-
-        # Ask for confirmation with the size in the appropriate unit
-        confirm = messagebox.askyesno(
-            "Confirm Compression",
-            f"The selected item is {size_str}. Do you want to compress it?"
-        )
-        if not confirm:
-            return
+        # Sizing a folder runs `du` on the device, so it happens in the task rather than on the Tk thread
+        async def run_compression():
+            device_serial = await services.active_device()
+            # Files carry their size in the listing; only folders need `du`
+            size_bytes = await services.directory_size(full_path, device_serial) if entry.is_dir else entry.size
+            if entry.is_dir and size_bytes == 0:
+                messagebox.showerror("Error", "Failed to get size of the selected item.")
+                return
 
-        # Ask for the output file name
-        output_file = simpledialog.askstring(
-            "Compress",
-            "Enter the output file name (e.g., myfiles.tar.gz):",
-            initialvalue=f"{path}.tar.gz"
-        )
-        if not output_file:
-            return
+            # Ask for confirmation with the size in the appropriate unit
+            confirm = await call_ui(messagebox.askyesno, "Confirm Compression",
+                                    f"The selected item is {format_size(size_bytes)}. Do you want to compress it?")
+            if not confirm:
+                return
 
-        output_path = os.path.join(self.current_path, output_file).replace('\\', '/')
+            # Ask for the output file name
+            output_file = await call_ui(lambda: simpledialog.askstring(
+                "Compress",
+                "Enter the output file name (e.g., myfiles.tar.gz):",
+                initialvalue=f"{path}.tar.gz"
+            ))
+            if not output_file:
+                return
+            output_path = os.path.join(self.current_path, output_file).replace('\\', '/')
 
-        # Perform the compression
-        def run_compression():
+            # Perform the compression
             try:
-                if self.check_if_directory_compress(full_path):
-                    # Compress a directory
-                    command = [
-                        "adb", "shell",
-                        "tar", "-czf", f'"{output_path}"', "-C", f'"{os.path.dirname(full_path)}"', f'"{os.path.basename(full_path)}"'
-                    ]
-                else:
-                    # Compress a single file
-                    command = [
-                        "adb", "shell",
-                        "tar", "-czf", f'"{output_path}"', "-C", f'"{os.path.dirname(full_path)}"', f'"{os.path.basename(full_path)}"'
-                    ]
-
-                # Run the command using subprocess.check_call
-                subprocess.check_call(command)
+                await services.compress(full_path, output_path, device_serial)
                 messagebox.showinfo("Success", f"Compression completed: {output_path}")
-                self.refresh()  # Refresh the file list
+                ui.post(self.refresh)  # Refresh the file list
             except subprocess.CalledProcessError as e:
                 messagebox.showerror("Error", f"Error during compression: {e}")
 
-        # Run the compression in a separate thread
-        thread = threading.Thread(target=run_compression)
-        thread.start()
+        tasks.submit(run_compression, name=f"Compress {path}", serial=device_selection.active(wait=False), key=("compress", full_path), lane=TRANSFER)
 
     def decompress(self):
         """Decompress a selected .tar.gz or .tar file on the device."""
-        selected_item = self.file_manager_tree.selection()
-        if not selected_item:
+        selected_names = self.selected_names()
+        if not selected_names:
             messagebox.showwarning("No Selection", "Please select a .tar.gz or .tar file to decompress.")
             return
 
-        item = selected_item[0]
-        path = self.file_manager_tree.item(item, "text")
+        path = selected_names[0]
         full_path = os.path.join(self.current_path, path).replace('\\', '/')
 
         # Check if the selected item is a .tar.gz or .tar file
@@ -601,21 +526,12 @@ class FileManagerPage(ttk.Frame):
             messagebox.showerror("Error", "Selected item is not a .tar.gz or .tar file.")
             return
 
-        # Get the size of the file
-        size_kb = self.get_remote_file_size_kb(get_connected_devices()[0], full_path)
-        if size_kb == 0:
+        # The listing already has the file size
+        entry = self.entries.get(path)
+        if entry is None or not entry.size:
             messagebox.showerror("Error", "Failed to get size of the selected item.")
             return
-
-        # Convert size to the appropriate unit
-        if size_kb < 1000:  # Less than 1000 KB
-            size_str = f"{size_kb:.2f} KB"
-        elif size_kb < 1000 * 1000:  # Less than 1000 MB
-            size_mb = size_kb / 1024  # Convert KB to MB
-            size_str = f"{size_mb:.2f} MB"
-        else:  # Greater than or equal to 1000 MB
-            size_gb = size_kb / (1024 * 1024)  # Convert KB to GB
-            size_str = f"{size_gb:.2f} GB"
+        size_str = format_size(entry.size)
 
         # Ask for confirmation with the size in the appropriate unit
         confirm = messagebox.askyesno(
@@ -635,23 +551,13 @@ class FileManagerPage(ttk.Frame):
             return
 
         # Perform the decompression
-        def run_decompression():
+        async def run_decompression():
             try:
-                # Create the output directory if it doesn't exist
-                subprocess.check_call(["adb", "shell", "mkdir", "-p", f'"{output_dir}"'])
-
-                # Decompress the file
-                command = [
-                    "adb", "shell",
-                    "tar", "-xzf", f'"{full_path}"', "-C", f'"{output_dir}"'
-                ]
-                subprocess.check_call(command)
+                await services.decompress(full_path, output_dir, await services.active_device())
                 messagebox.showinfo("Success", f"Decompression completed to: {output_dir}")
-                self.refresh()  # Refresh the file list
+                ui.post(self.refresh)  # Refresh the file list
             except subprocess.CalledProcessError as e:
                 messagebox.showerror("Error", f"Error during decompression: {e}")
 
-        # Run the decompression in a separate thread
-        thread = threading.Thread(target=run_decompression)
-        thread.start()
+        tasks.submit(run_decompression, name=f"Decompress {path}", serial=device_selection.active(wait=False), key=("decompress", full_path, output_dir), lane=TRANSFER)
 
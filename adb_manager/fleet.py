@@ -0,0 +1,68 @@
+# fleet.py
+from .ui_dispatcher import messagebox
+
+
+class DeviceResult:
+    """Outcome of one action on one device."""
+
+    def __init__(self, serial, value=None, error=None, seconds=0.0):
+        self.serial = serial
+        self.value = value
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.ok else f"error={self.error!r}"
+        return f"DeviceResult({self.serial!r}, {status}, {self.seconds:.3f}s)"
+
+
+class FleetResult:
+    """Per-device results of a fan-out, in the order the devices were given."""
+
+    def __init__(self, results, seconds):
+        self.results = results
+        self.seconds = seconds
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    @property
+    def succeeded(self):
+        return [result for result in self.results if result.ok]
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def ok(self):
+        return bool(self.results) and not self.failed
+
+    def summary(self):
+        text = f"Succeeded on {len(self.succeeded)}/{len(self.results)} device(s) in {self.seconds:.1f} s"
+        if self.failed:
+            text += "\nFailed:\n" + "\n".join(f"  {result.serial}: {result.error}" for result in self.failed)
+        return text
+
+
+def report_fleet_result(result, success_message, error_message):
+    """Show the usual single-device message, or a summary when several devices were targeted."""
+    if not result.results:
+        messagebox.showerror("Error", "No device connected.")
+    elif len(result) == 1:
+        if result.ok:
+            messagebox.showinfo("Success", success_message)
+        else:
+            messagebox.showerror("Error", f"{error_message}: {result.results[0].error}")
+    elif result.ok:
+        messagebox.showinfo("Success", f"{success_message}\n{result.summary()}")
+    else:
+        messagebox.showerror("Error", f"{error_message}\n{result.summary()}")
+
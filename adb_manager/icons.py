@@ -0,0 +1,232 @@
+# icons.py
+import hashlib
+import json
+import os
+import threading
+import tkinter as tk
+
+ICONS_DIR = "./icons"
+ICON_CACHE_DIR = "./icons/.sized"  # Pre-resized copies, loaded by Tk without Pillow
+ACBRIDGE_ICONS_DIR = "./tools/ACBridge/icons"  # App icons exported by the ACBridge companion app
+THUMBNAIL_CACHE_DIR = "./tools/ACBridge/thumbnails"
+THUMBNAIL_SIZE = 50
+
+
+class IconCache:
+    """The PNG icons of all pages, resized once and shared.
+
+    `get("wifi", 24)` returns the same PhotoImage to every caller. The
+    first time a (name, size) is needed it is resized with Pillow and
+    written to ICON_CACHE_DIR under a name that includes the source
+    file's mtime; later launches load that copy straight into Tk, so
+    neither Pillow nor a resize is needed until an icon changes.
+    """
+
+    def __init__(self, root=ICONS_DIR, cache_dir=ICON_CACHE_DIR):
+        self.root = root
+        self.cache_dir = cache_dir
+        self._images = {}  # (name, width, height) -> PhotoImage, or None for a missing icon
+        self.resized = 0  # Icons decoded and resized with Pillow
+        self.cache_hits = 0  # Icons loaded from a pre-resized copy
+
+    def get(self, name, width, height=None):
+        """The icon `name` (file name without .png) at width x height; None when it does not exist."""
+        key = (name, width, height or width)
+        if key not in self._images:
+            self._images[key] = self._load(*key)
+        return self._images[key]
+
+    def cached_path(self, name, width, height, mtime_ns):
+        return os.path.join(self.cache_dir, f"{name}-{width}x{height}-{mtime_ns}.png")
+
+    def _load(self, name, width, height):
+        source = os.path.join(self.root, f"{name}.png")
+        try:
+            mtime_ns = os.stat(source).st_mtime_ns
+        except OSError:
+            print(f"Warning: Icon not found for {name}")
+            return None
+        cached = self.cached_path(name, width, height, mtime_ns)
+        if os.path.exists(cached):
+            try:
+                image = tk.PhotoImage(file=cached)
+                self.cache_hits += 1
+                return image
+            except tk.TclError:
+                pass  # Unreadable copy (or a Tk without PNG support); resize again
+        try:
+            from PIL import Image, ImageTk  # Only needed when an icon is not in the cache yet
+            icon = Image.open(source)
+            icon = icon.resize((width, height), Image.Resampling.LANCZOS)
+        except Exception as e:
+            print(f"Error loading icon {name}: {e}")
+            return None
+        self.resized += 1
+        self._store(icon, name, width, height, cached)
+        return ImageTk.PhotoImage(icon)
+
+    def _store(self, icon, name, width, height, cached):
+        """Write the resized copy and drop copies made from older versions of the source."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            prefix = f"{name}-{width}x{height}-"
+            for entry in os.listdir(self.cache_dir):
+                if entry.startswith(prefix) and entry[len(prefix):-len(".png")].isdigit():
+                    os.remove(os.path.join(self.cache_dir, entry))
+            partial = cached + ".part"
+            icon.save(partial, format="PNG")
+            os.replace(partial, cached)
+        except OSError as e:
+            print(f"Warning: Could not cache icon {name}: {e}")
+
+
+class ThumbnailCache:
+    """App icon thumbnails for the package list, keyed by package name and icon hash.
+
+    `prepare(package)` does the file work and may run on any thread: it
+    stats the exported icon and looks its sha1 up in a persisted index
+    (rehashing only when the file's mtime or size changed), and resizes
+    the icon for that hash once into THUMBNAIL_CACHE_DIR. `image()` then
+    only turns the result into a PhotoImage on the Tk thread; in memory
+    one PhotoImage per hash is shared by every row, refresh and search.
+    Callers only ask for the rows on screen, so a refresh of 400
+    packages decodes a screenful at most.
+    """
+
+    def __init__(self, source_dir=ACBRIDGE_ICONS_DIR, cache_dir=THUMBNAIL_CACHE_DIR, size=THUMBNAIL_SIZE):
+        self.source_dir = source_dir
+        self.cache_dir = cache_dir
+        self.size = size
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self._index = None  # Package -> [mtime_ns, size, sha1] of its exported icon
+        self._index_dirty = False
+        self._lock = threading.Lock()  # Guards the index between the workers preparing thumbnails
+        self._images = {}  # sha1 -> PhotoImage, or None for an unreadable icon; Tk thread only
+        self._loaded = {}  # Package -> the image `image` last returned for it
+        self._available = None
+        self.resized = 0  # Thumbnails decoded and resized with Pillow
+        self.disk_hits = 0  # Thumbnails loaded from THUMBNAIL_CACHE_DIR
+        self.memory_hits = 0  # Thumbnails already in memory
+
+    def scan(self):
+        """Note which packages have an exported icon; one directory read instead of a stat per row."""
+        try:
+            self._available = {entry[:-len(".png")] for entry in os.listdir(self.source_dir) if entry.endswith(".png")}
+        except OSError:
+            self._available = set()
+
+    def has(self, package):
+        if self._available is None:
+            self.scan()
+        return package in self._available
+
+    def peek(self, package):
+        """The thumbnail last shown for `package`, without touching the disk; None if there is none yet."""
+        return self._loaded.get(package)
+
+    def prepare(self, package):
+        """(sha1, thumbnail) of `package`'s icon for `image()`, or None when it has no exported icon.
+
+        The thumbnail is the path of the resized copy, a Pillow image when
+        the copy could not be written, or None for an unreadable icon or
+        one already in memory. Reads, hashes and resizes; not Tk.
+        """
+        source = os.path.join(self.source_dir, f"{package}.png")
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._load_index().get(package)
+        if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+            with open(source, "rb") as file:
+                digest = hashlib.sha1(file.read()).hexdigest()
+            with self._lock:
+                self._index[package] = [stat.st_mtime_ns, stat.st_size, digest]
+                self._index_dirty = True
+        else:
+            digest = entry[2]
+        if digest in self._images:
+            return digest, None
+        return digest, self._thumbnail(source, digest)
+
+    def image(self, package, prepared):
+        """The PhotoImage for what `prepare(package)` returned; Tk thread only."""
+        if prepared is None:
+            self._loaded.pop(package, None)
+            return None
+        digest, thumbnail = prepared
+        if digest in self._images:
+            self.memory_hits += 1
+        else:
+            self._images[digest] = self._photo(thumbnail)
+        self._loaded[package] = self._images[digest]
+        return self._images[digest]
+
+    def get(self, package):
+        """The thumbnail of `package`, or None when it has no exported icon; prepare() and image() in one go."""
+        return self.image(package, self.prepare(package))
+
+    def save_index(self):
+        with self._lock:
+            if not self._index_dirty:
+                return
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                partial = self.index_path + ".part"
+                with open(partial, "w", encoding="utf-8") as file:
+                    json.dump(self._index, file)
+                os.replace(partial, self.index_path)
+                self._index_dirty = False
+            except OSError as e:
+                print(f"Warning: Could not save the thumbnail index: {e}")
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as file:
+                    self._index = json.load(file)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _thumbnail(self, source, digest):
+        cached = os.path.join(self.cache_dir, f"{digest}-{self.size}.png")
+        if os.path.exists(cached):
+            self.disk_hits += 1
+            return cached
+        try:
+            from PIL import Image  # Only needed for icons not in the cache yet
+            thumbnail = Image.open(source).resize((self.size, self.size))
+        except Exception as e:
+            print(f"Error loading icon {source}: {e}")
+            return None
+        self.resized += 1
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            thumbnail.save(cached + ".part", format="PNG")
+            os.replace(cached + ".part", cached)
+        except OSError as e:
+            print(f"Warning: Could not cache thumbnail {cached}: {e}")
+            return thumbnail
+        return cached
+
+    def _photo(self, thumbnail):
+        if thumbnail is None:
+            return None
+        try:
+            if isinstance(thumbnail, str):
+                try:
+                    return tk.PhotoImage(file=thumbnail)
+                except tk.TclError:
+                    from PIL import Image  # A Tk without PNG support; the copy is already small
+                    thumbnail = Image.open(thumbnail)
+            from PIL import ImageTk
+            return ImageTk.PhotoImage(thumbnail)
+        except Exception as e:
+            print(f"Error loading thumbnail {thumbnail}: {e}")
+            return None
+
+
+icon_cache = IconCache()
+thumbnail_cache = ThumbnailCache()
@@ -0,0 +1,236 @@
+# install.py
+import os
+import posixpath
+import re
+import shlex
+import threading
+import time
+import zipfile
+from .adb_client import SYNC_DATA_MAX, AdbCommandError, AdbError, adb
+from .transfer import TransferCancelled
+
+BUNDLE_EXTENSIONS = (".apks", ".xapk", ".apkm")  # Zip files of split APKs (bundletool, APKPure, APKMirror)
+INSTALL_OPTIONS = "-r"  # Replace an installed package, so a batch can update apps as well as add them
+INSTALL_ATTEMPTS = 2  # Tries per package and device; pm refusals (`Failure [...]`) are not retried
+RETRY_DELAY = 1.0
+MAX_INSTALL_DEVICES = 16  # Devices pushing at once; more mostly compete for the host's USB bandwidth
+REMOTE_STAGING_DIR = "/data/local/tmp"
+
+QUEUED = "queued"
+INSTALLING = "installing"
+INSTALLED = "installed"
+FAILED = "failed"
+
+
+class ApkFile:
+    """One APK to push: a local file, or a member of a split bundle read straight out of the zip."""
+
+    def __init__(self, path, member=None):
+        self.path = path
+        self.member = member
+        if member is None:
+            self.name = os.path.basename(path)
+            self.size = os.path.getsize(path)
+        else:
+            self.name = posixpath.basename(member.filename)
+            self.size = member.file_size
+
+    def chunks(self, on_chunk=None, control=None):
+        if self.member is None:
+            file = open(self.path, "rb")
+        else:
+            archive = zipfile.ZipFile(self.path)  # One handle per stream, so devices can read the bundle at once
+            file = archive.open(self.member)
+        try:
+            while True:
+                if control is not None:
+                    control.checkpoint()
+                chunk = file.read(SYNC_DATA_MAX)
+                if not chunk:
+                    return
+                if on_chunk is not None:
+                    on_chunk(len(chunk))
+                yield chunk
+        finally:
+            file.close()
+            if self.member is not None:
+                archive.close()
+
+
+class InstallJob:
+    """One package to install: a single APK or a set of splits installed in one session."""
+
+    def __init__(self, name, apks):
+        self.name = name
+        self.apks = apks
+
+    @property
+    def size(self):
+        return sum(apk.size for apk in self.apks)
+
+    def __repr__(self):
+        return f"InstallJob({self.name!r}, {len(self.apks)} APK(s))"
+
+
+def bundle_apks(path):
+    """The APKs inside a split bundle; bundletool's `splits/` folder when there is one."""
+    with zipfile.ZipFile(path) as archive:
+        members = [member for member in archive.infolist()
+                   if member.filename.endswith(".apk") and not member.is_dir()]
+    splits = [member for member in members if member.filename.startswith("splits/")]
+    if splits:
+        members = splits
+    else:
+        members = [member for member in members if not member.filename.startswith("standalones/")]
+    if not members:
+        raise AdbError(f"{path} contains no APKs", cmd=path)
+    members.sort(key=lambda member: (not posixpath.basename(member.filename).startswith("base"), member.filename))
+    return [ApkFile(path, member) for member in members]
+
+
+def collect_install_jobs(paths):
+    """InstallJobs for APKs, split bundles and folders of either.
+
+    A folder's APKs are installed one by one, except in a subfolder,
+    whose APKs are taken as the splits of one app.
+    """
+    jobs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in sorted(os.listdir(path)):
+                entry_path = os.path.join(path, entry)
+                if os.path.isdir(entry_path):
+                    splits = sorted(name for name in os.listdir(entry_path) if name.endswith(".apk"))
+                    if splits:
+                        jobs.append(InstallJob(entry, [ApkFile(os.path.join(entry_path, name)) for name in splits]))
+                elif entry.endswith(".apk") or entry.endswith(BUNDLE_EXTENSIONS):
+                    jobs.extend(collect_install_jobs([entry_path]))
+        elif path.endswith(BUNDLE_EXTENSIONS):
+            try:
+                jobs.append(InstallJob(os.path.basename(path), bundle_apks(path)))
+            except zipfile.BadZipFile as e:
+                raise AdbError(f"{path} is not a valid bundle: {e}", cmd=path) from None
+        else:
+            jobs.append(InstallJob(os.path.basename(path), [ApkFile(path)]))
+    return jobs
+
+
+class InstallProgress:
+    """Per-device, per-package state of a batch install, read by the UI on its own schedule."""
+
+    def __init__(self):
+        self.states = {}  # (serial, job name) -> (state, error message)
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.finished = False
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add(self, serial, job):
+        with self._lock:
+            self.states[(serial, job.name)] = (QUEUED, "")
+            self.total_bytes += job.size
+
+    def set(self, serial, job, state, error=""):
+        with self._lock:
+            self.states[(serial, job.name)] = (state, error)
+
+    def advance(self, size):
+        with self._lock:
+            self.done_bytes += size
+
+    def counts(self):
+        """State -> number of (device, package) pairs in it."""
+        counts = {}
+        with self._lock:
+            for state, _error in self.states.values():
+                counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def finish(self, error=None):
+        self.error = error
+        self.finished = True
+
+    @property
+    def percent(self):
+        if not self.total_bytes:
+            return 100 if self.finished else 0
+        return min(int(self.done_bytes * 100 / self.total_bytes), 100)
+
+
+def _check_pm(command, result):
+    """pm's output, or AdbCommandError unless it exited 0 and its last line reports success."""
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines or not lines[-1].startswith("Success"):
+        raise AdbCommandError(command, result.returncode or 1, result.stdout, result.stderr or result.stdout)
+    return result.stdout
+
+
+def install_job(job, serial=None, client=adb, progress=None, options=INSTALL_OPTIONS, control=None):
+    """Push a job's APKs over one sync session and install them; splits go through one pm session.
+
+    `control` is checked between chunks, so a cancel stops a push under
+    way. When the install fails, the bytes it pushed are taken off
+    `progress` again: a retry pushes them once more.
+    """
+    staging = posixpath.join(REMOTE_STAGING_DIR, f"adb-manager-{os.getpid()}-{threading.get_ident()}")
+    sent = 0
+    remote_paths = []
+
+    def on_chunk(size):
+        nonlocal sent
+        sent += size
+        if progress is not None:
+            progress.advance(size)
+
+    try:
+        with client.sync(serial) as sync:
+            for index, apk in enumerate(job.apks):
+                remote_path = f"{staging}-{index}.apk"
+                remote_paths.append(remote_path)
+                sync.send(remote_path, apk.chunks(on_chunk, control), mode=0o644, mtime=time.time())
+        if len(remote_paths) == 1:
+            command = " ".join(part for part in ("pm install", options, shlex.quote(remote_paths[0])) if part)
+            return _check_pm(command, client.run(command, serial=serial))
+        command = " ".join(part for part in ("pm install-create", options, f"-S {job.size}") if part)
+        match = re.search(r"\[(\d+)\]", _check_pm(command, client.run(command, serial=serial)))
+        if match is None:
+            raise AdbError(f"pm install-create did not return a session for {job.name}", cmd=command)
+        session = match.group(1)
+        # Every write and the commit in one shell call
+        writes = [f"pm install-write -S {apk.size} {session} {shlex.quote(f'{index}_{apk.name}')} {shlex.quote(remote_path)}"
+                  for index, (apk, remote_path) in enumerate(zip(job.apks, remote_paths))]
+        command = " && ".join(writes + [f"pm install-commit {session}"])
+        try:
+            return _check_pm(command, client.run(command, serial=serial))
+        except AdbCommandError:
+            client.run(f"pm install-abandon {session}", serial=serial)  # Fails harmlessly once committed
+            raise
+    except BaseException:
+        if progress is not None:
+            progress.advance(-sent)
+        raise
+    finally:
+        if remote_paths:
+            try:
+                client.run("rm -f " + " ".join(shlex.quote(path) for path in remote_paths), serial=serial)
+            except (AdbError, OSError) as e:  # Keep the install's own error; a stale staging file is harmless
+                print(f"Error removing staged APKs of {job.name} on {serial}: {e}")
+
+
+def is_refusal(error):
+    """True for errors pm reported about the package itself, which another try would only repeat."""
+    text = f"{getattr(error, 'output', '') or ''} {getattr(error, 'stderr', '') or ''}"
+    return isinstance(error, AdbCommandError) and "Failure [" in text
+
+
+def install_with_retry(job, serial=None, client=adb, progress=None, attempts=INSTALL_ATTEMPTS, control=None):
+    """install_job, tried again after a dropped connection or a failed push."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return install_job(job, serial, client, progress, control=control)
+        except (AdbError, OSError) as e:
+            if attempt == attempts or is_refusal(e) or isinstance(e, TransferCancelled):
+                raise
+            print(f"Retrying {job.name} on {serial}: {e}")
+            time.sleep(RETRY_DELAY)
@@ -0,0 +1,218 @@
+# listing.py
+import collections
+import posixpath
+import stat
+import threading
+import time
+from .adb_client import AdbError, adb
+
+
+class RemoteEntry:
+    """One directory entry with the metadata sync LIST returns.
+
+    For symlinks, `target_mode` is the mode of what the link points to, so
+    a link to a directory can be opened like a directory. Slots keep a
+    100k-entry folder small.
+    """
+
+    __slots__ = ("name", "mode", "size", "mtime", "target_mode")
+
+    def __init__(self, name, mode, size, mtime, target_mode=None):
+        self.name = name
+        self.mode = mode
+        self.size = size
+        self.mtime = mtime
+        self.target_mode = target_mode
+
+    @property
+    def is_link(self):
+        return stat.S_ISLNK(self.mode)
+
+    @property
+    def is_dir(self):
+        mode = self.target_mode if self.is_link else self.mode
+        return mode is not None and stat.S_ISDIR(mode)
+
+    @property
+    def is_file(self):
+        mode = self.target_mode if self.is_link else self.mode
+        return mode is not None and stat.S_ISREG(mode)
+
+    @property
+    def hidden(self):
+        return self.name.startswith(".")
+
+    def modified(self):
+        return time.strftime("%Y-%m-%d %H:%M", time.localtime(self.mtime)) if self.mtime else ""
+
+    def __repr__(self):
+        kind = "dir" if self.is_dir else "file" if self.is_file else "other"
+        return f"RemoteEntry({self.name!r}, {kind}, size={self.size}, mtime={self.mtime})"
+
+
+LISTING_BATCH = 256  # Entries handed to the UI at a time while a listing streams in
+
+
+def sort_entries(entries):
+    """Folders first, then files, each by name."""
+    entries.sort(key=lambda entry: (not entry.is_dir, entry.name.lower()))
+    return entries
+
+
+def iter_directory(path, serial=None, client=adb, batch_size=LISTING_BATCH):
+    """Yield lists of RemoteEntry objects as a sync LIST streams them in, unsorted.
+
+    The directory itself is stat'ed first, since LIST answers a missing
+    path with an empty listing. Symlinks need a STAT each, which has to
+    wait until LIST is done, so they arrive in the last batch.
+    """
+    with client.sync(serial) as sync:
+        info = sync.stat(path)
+        if info is None or not stat.S_ISDIR(info.mode):
+            raise AdbError(f"{path}: No such directory", cmd=path)
+        batch, links = [], []
+        for item in sync.iter_list(path):
+            entry = RemoteEntry(item.name, item.mode, item.size, item.mtime)
+            if entry.is_link:
+                links.append(entry)
+                continue
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        for entry in links:
+            target = sync.stat(posixpath.join(path, entry.name))
+            entry.target_mode = target.mode if target is not None else None
+            batch.append(entry)
+        if batch:
+            yield batch
+
+
+def list_directory(path, serial=None, client=adb):
+    """List a remote directory over one sync session, folders first, then files, by name."""
+    entries = []
+    for batch in iter_directory(path, serial, client):
+        entries.extend(batch)
+    return sort_entries(entries)
+
+
+LISTING_CACHE_SIZE = 64  # Directory listings kept per process
+PREFETCH_LIMIT = 8  # Subdirectories prefetched after a folder is shown
+
+
+def _cache_key(serial, path):
+    return serial, posixpath.normpath(path)
+
+
+class ListingCache:
+    """LRU cache of directory listings keyed by (device serial, path).
+
+    Going back to a folder, or into one that was prefetched, is served
+    without a device call. The app invalidates a path whenever it changes
+    it; anything else changed on the device shows up on an explicit
+    refresh. Prefetching runs on one background thread so it never competes
+    with the listing the user is waiting for.
+    """
+
+    def __init__(self, client=adb, max_entries=LISTING_CACHE_SIZE):
+        self.client = client
+        self.max_entries = max_entries
+        self._listings = collections.OrderedDict()
+        self._generation = 0  # Bumped by every invalidation
+        self._lock = threading.Lock()
+        self._prefetch_queue = collections.deque()
+        self._prefetch_ready = threading.Condition(self._lock)
+        self._prefetch_thread = None
+
+    def peek(self, path, serial=None):
+        """Return the cached listing or None, without touching the device."""
+        key = _cache_key(serial, path)
+        with self._lock:
+            entries = self._listings.get(key)
+            if entries is not None:
+                self._listings.move_to_end(key)
+            return entries
+
+    def get(self, path, serial=None, refresh=False):
+        """Return the listing for `path`, reading it from the device if it is not cached (or `refresh`)."""
+        if not refresh:
+            entries = self.peek(path, serial)
+            if entries is not None:
+                return entries
+        generation = self._generation
+        entries = list_directory(path, serial, self.client)
+        self._store(_cache_key(serial, path), entries, generation)
+        return entries
+
+    def stream(self, path, serial=None, batch_size=LISTING_BATCH):
+        """Like get(refresh=True), but yield the entries in batches as they arrive.
+
+        The complete listing is cached once the last batch is in.
+        """
+        generation = self._generation
+        entries = []
+        for batch in iter_directory(path, serial, self.client, batch_size):
+            entries.extend(batch)
+            yield batch
+        self._store(_cache_key(serial, path), sort_entries(entries), generation)
+
+    def _store(self, key, entries, generation):
+        with self._lock:
+            if generation != self._generation:
+                return  # Invalidated while listing; the result may already be stale
+            self._listings[key] = entries
+            self._listings.move_to_end(key)
+            while len(self._listings) > self.max_entries:
+                self._listings.popitem(last=False)
+
+    def invalidate(self, path, serial=None):
+        """Forget `path`, everything cached below it, and its parent (whose entry for it changed)."""
+        serial, path = _cache_key(serial, path)
+        prefix = path.rstrip("/") + "/"
+        with self._lock:
+            self._generation += 1
+            for key in list(self._listings):
+                if key[0] == serial and (key[1] == path or key[1].startswith(prefix) or key[1] == posixpath.dirname(path)):
+                    del self._listings[key]
+
+    def invalidate_device(self, serial):
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._listings if key[0] == serial]:
+                del self._listings[key]
+
+    def prefetch(self, path, entries, serial=None, limit=PREFETCH_LIMIT):
+        """Queue the first `limit` uncached subdirectories of `path` for a background listing.
+
+        Whatever was still queued for the previous folder is dropped.
+        """
+        paths = [posixpath.join(path, entry.name) for entry in entries if entry.is_dir and not entry.hidden]
+        with self._lock:
+            self._prefetch_queue.clear()
+            queued = 0
+            for child in paths:
+                if queued >= limit:
+                    break
+                if _cache_key(serial, child) not in self._listings:
+                    self._prefetch_queue.append((serial, child))
+                    queued += 1
+            if queued and self._prefetch_thread is None:
+                self._prefetch_thread = threading.Thread(target=self._prefetch_loop, name="listing-prefetch", daemon=True)
+                self._prefetch_thread.start()
+            self._prefetch_ready.notify()
+
+    def _prefetch_loop(self):
+        while True:
+            with self._lock:
+                while not self._prefetch_queue:
+                    self._prefetch_ready.wait()
+                serial, path = self._prefetch_queue.popleft()
+                if _cache_key(serial, path) in self._listings:
+                    continue
+            try:
+                self.get(path, serial)
+            except (OSError, AdbError):
+                pass  # Unreadable folders are simply not prefetched
+
+
+listing_cache = ListingCache()
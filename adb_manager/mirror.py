@@ -0,0 +1,201 @@
+# mirror.py
+import json
+import os
+import threading
+from .adb_client import adb
+from .dedup import DedupStats, remote_sha256
+from .transfer import (TRANSFER_WORKERS, TransferProgress, TransferScheduler, collect_remote_files, is_up_to_date, pull_file,
+                       remove_file)
+
+MANIFEST_NAME = ".adb-manager-manifest.json"
+
+
+class MirrorManifest:
+    """Remote path -> (size, mtime, local path) of every file the last mirror pulled.
+
+    It lives next to the mirrored tree, so a re-sync can tell what changed
+    on the device without touching file contents on either side.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        manifest = cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            manifest.entries = {remote: tuple(entry) for remote, entry in data.get("files", {}).items()}
+        except (OSError, ValueError):
+            pass
+        return manifest
+
+    def save(self):
+        with self._lock:
+            data = {"files": {remote: list(entry) for remote, entry in sorted(self.entries.items())}}
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temporary, self.path)
+
+    def record(self, remote_file):
+        with self._lock:
+            self.entries[remote_file.remote_path] = (remote_file.size, remote_file.mtime, remote_file.local_path)
+
+    def forget(self, remote_path):
+        with self._lock:
+            self.entries.pop(remote_path, None)
+
+    def matches(self, remote_file):
+        """True if the manifest recorded this exact file and the local copy is still there."""
+        entry = self.entries.get(remote_file.remote_path)
+        if entry is None or entry[:2] != (remote_file.size, remote_file.mtime) or entry[2] != remote_file.local_path:
+            return False
+        try:
+            return os.path.getsize(remote_file.local_path) == remote_file.size
+        except OSError:
+            return False
+
+
+class MirrorResult:
+    def __init__(self):
+        self.transferred = 0
+        self.transferred_bytes = 0
+        self.unchanged = 0
+        self.pruned = 0
+        self.dedup = None
+        self._lock = threading.Lock()
+
+    def add_transferred(self, size):
+        with self._lock:
+            self.transferred += 1
+            self.transferred_bytes += size
+
+    def summary(self):
+        text = f"{self.transferred} file(s) downloaded ({self.transferred_bytes / (1024 * 1024):.2f} MB), {self.unchanged} unchanged"
+        if self.pruned:
+            text += f", {self.pruned} removed"
+        if self.dedup is not None and (self.dedup.linked_files or self.dedup.duplicate_bytes):
+            text += f"; {self.dedup.summary()}"
+        return text
+
+
+def manifest_path(local_path):
+    return os.path.join(local_path, MANIFEST_NAME)
+
+
+def mirror(remote_path, local_path, serial=None, progress=None, prune=False, client=adb, workers=TRANSFER_WORKERS, control=None,
+           store=None):
+    """Bring `local_path` up to date with the remote tree, transferring only new or changed files.
+
+    The remote tree is listed over sync (one LIST per directory) and
+    compared with the manifest of the previous run. With `prune`, local
+    copies of files that were deleted on the device are removed too; files
+    the manifest never recorded are left alone. The manifest is saved even
+    when the run is cancelled, so finished files are not pulled again.
+
+    With an ObjectStore, changed files of a size the store holds are
+    first hashed on the device; the ones whose content the store already
+    holds are linked instead of pulled, and everything pulled is added to
+    the store under the device's digest.
+    """
+    progress = progress if progress is not None else TransferProgress()
+    result = MirrorResult()
+    os.makedirs(local_path, exist_ok=True)
+    manifest = MirrorManifest.load(manifest_path(local_path))
+
+    with client.sync(serial) as sync:
+        files, directories = collect_remote_files(sync, remote_path, local_path)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    pending = []
+    for remote_file in files:
+        if manifest.matches(remote_file) or is_up_to_date(remote_file):
+            manifest.record(remote_file)
+            result.unchanged += 1
+        else:
+            pending.append(remote_file)
+    digests = {}
+    if store is not None:
+        pending, digests = link_from_store(pending, store, result, manifest, serial, client, progress)
+    progress.add_total(sum(remote_file.size for remote_file in pending), len(pending))
+
+    if prune:
+        remote_paths = {remote_file.remote_path for remote_file in files}
+        emptied = set()
+        for remote, (_, _, local) in list(manifest.entries.items()):
+            if remote not in remote_paths:
+                try:
+                    remove_file(local)
+                except FileNotFoundError:
+                    pass
+                manifest.forget(remote)
+                emptied.add(os.path.dirname(local))
+                result.pruned += 1
+        remove_empty_directories(emptied, keep=set(directories) | {local_path})
+
+    def action(sync, remote_file):
+        progress.current = remote_file.remote_path
+        pull_file(sync, remote_file, progress, True, client, serial, scheduler.control)
+        if store is not None:
+            _digest, duplicate = store.add(remote_file.local_path, digests.get(remote_file.remote_path))
+            if duplicate:
+                result.dedup.add_duplicate(remote_file.size)
+        manifest.record(remote_file)
+        result.add_transferred(remote_file.size)
+
+    scheduler = TransferScheduler(client, serial, workers, control)
+    try:
+        scheduler.run(pending, action)
+    finally:
+        manifest.save()
+    return result
+
+
+def link_from_store(remote_files, store, result, manifest, serial, client, progress=None):
+    """Link files whose device-side hash the store already holds; return (files still to pull, digests).
+
+    Only files with the size of a stored object are hashed, so a first
+    mirror into an empty store reads nothing on the device twice.
+    """
+    result.dedup = DedupStats()
+    candidates = [remote_file.remote_path for remote_file in remote_files if store.may_hold(remote_file.size)]
+    if not candidates:
+        return remote_files, {}
+
+    def on_batch(done, total):
+        if progress is not None:
+            progress.current = f"Checking the local store: hashed {done}/{total} file(s) on the device"
+
+    on_batch(0, len(candidates))
+    digests = remote_sha256(candidates, serial, client, on_batch)
+    pending = []
+    for remote_file in remote_files:
+        digest = digests.get(remote_file.remote_path)
+        if digest and store.has(digest):
+            # The link shares the object's inode and mtime; this device's mtime is only kept in the manifest
+            store.link(digest, remote_file.local_path)
+            manifest.record(remote_file)
+            result.dedup.add_linked(remote_file.size)
+        else:
+            pending.append(remote_file)
+    return pending, digests
+
+
+def remove_empty_directories(directories, keep):
+    """Remove the given directories, and their parents, once pruning left them empty.
+
+    Directories in `keep` (those still present on the device, and the
+    mirror root) are never removed.
+    """
+    for directory in sorted(directories, key=len, reverse=True):
+        while directory not in keep:
+            try:
+                os.rmdir(directory)  # Fails unless the directory is empty
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
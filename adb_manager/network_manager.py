@@ -1,10 +1,14 @@
 # network_manager.py
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk
 import subprocess
-from PIL import Image, ImageTk  # For loading PNG icons
-import os
-import threading  # Import threading module
+from . import services
+from .aio import call_ui
+from .devices import device_selection
+from .fleet import report_fleet_result
+from .icons import icon_cache
+from .tasks import tasks
+from .ui_dispatcher import messagebox
 
 class NetworkManagerPage(ttk.Frame):
     def __init__(self, parent):
@@ -23,15 +27,15 @@ class NetworkManagerPage(ttk.Frame):
 
         # Load PNG icons
         self.icons = {
-            "network": self.load_icon("network.png", 24, 24),
-            "wifi": self.load_icon("wifi.png", 24, 24),
-            "bluetooth": self.load_icon("bluetooth.png", 24, 24),
-            "airplane": self.load_icon("airplane.png", 24, 24),
-            "data": self.load_icon("data.png", 24, 24),
-            "connect": self.load_icon("connect.png", 24, 24),
-            "disconnect": self.load_icon("disconnect.png", 24, 24),
-            "ip": self.load_icon("ip.png", 24, 24),
-            "network_manager": self.load_icon("network_manager.png", 24, 24),
+            "network": icon_cache.get("network", 24),
+            "wifi": icon_cache.get("wifi", 24),
+            "bluetooth": icon_cache.get("bluetooth", 24),
+            "airplane": icon_cache.get("airplane", 24),
+            "data": icon_cache.get("data", 24),
+            "connect": icon_cache.get("connect", 24),
+            "disconnect": icon_cache.get("disconnect", 24),
+            "ip": icon_cache.get("ip", 24),
+            "network_manager": icon_cache.get("network_manager", 24),
         }
 
         # IP Address Section
@@ -84,172 +88,79 @@ class NetworkManagerPage(ttk.Frame):
         self.disable_data_button = ttk.Button(self, text="Disable Mobile Data", image=self.icons["data"], compound=tk.LEFT, command=self.disable_data)
         self.disable_data_button.grid(row=4, column=4, padx=5, pady=5, sticky="ew")
 
-    def load_icon(self, icon_name, width, height):
-        """Load and resize a PNG icon."""
-        try:
-            icon_path = os.path.join("icons", icon_name)  # Path to the icons folder
-            icon = Image.open(icon_path)
-            icon = icon.resize((width, height), Image.Resampling.LANCZOS)
-            return ImageTk.PhotoImage(icon)
-        except Exception as e:
-            print(f"Error loading icon {icon_name}: {e}")
-            return None
+    def run_on_targets(self, command, success_message, error_message):
+        """Run a shell command on every target device as a background task."""
+        async def run():
+            result = await services.run_on_devices(command, await services.target_devices())
+            report_fleet_result(result, success_message, error_message)
 
-    def enable_wifi(self):
-        def run():
-            try:
-                subprocess.check_output(["adb", "shell", "svc", "wifi", "enable"])
-                messagebox.showinfo("Success", "Wi-Fi enabled successfully!")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error enabling Wi-Fi: {e}")
+        tasks.submit(run, name=command, key=command)
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+    def enable_wifi(self):
+        self.run_on_targets("svc wifi enable", "Wi-Fi enabled successfully!", "Error enabling Wi-Fi")
 
     def disable_wifi(self):
-        def run():
-            try:
-                subprocess.check_output(["adb", "shell", "svc", "wifi", "disable"])
-                messagebox.showinfo("Success", "Wi-Fi disabled successfully!")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error disabling Wi-Fi: {e}")
-
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        self.run_on_targets("svc wifi disable", "Wi-Fi disabled successfully!", "Error disabling Wi-Fi")
 
     def enable_bluetooth(self):
-        def run():
-            try:
-                subprocess.check_output(["adb", "shell", "svc", "bluetooth", "enable"])
-                messagebox.showinfo("Success", "Bluetooth enabled successfully!")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error enabling Bluetooth: {e}")
-
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        self.run_on_targets("svc bluetooth enable", "Bluetooth enabled successfully!", "Error enabling Bluetooth")
 
     def disable_bluetooth(self):
-        def run():
-            try:
-                subprocess.check_output(["adb", "shell", "svc", "bluetooth", "disable"])
-                messagebox.showinfo("Success", "Bluetooth disabled successfully!")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error disabling Bluetooth: {e}")
-
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        self.run_on_targets("svc bluetooth disable", "Bluetooth disabled successfully!", "Error disabling Bluetooth")
 
     def enable_airplane(self):
-        def run():
-            try:
-                subprocess.check_output(["adb", "shell", "cmd", "connectivity", "airplane-mode", "enable"])
-                messagebox.showinfo("Success", "Airplane Mode enabled successfully!")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error enabling Airplane Mode: {e}")
-
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        self.run_on_targets("cmd connectivity airplane-mode enable", "Airplane Mode enabled successfully!", "Error enabling Airplane Mode")
 
     def disable_airplane(self):
-        def run():
-            try:
-                subprocess.check_output(["adb", "shell", "cmd", "connectivity", "airplane-mode", "disable"])
-                messagebox.showinfo("Success", "Airplane Mode disabled successfully!")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error disabling Airplane Mode: {e}")
-
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        self.run_on_targets("cmd connectivity airplane-mode disable", "Airplane Mode disabled successfully!", "Error disabling Airplane Mode")
 
     def enable_data(self):
-        def run():
-            try:
-                subprocess.check_output(["adb", "shell", "svc", "data", "enable"])
-                messagebox.showinfo("Success", "Mobile Data enabled successfully!")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error enabling Mobile Data: {e}")
-
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        self.run_on_targets("svc data enable", "Mobile Data enabled successfully!", "Error enabling Mobile Data")
 
     def disable_data(self):
-        def run():
-            try:
-                subprocess.check_output(["adb", "shell", "svc", "data", "disable"])
-                messagebox.showinfo("Success", "Mobile Data disabled successfully!")
-            except subprocess.CalledProcessError as e:
-                messagebox.showerror("Error", f"Error disabling Mobile Data: {e}")
-
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        self.run_on_targets("svc data disable", "Mobile Data disabled successfully!", "Error disabling Mobile Data")
 
     def connect_adb(self):
-        def run():
-            ip_address = self.ip_entry.get()
-            if not ip_address:
-                messagebox.showerror("Error", "Please enter an IP address.")
-                return
+        ip_address = self.ip_entry.get()
+        if not ip_address:
+            messagebox.showerror("Error", "Please enter an IP address.")
+            return
+
+        async def run():
             try:
-                subprocess.check_output(["adb", "tcpip", "5555"])
-                subprocess.check_output(["adb", "disconnect"])
-                subprocess.check_output(["adb", "connect", f"{ip_address}:5555"])
-                output = subprocess.check_output(["adb", "devices"]).decode("utf-8")
-                if f"{ip_address}:5555" in output:
+                if await services.connect_tcpip(ip_address, await services.active_device()):
                     messagebox.showinfo("Success", f"ADB connected over TCP/IP to {ip_address}")
                 else:
                     messagebox.showerror("Error", "Failed to connect to ADB over TCP/IP. Please try again.")
             except subprocess.CalledProcessError as e:
                 messagebox.showerror("Error", f"Error connecting ADB over TCP/IP: {e}")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Connect over TCP/IP", key=("tcpip-connect", ip_address))
 
     def disconnect_adb(self):
-        def run():
+        async def run():
             try:
-                subprocess.check_output(["adb", "disconnect"])
+                await services.disconnect_tcpip()
                 messagebox.showinfo("Success", "ADB disconnected from TCP/IP")
             except subprocess.CalledProcessError as e:
                 messagebox.showerror("Error", f"Error disconnecting ADB from TCP/IP: {e}")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Disconnect TCP/IP", key="tcpip-disconnect")
 
     def get_ip_address(self):
-        def run():
+        async def run():
             try:
-                # Try using 'ip addr show wlan0' first
-                output = subprocess.check_output(["adb", "shell", "ip", "addr", "show", "wlan0"]).decode("utf-8")
-                ip_line = [line for line in output.splitlines() if "inet " in line]
-                if ip_line:
-                    ip_address = ip_line[0].split()[1].split('/')[0]
-                    self.ip_entry.delete(0, tk.END)
-                    self.ip_entry.insert(0, ip_address)
-                    return
-                # Fallback to 'ifconfig wlan0' if 'ip addr show wlan0' fails
-                output = subprocess.check_output(["adb", "shell", "ifconfig", "wlan0"]).decode("utf-8")
-                ip_line = [line for line in output.splitlines() if "inet addr:" in line]
-                if ip_line:
-                    ip_address = ip_line[0].split()[1].split(':')[1]
-                    self.ip_entry.delete(0, tk.END)
-                    self.ip_entry.insert(0, ip_address)
-                    return
-                messagebox.showwarning("Warning", "Could not retrieve IP address. Ensure Wi-Fi is enabled.")
+                ip_address = await services.get_ip_address(await services.active_device())
             except subprocess.CalledProcessError as e:
                 messagebox.showerror("Error", f"Error retrieving IP address: {e}")
+                return
+            if ip_address:
+                await call_ui(self.show_ip_address, ip_address)
+            else:
+                messagebox.showwarning("Warning", "Could not retrieve IP address. Ensure Wi-Fi is enabled.")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
-
+        tasks.submit(run, name="Get IP address", serial=device_selection.active(wait=False), key="ip-address")
 
+    def show_ip_address(self, ip_address):
+        self.ip_entry.delete(0, tk.END)
+        self.ip_entry.insert(0, ip_address)
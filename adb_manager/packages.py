@@ -0,0 +1,251 @@
+# packages.py
+import json
+import threading
+from array import array
+
+# One shell call for the whole inventory; the sections are told apart by the echoed markers
+DISABLED_MARKER = "__adb_manager_disabled__"
+DUMPSYS_MARKER = "__adb_manager_dumpsys__"
+DISKSTATS_MARKER = "__adb_manager_diskstats__"
+INVENTORY_COMMAND = (f"pm list packages -f -U -i --show-versioncode || pm list packages -f -i; "  # Before Android 9
+                     f"echo {DISABLED_MARKER}; pm list packages -d; "
+                     f"echo {DUMPSYS_MARKER}; dumpsys package packages; echo {DISKSTATS_MARKER}; dumpsys diskstats")
+
+TEXT_COLUMNS = ("version_name", "installer", "path", "first_install", "last_update")
+NUMBER_COLUMNS = ("version_code", "uid", "size")
+FLAG_COLUMNS = ("enabled", "system")
+COLUMNS = ("name",) + TEXT_COLUMNS + NUMBER_COLUMNS + FLAG_COLUMNS
+
+
+class PackageDiff:
+    """What changed between two inventories of one device."""
+
+    def __init__(self, added=(), removed=(), changed=()):
+        self.added = list(added)
+        self.removed = list(removed)
+        self.changed = list(changed)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self):
+        return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed"
+
+
+class PackageTable:
+    """The installed packages of one device, one column per field.
+
+    Numbers live in `array('q')` columns and flags in bytearrays, so a
+    few hundred packages cost a few kilobytes instead of a dict per
+    package. `row(name)` gives one package as a dict; `update()` applies
+    a newer inventory in place and reports only what changed.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.text = {column: [] for column in TEXT_COLUMNS}
+        self.numbers = {column: array("q") for column in NUMBER_COLUMNS}
+        self.flags = {column: bytearray() for column in FLAG_COLUMNS}
+        self.position = {}  # Package name -> row
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.position
+
+    def __iter__(self):
+        return (self.record(index) for index in range(len(self.names)))
+
+    def record(self, index):
+        """Row `index` as a dict of every column."""
+        record = {"name": self.names[index]}
+        for column, values in self.text.items():
+            record[column] = values[index]
+        for column, values in self.numbers.items():
+            record[column] = values[index]
+        for column, values in self.flags.items():
+            record[column] = bool(values[index])
+        return record
+
+    def row(self, name):
+        index = self.position.get(name)
+        return None if index is None else self.record(index)
+
+    def get(self, name, column):
+        index = self.position[name]
+        if column in self.text:
+            return self.text[column][index]
+        if column in self.numbers:
+            return self.numbers[column][index]
+        return bool(self.flags[column][index])
+
+    def add(self, record):
+        self.position[record["name"]] = len(self.names)
+        self.names.append(record["name"])
+        for column, values in self.text.items():
+            values.append(record.get(column) or "")
+        for column, values in self.numbers.items():
+            values.append(int(record.get(column) or 0))
+        for column, values in self.flags.items():
+            values.append(1 if record.get(column) else 0)
+
+    def set(self, name, record):
+        index = self.position[name]
+        for column, values in self.text.items():
+            values[index] = record.get(column) or ""
+        for column, values in self.numbers.items():
+            values[index] = int(record.get(column) or 0)
+        for column, values in self.flags.items():
+            values[index] = 1 if record.get(column) else 0
+
+    def remove(self, name):
+        """Drop a package by moving the last row into its place."""
+        index = self.position.pop(name)
+        last = len(self.names) - 1
+        columns = [self.names, *self.text.values(), *self.numbers.values(), *self.flags.values()]
+        if index != last:
+            for values in columns:
+                values[index] = values[last]
+            self.position[self.names[index]] = index
+        for values in columns:
+            del values[last]
+
+    def update(self, snapshot):
+        """Bring the table up to date with `snapshot` (another PackageTable); returns a PackageDiff."""
+        diff = PackageDiff()
+        for name in [name for name in self.names if name not in snapshot]:
+            self.remove(name)
+            diff.removed.append(name)
+        for record in snapshot:
+            name = record["name"]
+            if name not in self.position:
+                self.add(record)
+                diff.added.append(name)
+            elif self.record(self.position[name]) != record:
+                self.set(name, record)
+                diff.changed.append(name)
+        return diff
+
+
+def _sections(output):
+    sections = {"list": [], DISABLED_MARKER: [], DUMPSYS_MARKER: [], DISKSTATS_MARKER: []}
+    current = sections["list"]
+    for line in output.splitlines():
+        marker = line.strip()
+        if marker in sections:
+            current = sections[marker]
+        else:
+            current.append(line)
+    return sections
+
+
+def parse_package_line(line):
+    """`package:<apk path>=<name> versionCode:<n> uid:<n> installer=<pkg>` -> dict.
+
+    The path is split off at the last `=` of the first field, since
+    Android's randomized /data/app folders end in `==`.
+    """
+    fields = line.strip().split()
+    if not fields or not fields[0].startswith("package:"):
+        return None
+    path, separator, name = fields[0][len("package:"):].rpartition("=")
+    record = {"name": name, "path": path if separator else ""}
+    for field in fields[1:]:
+        key, _, value = field.replace(":", "=", 1).partition("=")
+        if key == "versionCode":
+            record["version_code"] = int(value) if value.isdigit() else 0
+        elif key == "uid":
+            record["uid"] = int(value.split(",")[0]) if value.split(",")[0].isdigit() else 0
+        elif key == "installer":
+            record["installer"] = "" if value == "null" else value
+    return record
+
+
+def parse_dumpsys_packages(lines):
+    """versionName, install times and the SYSTEM flag per package from `dumpsys package packages`."""
+    details = {}
+    current = None
+    in_packages = False
+    for line in lines:
+        if line and not line[0].isspace():
+            in_packages = line.startswith("Packages:")  # Later sections repeat packages (hidden system ones)
+            current = None
+            continue
+        if not in_packages:
+            continue
+        stripped = line.strip()
+        if stripped.startswith("Package [") and "]" in stripped:
+            current = details.setdefault(stripped[len("Package ["):stripped.index("]")], {})
+        elif current is not None:
+            key, _, value = stripped.partition("=")
+            if key == "versionName":
+                current["version_name"] = value
+            elif key == "firstInstallTime":
+                current["first_install"] = value
+            elif key == "lastUpdateTime":
+                current["last_update"] = value
+            elif key == "pkgFlags":
+                current["system"] = " SYSTEM " in f" {value.strip('[]')} "
+    return details
+
+
+def parse_diskstats(lines):
+    """Package name -> app + data + cache bytes, from `dumpsys diskstats`."""
+    lists = {}
+    for line in lines:
+        key, separator, value = line.partition(": ")
+        if separator and key in ("Package Names", "App Sizes", "App Data Sizes", "Cache Sizes"):
+            try:
+                lists[key] = json.loads(value)
+            except ValueError:
+                pass
+    sizes = {}
+    for key in ("App Sizes", "App Data Sizes", "Cache Sizes"):
+        for name, size in zip(lists.get("Package Names", ()), lists.get(key, ())):
+            sizes[name] = sizes.get(name, 0) + int(size)
+    return sizes
+
+
+def parse_inventory(output):
+    """A PackageTable from the output of INVENTORY_COMMAND, sorted by package name."""
+    sections = _sections(output)
+    disabled = {line.strip()[len("package:"):] for line in sections[DISABLED_MARKER] if line.startswith("package:")}
+    details = parse_dumpsys_packages(sections[DUMPSYS_MARKER])
+    sizes = parse_diskstats(sections[DISKSTATS_MARKER])
+    records = [record for record in map(parse_package_line, sections["list"]) if record is not None]
+    table = PackageTable()
+    for record in sorted(records, key=lambda record: record["name"]):
+        name = record["name"]
+        record.update(details.get(name, {}))
+        record["size"] = sizes.get(name, 0)
+        record["enabled"] = name not in disabled
+        table.add(record)
+    return table
+
+
+class PackageInventory:
+    """The last PackageTable of every device, updated in place on each refresh."""
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def peek(self, serial):
+        with self._lock:
+            return self._tables.get(serial)
+
+    def update(self, serial, snapshot):
+        """Merge a fresh inventory; returns (table, PackageDiff). The first one for a device counts as all added."""
+        with self._lock:
+            table = self._tables.get(serial)
+            if table is None:
+                table = self._tables[serial] = PackageTable()
+            return table, table.update(snapshot)
+
+    def invalidate_device(self, serial):
+        with self._lock:
+            self._tables.pop(serial, None)
+
+
+package_inventory = PackageInventory()
@@ -0,0 +1,148 @@
+# progress_window.py
+import tkinter as tk
+from tkinter import ttk, messagebox
+from .install import FAILED, INSTALLED, INSTALLING, QUEUED
+from .transfer import TransferCancelled
+
+POLL_INTERVAL_MS = 100
+
+
+class TransferProgressWindow(tk.Toplevel):
+    """Shows a TransferProgress that a worker thread is filling in.
+
+    The window polls the counters from the Tk event loop, so the worker
+    never touches a widget. When a TransferControl is given, Pause and
+    Cancel buttons drive it. Once the transfer finishes the window closes
+    and shows the success or error message.
+    """
+
+    def __init__(self, parent, title, progress, success_message, error_message="Error downloading", control=None):
+        super().__init__(parent)
+        self.title(title)
+        self.progress = progress
+        self.control = control
+        self.success_message = success_message
+        self.error_message = error_message
+
+        self.progress_label = ttk.Label(self, text=f"{title}...")
+        self.progress_label.pack(padx=10, pady=(10, 0))
+        self.progress_bar = ttk.Progressbar(self, orient="horizontal", length=300, mode="determinate", maximum=100)
+        self.progress_bar.pack(padx=10, pady=10)
+        self.current_label = ttk.Label(self, text="", width=50)
+        self.current_label.pack(padx=10, pady=(0, 10))
+
+        if control is not None:
+            button_frame = ttk.Frame(self)
+            button_frame.pack(pady=(0, 10))
+            self.pause_button = ttk.Button(button_frame, text="Pause", command=self.toggle_pause)
+            self.pause_button.pack(side=tk.LEFT, padx=5)
+            ttk.Button(button_frame, text="Cancel", command=control.cancel).pack(side=tk.LEFT, padx=5)
+            self.protocol("WM_DELETE_WINDOW", control.cancel)
+
+        self.after(POLL_INTERVAL_MS, self.poll)
+
+    def toggle_pause(self):
+        if self.control.paused:
+            self.control.resume()
+            self.pause_button.config(text="Pause")
+        else:
+            self.control.pause()
+            self.pause_button.config(text="Resume")
+
+    def poll(self):
+        progress = self.progress
+        done_mb = progress.done_bytes / (1024 * 1024)
+        total_mb = progress.total_bytes / (1024 * 1024)
+        rate_mb = progress.rate() / (1024 * 1024)
+        self.progress_bar["value"] = progress.percent
+        state = " (paused)" if self.control is not None and self.control.paused else ""
+        self.progress_label.config(
+            text=f"[{progress.percent}%]{state} {done_mb:.2f} MB / {total_mb:.2f} MB at {rate_mb:.2f} MB/s "
+                 f"({progress.done_files}/{progress.total_files} files)")
+        current = progress.current
+        self.current_label.config(text=current if len(current) <= 50 else "..." + current[-47:])
+        if not progress.finished:
+            self.after(POLL_INTERVAL_MS, self.poll)
+            return
+        self.destroy()
+        if isinstance(progress.error, TransferCancelled):
+            messagebox.showinfo("Cancelled", "Transfer cancelled.")
+        elif progress.error is not None:
+            messagebox.showerror("Error", f"{self.error_message}: {progress.error}")
+        else:
+            messagebox.showinfo("Success", self.success_message)
+
+
+class InstallProgressWindow(tk.Toplevel):
+    """Shows an InstallProgress: one row per device with a child row per package.
+
+    Like TransferProgressWindow it polls from the Tk event loop. It
+    stays open when the batch is done, so failed packages and their
+    errors can be read; `on_cancel` is called by the Cancel button.
+    """
+
+    def __init__(self, parent, title, progress, on_cancel=None):
+        super().__init__(parent)
+        self.title(title)
+        self.progress = progress
+        self.on_cancel = on_cancel
+        self.items = {}  # Serial or (serial, package) -> tree item
+        self.shown = {}  # Tree item -> values last shown
+
+        self.progress_label = ttk.Label(self, text=f"{title}...")
+        self.progress_label.pack(padx=10, pady=(10, 0))
+        self.progress_bar = ttk.Progressbar(self, orient="horizontal", length=400, mode="determinate", maximum=100)
+        self.progress_bar.pack(padx=10, pady=10)
+
+        self.tree = ttk.Treeview(self, columns=("State", "Error"), height=14)
+        self.tree.heading("#0", text="Device / Package")
+        self.tree.heading("State", text="State")
+        self.tree.heading("Error", text="Error")
+        self.tree.column("#0", width=260)
+        self.tree.column("State", width=90)
+        self.tree.column("Error", width=320)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        button_frame = ttk.Frame(self)
+        button_frame.pack(pady=10)
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel,
+                                        state=tk.NORMAL if on_cancel else tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close", command=self.destroy).pack(side=tk.LEFT, padx=5)
+
+        self.after(POLL_INTERVAL_MS, self.poll)
+
+    def cancel(self):
+        self.cancel_button.config(state=tk.DISABLED)
+        self.on_cancel()
+
+    def show(self, item, values):
+        if self.shown.get(item) != values:
+            self.tree.item(item, values=values)
+            self.shown[item] = values
+
+    def poll(self):
+        progress = self.progress
+        devices = {}  # Serial -> package states
+        for (serial, package), (state, error) in sorted(progress.states.copy().items()):
+            devices.setdefault(serial, []).append(state)
+            if serial not in self.items:
+                self.items[serial] = self.tree.insert("", tk.END, text=serial, open=len(self.items) < 4)
+            if (serial, package) not in self.items:
+                self.items[(serial, package)] = self.tree.insert(self.items[serial], tk.END, text=package)
+            self.show(self.items[(serial, package)], (state, error))
+        for serial, states in devices.items():
+            done = sum(state in (INSTALLED, FAILED) for state in states)
+            failed = states.count(FAILED)
+            self.show(self.items[serial], (f"{done}/{len(states)}", f"{failed} failed" if failed else ""))
+        counts = progress.counts()
+        self.progress_bar["value"] = progress.percent
+        self.progress_label.config(
+            text=f"[{progress.percent}%] {counts.get(INSTALLED, 0)} installed, {counts.get(FAILED, 0)} failed, "
+                 f"{counts.get(INSTALLING, 0)} installing, {counts.get(QUEUED, 0)} queued")
+        if not progress.finished:
+            self.after(POLL_INTERVAL_MS, self.poll)
+            return
+        self.cancel_button.config(state=tk.DISABLED)
+        if progress.error is not None:
+            self.progress_label.config(text=f"{self.progress_label.cget('text')} - stopped: {progress.error}")
@@ -0,0 +1,140 @@
+# search_index.py
+import bisect
+import re
+
+FUZZY_MIN_LENGTH = 3  # Shorter queries only match as substrings; "ab" as a subsequence matches nearly everything
+FUZZY_MAX_SPREAD = 3  # A fuzzy match may spread over at most this many times the query's length
+
+WORD_SEPARATORS = " ._-:/"
+
+# Match tiers, best first
+EXACT, PREFIX, WORD, SUBSTRING, FUZZY = range(5)
+
+
+class SearchIndex:
+    """Ranked search over a list of rows, for search-as-you-type.
+
+    `fields(row)` returns the row's searchable strings, most important
+    first (app name, then package name, then whatever metadata is
+    added). A trigram index narrows a query to the rows containing all
+    of its trigrams, so only those are checked; typing more characters
+    only checks the previous query's matches again. Rows that contain
+    the query's letters in order but not as a block (`wapp` ->
+    WhatsApp) are fuzzy matches, ranked after the others by how tightly
+    the letters sit together.
+    """
+
+    def __init__(self, rows=(), fields=lambda row: (row,)):
+        self.fields = fields
+        self.build(rows)
+
+    def build(self, rows):
+        self.rows = list(rows)
+        self.texts = [tuple(text.lower() for text in self.fields(row) if text) for row in self.rows]
+        self.trigrams = {}  # Trigram -> indexes of the rows that contain it
+        for index, texts in enumerate(self.texts):
+            for trigram in {text[i:i + 3] for text in texts for i in range(len(text) - 2)}:
+                self.trigrams.setdefault(trigram, []).append(index)
+        # Every row's fields on one line, so the regex engine can look for fuzzy matches in one pass
+        self.corpus = "\n".join("\t".join(texts) for texts in self.texts)
+        self.line_starts = []
+        offset = 0
+        for texts in self.texts:
+            self.line_starts.append(offset)
+            offset += len("\t".join(texts)) + 1
+        self._last_query = None
+        self._last_matches = None  # Indexes of the rows that contained the last query
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, query):
+        """The rows matching `query`, best first; every row, in order, for an empty query."""
+        query = query.strip().lower()
+        if not query:
+            return list(self.rows)
+        candidates = self._candidates(query)
+        ranked = []
+        matches = []
+        for index in candidates:
+            rank = self._rank(self.texts[index], query)
+            if rank is not None:
+                ranked.append((rank, index))
+                matches.append(index)
+        self._last_query, self._last_matches = query, matches
+        if len(query) >= FUZZY_MIN_LENGTH:
+            found = set(matches)
+            for index in self._fuzzy_candidates(query):
+                if index not in found:
+                    rank = self._fuzzy_rank(self.texts[index], query)
+                    if rank is not None:
+                        ranked.append((rank, index))
+        ranked.sort()
+        return [self.rows[index] for _rank, index in ranked]
+
+    def _candidates(self, query):
+        """Indexes of the rows that can contain `query` as a substring."""
+        if self._last_query is not None and query.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = range(len(self.rows))
+        if len(query) < 3:
+            return candidates
+        postings = sorted((self.trigrams.get(query[i:i + 3], ()) for i in range(len(query) - 2)), key=len)
+        narrowed = set(postings[0])
+        for posting in postings[1:]:
+            narrowed.intersection_update(posting)
+            if not narrowed:
+                break
+        return [index for index in candidates if index in narrowed]
+
+    def _fuzzy_candidates(self, query):
+        """Indexes of the rows with a field that contains the query's letters in order."""
+        pattern = re.compile("[^\n\t]*?".join(re.escape(char) for char in query))
+        candidates = []
+        for match in pattern.finditer(self.corpus):
+            index = bisect.bisect_right(self.line_starts, match.start()) - 1
+            if not candidates or candidates[-1] != index:
+                candidates.append(index)
+        return candidates
+
+    @staticmethod
+    def _rank(texts, query):
+        best = None
+        for field, text in enumerate(texts):
+            position = text.find(query)
+            if position < 0:
+                continue
+            if text == query:
+                tier = EXACT
+            elif position == 0:
+                tier = PREFIX
+            elif text[position - 1] in WORD_SEPARATORS:
+                tier = WORD
+            else:
+                tier = SUBSTRING
+            rank = (tier, field, position, len(text))
+            if best is None or rank < best:
+                best = rank
+        return best
+
+    @staticmethod
+    def _fuzzy_rank(texts, query):
+        best = None
+        for field, text in enumerate(texts):
+            start = text.find(query[0])
+            while start >= 0:
+                position = start
+                for char in query[1:]:
+                    position = text.find(char, position + 1)
+                    if position < 0:
+                        break
+                if position < 0:
+                    break  # A later start cannot find the letters either
+                spread = position - start + 1
+                if spread <= len(query) * FUZZY_MAX_SPREAD:
+                    rank = (FUZZY, spread, field, start, len(text))
+                    if best is None or rank < best:
+                        best = rank
+                start = text.find(query[0], start + 1)
+        return best
@@ -0,0 +1,279 @@
+# services.py
+"""Device operations behind the pages, as coroutines.
+
+The pages only gather input, submit one of these and show the result,
+so everything here runs without Tk: from the CLI (`python -m
+adb_manager`), against a real ADB server, or the fake one in fake_adb.py.
+Work that is still blocking (sync transfers, getprop snapshots) runs in
+a worker thread so the loop stays free.
+"""
+import asyncio
+import os
+import posixpath
+import shlex
+import subprocess
+from . import acbridge, extract
+from .adb_client import AdbCommandError, AdbError, adb
+from .aio import async_adb, gather_devices
+from .dedup import object_store
+from .devices import device_selection, get_device_properties
+from .install import (FAILED, INSTALLED, INSTALLING, MAX_INSTALL_DEVICES, InstallProgress, collect_install_jobs,
+                      install_with_retry)
+from .listing import list_directory, listing_cache
+from .mirror import mirror
+from .packages import INVENTORY_COMMAND, package_inventory, parse_inventory
+from .transfer import TransferCancelled, pull_many, push_many
+from .utils import format_package_info, get_device_pull_path, save_screenshot
+
+ACBRIDGE_DATA = "./tools/ACBridge/acbridge"  # App names exported by the ACBridge companion app
+
+
+# -- devices ----------------------------------------------------------------
+
+async def active_device(selection=device_selection):
+    """The active device's serial; waits for the first device list off the loop thread."""
+    return await asyncio.to_thread(selection.active)
+
+
+async def target_devices(selection=device_selection):
+    return await asyncio.to_thread(selection.targets)
+
+
+async def list_devices(client=async_adb):
+    """(serial, state) for every device the ADB server knows."""
+    return await client.devices()
+
+
+async def device_info(serial):
+    return await asyncio.to_thread(lambda: get_device_properties(serial).as_info())
+
+
+async def device_pull_path(serial):
+    """Local folder pulled data for `serial` goes into; raises ValueError without a model."""
+    model = (await asyncio.to_thread(get_device_properties, serial)).model
+    if not model:
+        raise ValueError("Device model not found.")
+    return get_device_pull_path(model, serial)
+
+
+async def run_on_devices(command, serials, client=async_adb):
+    """Run a shell command on every serial at once; returns a FleetResult."""
+    return await gather_devices(lambda serial: client.check_output(command, serial=serial), serials)
+
+
+async def press_key(keycode, serial, client=async_adb):
+    await client.run(f"input keyevent {keycode}", serial=serial)
+
+
+async def reboot(serial, mode="", client=async_adb):
+    adb.drop_device(serial)  # Pooled sync sessions die with the reboot
+    client.drop_device(serial)
+    return await client.device_service(f"reboot:{mode}", serial)
+
+
+async def take_screenshots(serials):
+    """Save a screenshot of every serial into its device folder; values are the local paths."""
+    return await gather_devices(lambda serial: asyncio.to_thread(save_screenshot, serial), serials)
+
+
+# -- network ----------------------------------------------------------------
+
+async def get_ip_address(serial, client=async_adb):
+    """The device's wlan0 IPv4 address, or None when Wi-Fi has none."""
+    # Try using 'ip addr show wlan0' first
+    output = await client.check_output("ip addr show wlan0", serial=serial)
+    ip_line = [line for line in output.splitlines() if "inet " in line]
+    if ip_line:
+        return ip_line[0].split()[1].split('/')[0]
+    # Fallback to 'ifconfig wlan0' if 'ip addr show wlan0' fails
+    output = await client.check_output("ifconfig wlan0", serial=serial)
+    ip_line = [line for line in output.splitlines() if "inet addr:" in line]
+    if ip_line:
+        return ip_line[0].split()[1].split(':')[1]
+    return None
+
+
+async def connect_tcpip(ip_address, serial, port=5555, client=async_adb):
+    """Switch `serial` to ADB over TCP/IP and connect to it at `ip_address`; True when it shows up."""
+    adb.drop_device(serial)
+    client.drop_device(serial)
+    await client.device_service(f"tcpip:{port}", serial)
+    await client.host_command("host:disconnect:")
+    await client.host_command(f"host:connect:{ip_address}:{port}")
+    serials = [device for device, _state in await client.devices()]
+    return f"{ip_address}:{port}" in serials
+
+
+async def disconnect_tcpip(client=async_adb):
+    return await client.host_command("host:disconnect:")
+
+
+# -- files --------------------------------------------------------------------
+
+async def list_dir(path, serial, cached=False):
+    """RemoteEntry items of `path`, folders first; `cached` allows a listing from the cache."""
+    if cached:
+        return await asyncio.to_thread(listing_cache.get, path, serial)
+    return await asyncio.to_thread(list_directory, path, serial)
+
+
+async def delete_paths(paths, serial, client=async_adb):
+    for path in paths:
+        await client.check_call(f"rm -r {shlex.quote(path)}", serial=serial)
+        listing_cache.invalidate(path, serial)
+
+
+async def make_directory(path, serial, client=async_adb):
+    await client.check_call(f"mkdir {shlex.quote(path)}", serial=serial)
+    listing_cache.invalidate(path, serial)
+
+
+async def copy_path(source, destination, serial, client=async_adb):
+    await client.check_call(f"cp -r {shlex.quote(source)} {shlex.quote(destination)}", serial=serial)
+    listing_cache.invalidate(destination, serial)
+
+
+async def directory_size(path, serial, client=async_adb):
+    """Size of a remote folder in bytes, from `du`; 0 when it cannot be read."""
+    try:
+        output = await client.check_output(f"du -s {shlex.quote(path)}", serial=serial)
+        return int(output.split()[0]) * 1024
+    except (subprocess.CalledProcessError, ValueError, IndexError):
+        return 0
+
+
+async def compress(path, output_path, serial, client=async_adb):
+    # The same tar invocation handles a directory or a single file
+    await client.check_call(f"tar -czf {shlex.quote(output_path)} -C {shlex.quote(posixpath.dirname(path))} "
+                            f"{shlex.quote(posixpath.basename(path))}", serial=serial)
+    listing_cache.invalidate(output_path, serial)
+
+
+async def decompress(path, output_dir, serial, client=async_adb):
+    await client.check_call(f"mkdir -p {shlex.quote(output_dir)}", serial=serial)
+    await client.check_call(f"tar -xzf {shlex.quote(path)} -C {shlex.quote(output_dir)}", serial=serial)
+    listing_cache.invalidate(output_dir, serial)
+
+
+async def pull_paths(remote_paths, local_dir, serial, progress=None, control=None):
+    """Pull files or folders into `local_dir`, in parallel per file."""
+    items = [(path, os.path.join(local_dir, posixpath.basename(path.rstrip("/")))) for path in remote_paths]
+    return await asyncio.to_thread(pull_many, items, serial=serial, progress=progress, control=control)
+
+
+async def push_paths(local_paths, remote_dir, serial, progress=None, control=None):
+    """Push files or folders into `remote_dir`, in parallel per file."""
+    try:
+        return await asyncio.to_thread(push_many, [(path, remote_dir) for path in local_paths],
+                                       serial=serial, progress=progress, control=control)
+    finally:
+        listing_cache.invalidate(remote_dir, serial)
+
+
+async def mirror_directory(remote_path, local_path, serial, progress=None, prune=False, control=None):
+    """Bring `local_path` up to date with `remote_path`; returns a MirrorResult."""
+    return await asyncio.to_thread(mirror, remote_path, local_path, serial=serial, progress=progress, prune=prune,
+                                   control=control, store=object_store)
+
+
+# -- packages -------------------------------------------------------------------
+
+def load_app_names(path=ACBRIDGE_DATA):
+    """Package name -> app label, from the ACBridge export."""
+    with open(path, "r", encoding="utf-8") as file:
+        return {entry['package_name']: entry['app_name'] for entry in format_package_info(file.read())}
+
+
+async def update_acbridge(serial):
+    """Have the ACBridge companion app export labels and icons and pull what changed; returns an AcbridgeUpdate."""
+    return await acbridge.update(serial)
+
+
+async def list_packages(serial, client=async_adb):
+    output = await client.check_output("pm list packages", serial=serial)
+    return [package.split(':', 1)[1] for package in output.strip().split('\n') if ':' in package]
+
+
+async def inventory_packages(serial, client=async_adb):
+    """Every package with its version, installer, install times, size and state, in one shell call.
+
+    Returns (PackageTable, PackageDiff): the device's cached table,
+    updated in place, and what changed since its last inventory.
+    """
+    result = await client.run(INVENTORY_COMMAND, serial=serial)  # Older devices lack some flags or dumpsys sections
+    snapshot = await asyncio.to_thread(parse_inventory, result.stdout)
+    if not len(snapshot):
+        raise AdbCommandError(INVENTORY_COMMAND, result.returncode or 1, result.stdout, result.stderr)
+    return package_inventory.update(serial, snapshot)
+
+
+async def set_package_enabled(package_name, enabled, serial, client=async_adb):
+    command = "pm enable" if enabled else "pm disable-user"
+    await client.check_call(f"{command} --user 0 {package_name}", serial=serial)
+
+
+async def clear_package_data(package_name, serial, client=async_adb):
+    await client.check_call(f"pm clear --user 0 {package_name}", serial=serial)
+
+
+async def uninstall_package(package_name, serial, client=async_adb):
+    await client.check_call(f"pm uninstall --user 0 {package_name}", serial=serial)
+
+
+async def launch_app(package_name, serial, client=async_adb):
+    await client.check_call(f"monkey -p {package_name} -c android.intent.category.LAUNCHER 1", serial=serial)
+
+
+async def install_apk(apk_path, serials):
+    """Install an APK on every serial at once; returns a FleetResult."""
+    return await install_packages([apk_path], serials)
+
+
+async def install_packages(paths, serials, progress=None, client=adb, control=None):
+    """Install APKs, split bundles and folders of either on every serial at once; returns a FleetResult.
+
+    Devices install in parallel, each one package after another (pm
+    runs one install at a time anyway). A package that fails is
+    recorded in `progress` and the device moves on to the next one;
+    the device's result then fails with the list of failed packages.
+    `control` cancels the pushes under way as well as the queued ones.
+    """
+    jobs = await asyncio.to_thread(collect_install_jobs, paths)
+    if progress is None:
+        progress = InstallProgress()
+    serials = list(dict.fromkeys(serials))
+    for serial in serials:
+        for job in jobs:
+            progress.add(serial, job)
+
+    async def install_all(serial):
+        failures = []
+        for job in jobs:
+            progress.set(serial, job, INSTALLING)
+            try:
+                await asyncio.to_thread(install_with_retry, job, serial, client, progress, control=control)
+            except TransferCancelled as e:
+                progress.set(serial, job, FAILED, str(e))
+                raise
+            except (AdbError, OSError) as e:
+                progress.set(serial, job, FAILED, str(e))
+                failures.append(f"{job.name}: {e}")
+            else:
+                progress.set(serial, job, INSTALLED)
+        if failures:
+            raise AdbError(f"{len(failures)} of {len(jobs)} package(s) failed: " + "; ".join(failures))
+        return f"{len(jobs)} package(s) installed"
+
+    return await gather_devices(install_all, serials, limit=MAX_INSTALL_DEVICES)
+
+
+async def extract_apks(package_names, serial, local_dir=None, progress=None, control=None):
+    """Save the base and split APKs of packages into the device folder; returns (package -> local paths, missing, DedupStats).
+
+    The APKs are streamed from where they are installed, all packages at
+    once, and `extracted.json` in the folder records what was saved.
+    """
+    if local_dir is None:
+        local_dir = os.path.join(await device_pull_path(serial), "Downloadapk")
+    return await asyncio.to_thread(extract.extract_apks, package_names, local_dir, serial, progress, control,
+                                   table=package_inventory.peek(serial))
\ No newline at end of file
@@ -0,0 +1,56 @@
+# startup.py
+import contextlib
+import os
+import time
+
+REPORT_ENV = "ADB_MANAGER_STARTUP_REPORT"  # Set to 1 to print the startup timings
+
+
+class StartupTimer:
+    """Timings of the steps between launch and the first usable window.
+
+    `phase()` times a block, `mark()` records the time since launch.
+    Pages built later (on first selection of their tab) are timed too,
+    so the cost moved out of startup stays visible.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = bool(os.environ.get(REPORT_ENV)) if enabled is None else enabled
+        self.launched = time.perf_counter()
+        self.phases = []  # (name, seconds)
+        self.marks = []  # (name, seconds since launch)
+        self.reported = False
+
+    def begin(self, launched):
+        """Count from `launched` (a perf_counter value taken before the heavy imports)."""
+        self.launched = launched
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.phases.append((name, seconds))
+            if self.reported and self.enabled:
+                print(f"startup: {name:<28} {seconds * 1000:8.1f} ms (after first window)")
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.launched))
+
+    def since_launch(self):
+        return time.perf_counter() - self.launched
+
+    def report(self):
+        """Print the phases and marks so far; later phases are printed as they finish."""
+        self.reported = True
+        if not self.enabled:
+            return
+        for name, seconds in self.phases:
+            print(f"startup: {name:<28} {seconds * 1000:8.1f} ms")
+        for name, seconds in self.marks:
+            print(f"startup: {name:<28} {seconds * 1000:8.1f} ms after launch")
+
+
+startup = StartupTimer()
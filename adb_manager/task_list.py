@@ -0,0 +1,87 @@
+# task_list.py
+import tkinter as tk
+from tkinter import ttk
+from .tasks import QUEUED, RUNNING, tasks
+from .ui_dispatcher import ui
+
+POLL_INTERVAL_MS = 250
+
+
+class TaskStatus(ttk.Frame):
+    """Toolbar summary of the task executor; the button opens the task list."""
+
+    def __init__(self, parent, executor=tasks):
+        super().__init__(parent)
+        self.executor = executor
+        self.window = None
+
+        self.status_label = ttk.Label(self, text="No tasks")
+        self.status_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(self, text="Tasks", command=self.show_tasks).pack(side=tk.LEFT, padx=5)
+
+        self.executor.add_listener(lambda: ui.post(self.update_status, key=("task-status", id(self))))
+        self.update_status()
+
+    def update_status(self):
+        running, queued = self.executor.counts()
+        if running or queued:
+            self.status_label.config(text=f"Tasks: {running} running, {queued} queued")
+        else:
+            self.status_label.config(text="No tasks")
+
+    def show_tasks(self):
+        if self.window is not None and self.window.winfo_exists():
+            self.window.lift()
+            return
+        self.window = TaskListWindow(self, self.executor)
+
+
+class TaskListWindow(tk.Toplevel):
+    """Running, queued and recently finished tasks, with Cancel buttons.
+
+    Like the transfer progress window it polls the executor from the Tk
+    event loop, so it never waits on a worker.
+    """
+
+    def __init__(self, parent, executor=tasks):
+        super().__init__(parent)
+        self.title("Tasks")
+        self.executor = executor
+        self.items = {}  # Tree item id -> Task
+
+        self.tree = ttk.Treeview(self, columns=("Device", "State", "Time"), height=12)
+        self.tree.heading("#0", text="Task")
+        self.tree.heading("Device", text="Device")
+        self.tree.heading("State", text="State")
+        self.tree.heading("Time", text="Time")
+        self.tree.column("#0", width=220)
+        self.tree.column("Device", width=140)
+        self.tree.column("State", width=80)
+        self.tree.column("Time", width=60, anchor=tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        button_frame = ttk.Frame(self)
+        button_frame.pack(pady=(0, 10))
+        ttk.Button(button_frame, text="Cancel", command=self.cancel_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel All", command=self.executor.cancel_all).pack(side=tk.LEFT, padx=5)
+
+        self.poll()
+
+    def cancel_selected(self):
+        for item in self.tree.selection():
+            task = self.items.get(item)
+            if task is not None and task.active:
+                self.executor.cancel(task)
+
+    def poll(self):
+        selected = {self.items[item].id for item in self.tree.selection() if item in self.items}
+        self.tree.delete(*self.tree.get_children())
+        self.items = {}
+        for task in self.executor.tasks():
+            elapsed = f"{task.elapsed():.1f} s" if task.state != QUEUED else ""
+            state = "cancelling" if task.state == RUNNING and task.cancelled else task.state
+            item = self.tree.insert("", "end", text=task.name, values=(task.serial or "-", state, elapsed))
+            self.items[item] = task
+            if task.id in selected:
+                self.tree.selection_add(item)
+        self.after(POLL_INTERVAL_MS, self.poll)
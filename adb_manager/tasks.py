@@ -0,0 +1,263 @@
+# tasks.py
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+import threading
+import time
+from .aio import event_loop
+from .ui_dispatcher import messagebox, ui
+
+MAX_TASKS = 6  # Tasks running at once across all devices; keeps the adb server from being flooded
+TASKS_PER_DEVICE = 1  # Tasks running at once per device and lane; the rest wait in that queue
+TRANSFER_TASKS = 4  # Transfer-lane tasks running at once, so some workers always stay free for interactive work
+TASK_HISTORY = 50  # Finished tasks kept for the task list
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Lanes: a long transfer on a device must not hold up listings and short commands on it
+INTERACTIVE = "interactive"
+TRANSFER = "transfer"  # Pulls, pushes, installs, extractions and other long device work
+
+_current = threading.local()
+
+
+class Task:
+    """One unit of background work submitted from the UI."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, function, args, name, serial, key, on_cancel=None, lane=INTERACTIVE, on_error=None):
+        self.id = next(self._ids)
+        self.function = function
+        self.args = args
+        self.name = name
+        self.serial = serial
+        self.key = key
+        self.on_cancel = on_cancel
+        self.on_error = on_error
+        self.lane = lane
+        self.state = QUEUED
+        self.error = None
+        self.result = None
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._future = None  # Set while a coroutine of this task runs on the event loop
+
+    @property
+    def cancelled(self):
+        """True once cancel() was called; long-running work checks this between steps."""
+        return self._cancel.is_set()
+
+    @property
+    def active(self):
+        return self.state in (QUEUED, RUNNING)
+
+    def cancel(self):
+        if self._cancel.is_set():
+            return
+        self._cancel.set()
+        if self._future is not None:
+            self._future.cancel()
+        if self.on_cancel is not None:
+            self.on_cancel()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def run(self):
+        """Call the function; a coroutine it returns is awaited on the event loop."""
+        result = self.function(*self.args)
+        if not asyncio.iscoroutine(result):
+            return result
+        self._future = event_loop.submit(result)
+        if self.cancelled:
+            self._future.cancel()
+        try:
+            return self._future.result()
+        except concurrent.futures.CancelledError:
+            return None
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def __repr__(self):
+        return f"Task({self.id}, {self.name!r}, {self.serial!r}, {self.state})"
+
+
+def current_task():
+    """The Task running on this thread, or None outside the executor."""
+    return getattr(_current, "task", None)
+
+
+def cancelled():
+    """True when the task running on this thread was cancelled; loops over many items check it between items."""
+    task = current_task()
+    return task is not None and task.cancelled
+
+
+class TaskExecutor:
+    """Runs the pages' background work on a bounded pool of threads.
+
+    Every task belongs to a device queue (its serial) in one of two
+    lanes; each device runs at most TASKS_PER_DEVICE tasks per lane at a
+    time, in the order they were submitted, and MAX_TASKS bound the
+    whole pool. Transfers go in the TRANSFER lane, so browsing a device
+    keeps working while a download runs on it; at most TRANSFER_TASKS of
+    them run at once, leaving the other workers for interactive tasks.
+    Tasks without a serial (fleet fan-outs, local work) only count
+    against the pool and their lane.
+
+    `function` may be a coroutine function: the worker then awaits it on
+    the shared asyncio loop and cancelling the task cancels the coroutine.
+
+    A task submitted with a `key` is de-duplicated: while a task with the
+    same key and serial is still queued, the existing one is returned instead of queueing
+    another, so mashing a button costs one run, plus at most one more
+    queued behind a running one so the last click still sees fresh state.
+    """
+
+    def __init__(self, max_workers=MAX_TASKS, per_device=TASKS_PER_DEVICE, history=TASK_HISTORY,
+                 max_transfers=TRANSFER_TASKS):
+        self.max_workers = max_workers
+        self.per_device = per_device
+        self.max_transfers = min(max_transfers, max_workers)
+        self.history = history
+        self._queue = []
+        self._running = []
+        self._finished = collections.deque(maxlen=history)
+        self._workers = 0
+        self._idle = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+
+    def add_listener(self, callback):
+        """Call `callback()` whenever a task is queued, starts, or finishes; called from any thread."""
+        self._listeners.append(callback)
+
+    def submit(self, function, *args, name=None, serial=None, key=None, on_cancel=None, lane=INTERACTIVE,
+               on_error=None):
+        """Queue `function(*args)` and return its Task.
+
+        `on_cancel` is called when the task is cancelled, for work that has
+        its own way to stop (a TransferControl). Pass `lane=TRANSFER` for
+        long transfers. An exception the function does not handle goes to
+        `on_error(exception)`, or else to an error box.
+        """
+        with self._lock:
+            if key is not None:
+                for task in self._queue:
+                    if task.key == key and task.serial == serial and not task.cancelled:
+                        return task
+            task = Task(function, args, name or getattr(function, "__name__", "task"), serial, key, on_cancel, lane,
+                        on_error)
+            self._queue.append(task)
+            if self._idle:
+                self._ready.notify()
+            elif self._workers < self.max_workers:
+                self._workers += 1
+                threading.Thread(target=self._work, name=f"task-{self._workers}", daemon=True).start()
+        self._notify()
+        return task
+
+    def cancel(self, task):
+        """Drop a queued task, or ask a running one to stop at its next check."""
+        task.cancel()
+        with self._lock:
+            if task not in self._queue:
+                return
+            self._queue.remove(task)
+            self._finish(task, CANCELLED)
+        self._notify()
+
+    def cancel_all(self, serial=None):
+        for task in self.tasks():
+            if task.active and (serial is None or task.serial == serial):
+                self.cancel(task)
+
+    def tasks(self):
+        """Running, queued, then recently finished tasks (newest first)."""
+        with self._lock:
+            return list(self._running) + list(self._queue) + list(reversed(self._finished))
+
+    def counts(self):
+        with self._lock:
+            return len(self._running), len(self._queue)
+
+    def _next_task(self):
+        """First queued task whose device queue and lane have room; call with the lock held."""
+        busy = collections.Counter((task.serial, task.lane) for task in self._running)
+        transfers = sum(task.lane == TRANSFER for task in self._running)
+        for task in self._queue:
+            if task.lane == TRANSFER and transfers >= self.max_transfers:
+                continue
+            if task.serial is None or busy[(task.serial, task.lane)] < self.per_device:
+                return task
+        return None
+
+    def _work(self):
+        while True:
+            with self._lock:
+                task = self._next_task()
+                while task is None:
+                    self._idle += 1
+                    self._ready.wait()
+                    self._idle -= 1
+                    task = self._next_task()
+                self._queue.remove(task)
+                self._running.append(task)
+                task.state = RUNNING
+                task.started = time.monotonic()
+            self._notify()
+
+            _current.task = task
+            try:
+                task.result = task.run()
+                state = CANCELLED if task.cancelled else DONE
+            except Exception as e:
+                task.error = e
+                state = FAILED
+                self._report(task, e)
+            finally:
+                _current.task = None
+
+            with self._lock:
+                self._running.remove(task)
+                self._finish(task, state)
+                self._ready.notify_all()  # The device queue this task held may have work for another worker
+            self._notify()
+
+    def _report(self, task, error):
+        """Tell the user about an error the task's function left unhandled; without a window, print it."""
+        try:
+            if task.on_error is not None:
+                task.on_error(error)
+            elif ui.root is not None:
+                messagebox.showerror("Error", f"{task.name} failed: {error}")
+            else:
+                print(f"Task {task.name!r} failed: {error}")
+        except Exception as e:  # The worker must outlive a broken callback
+            print(f"Task {task.name!r} failed: {error}; reporting it failed too: {e}")
+
+    def _finish(self, task, state):
+        task.state = state
+        task.finished = time.monotonic()
+        self._finished.append(task)
+        task._done.set()
+
+    def _notify(self):
+        for listener in list(self._listeners):
+            listener()
+
+
+tasks = TaskExecutor()
@@ -1,12 +1,12 @@
 # terminal.py
 import tkinter as tk
 from tkinter import ttk
-import subprocess
 import os
 import platform
 import threading
-import time
 import signal
+from .aio import event_loop, stream_process
+from .ui_dispatcher import ui
 
 class TerminalPage(ttk.Frame):
     def __init__(self, parent):
@@ -80,6 +80,10 @@ class TerminalPage(ttk.Frame):
         # Process handle for the currently running command
         self.current_process = None
 
+        # Output read by the worker thread, waiting to be shown on the next UI frame
+        self.pending_output = []
+        self.output_lock = threading.Lock()
+
     def execute_command(self, event=None):
         """Execute the command entered in the terminal."""
         command = self.command_entry.get().strip()
@@ -98,8 +102,9 @@ class TerminalPage(ttk.Frame):
             elif command.strip() == "ls":
                 self.list_directory()  # Handle 'ls' command using Python's os module
             else:
-                # Run the command in a separate thread with real-time output
-                threading.Thread(target=self.run_command_with_realtime_output, args=(command,), daemon=True).start()
+                # Stream the command's output from the event loop; no thread per command
+                future = event_loop.submit(self.run_command_with_realtime_output(command))
+                future.add_done_callback(lambda future: self.report_failure(future, command))
 
     def list_directory(self):
         """List files and directories in the current directory using Python's os module."""
@@ -130,59 +135,73 @@ class TerminalPage(ttk.Frame):
         else:
             os.system("x-terminal-emulator -e 'adb shell'")
 
-    def run_command_with_realtime_output(self, command):
+    async def run_command_with_realtime_output(self, command):
         """Run a shell command and stream its output in real-time."""
         try:
-            # Start the process
-            self.current_process = subprocess.Popen(
-                command.split(),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,  # Line-buffered
-                universal_newlines=True
-            )
-
-            # Read output in real-time
-            while True:
-                output = self.current_process.stdout.readline()
-                if output == "" and self.current_process.poll() is not None:
-                    break
-                if output:
-                    # Update the terminal text widget in the main thread
-                    self.master.after(0, self.terminal_text.insert, tk.END, output)
-                    self.master.after(0, self.terminal_text.see, tk.END)  # Auto-scroll
-                    #time.sleep(0.05)  # Update interval (0.05 seconds)
-
-            # Capture any remaining output
-            remaining_output, _ = self.current_process.communicate()
-            if remaining_output:
-                self.master.after(0, self.terminal_text.insert, tk.END, remaining_output)
-                self.master.after(0, self.terminal_text.see, tk.END)  # Auto-scroll
+            async for output in stream_process(command.split(), on_process=self.set_current_process):
+                self.write_output(output)
 
             # Add a newline after the command finishes
-            self.master.after(0, self.terminal_text.insert, tk.END, "\n")
+            self.write_output("\n")
 
         except FileNotFoundError:
-            self.master.after(0, self.terminal_text.insert, tk.END, f"Command not found: {command}\n\n")
+            self.write_output(f"Command not found: {command}\n\n")
         finally:
             self.current_process = None  # Reset the process handle
 
+    def report_failure(self, future, command):
+        """Show an error the command's coroutine raised, which would otherwise be lost with its future."""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.write_output(f"Error running {command}: {error}\n\n")
+
+    def set_current_process(self, process):
+        self.current_process = process
+
+    def write_output(self, text):
+        """Queue output from the event loop; lines arriving within one frame are inserted together."""
+        with self.output_lock:
+            self.pending_output.append(text)
+        ui.post(self.flush_output, key=("terminal", id(self)))
+
+    def flush_output(self):
+        with self.output_lock:
+            text = "".join(self.pending_output)
+            self.pending_output = []
+        if text:
+            self.terminal_text.insert(tk.END, text)
+            self.terminal_text.see(tk.END)  # Auto-scroll
+
     def send_ctrl_c(self):
         """Send a CTRL+C signal to the currently running process."""
-        if self.current_process:
+        process = self.current_process
+        if process:
             try:
-                # Send SIGINT (CTRL+C) to the process
+                # Send SIGINT (CTRL+C) to the process; the process belongs to the event loop, so signal it from there
                 if platform.system() == "Windows":
-                    self.current_process.terminate()  # Windows doesn't support SIGINT
+                    event_loop.call_soon(self.signal_process, process, None)  # Windows doesn't support SIGINT
                 else:
-                    self.current_process.send_signal(signal.SIGINT)
+                    event_loop.call_soon(self.signal_process, process, signal.SIGINT)
                 self.terminal_text.insert(tk.END, "\nCommand terminated with CTRL+C.\n")
             except Exception as e:
                 self.terminal_text.insert(tk.END, f"\nError terminating command: {e}\n")
         else:
             self.terminal_text.insert(tk.END, "\nNo command is currently running.\n")
 
+    @staticmethod
+    def signal_process(process, signum):
+        if process.returncode is not None:
+            return
+        try:
+            if signum is None:
+                process.terminate()
+            else:
+                process.send_signal(signum)
+        except ProcessLookupError:
+            pass
+
     def navigate_history(self, event):
         """Navigate through command history using up/down arrows."""
         if event.keysym == "Up":
@@ -1,13 +1,18 @@
 # tools.py
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk
 import subprocess
 import os
 from datetime import datetime
 import platform
-from PIL import Image, ImageTk  # For loading PNG icons
-from .utils import execute_command, get_connected_devices, get_device_info, capture_screenshot, capture_screenrecord, stop_screenrecord, get_device_model_serial
-import threading  # Import threading module
+from .utils import capture_screenrecord, stop_screenrecord, get_device_model_serial
+from . import services
+from .adb_client import adb
+from .devices import device_registry, device_selection
+from .fleet import report_fleet_result
+from .icons import icon_cache
+from .tasks import tasks
+from .ui_dispatcher import messagebox, ui
 
 class ToolsPage(ttk.Frame):
     def __init__(self, parent):
@@ -28,21 +33,21 @@ class ToolsPage(ttk.Frame):
 
         # Load PNG icons
         self.icons = {
-            "tools": self.load_icon("tools.png", 24, 24),
-            "device_info": self.load_icon("device_info.png", 24, 24),
-            "volume_up": self.load_icon("volume_up.png", 24, 24),
-            "volume_down": self.load_icon("volume_down.png", 24, 24),
-            "power": self.load_icon("power.png", 24, 24),
-            "camera": self.load_icon("camera.png", 24, 24),
-            "reboot": self.load_icon("reboot.png", 24, 24),
-            "scrcpy": self.load_icon("scrcpy.png", 24, 24),
-            "screenshot": self.load_icon("screenshot.png", 24, 24),
-            "screenrecord": self.load_icon("screenrecord.png", 24, 24),
-            "stop_record": self.load_icon("stop_record.png", 24, 24),
-            "folder": self.load_icon("folder.png", 24, 24),
-            "restart": self.load_icon("restart.png", 24, 24),
-            "recovery": self.load_icon("recovery.png", 24, 24),
-            "bootloader": self.load_icon("bootloader.png", 24, 24),
+            "tools": icon_cache.get("tools", 24),
+            "device_info": icon_cache.get("device_info", 24),
+            "volume_up": icon_cache.get("volume_up", 24),
+            "volume_down": icon_cache.get("volume_down", 24),
+            "power": icon_cache.get("power", 24),
+            "camera": icon_cache.get("camera", 24),
+            "reboot": icon_cache.get("reboot", 24),
+            "scrcpy": icon_cache.get("scrcpy", 24),
+            "screenshot": icon_cache.get("screenshot", 24),
+            "screenrecord": icon_cache.get("screenrecord", 24),
+            "stop_record": icon_cache.get("stop_record", 24),
+            "folder": icon_cache.get("folder", 24),
+            "restart": icon_cache.get("restart", 24),
+            "recovery": icon_cache.get("recovery", 24),
+            "bootloader": icon_cache.get("bootloader", 24),
         }
 
         # Device Info Section
@@ -93,115 +98,71 @@ class ToolsPage(ttk.Frame):
         self.text = tk.Text(self, height=15, width=30, font=("Arial", 10))
         self.text.grid(row=1, column=1, rowspan=7, padx=10, pady=5, sticky="nsew")
 
-    def load_icon(self, icon_name, width, height):
-        """Load and resize a PNG icon."""
-        try:
-            icon_path = os.path.join("icons", icon_name)  # Path to the icons folder
-            icon = Image.open(icon_path)
-            icon = icon.resize((width, height), Image.Resampling.LANCZOS)
-            return ImageTk.PhotoImage(icon)
-        except Exception as e:
-            print(f"Error loading icon {icon_name}: {e}")
-            return None
-
     def show_device_info(self):
-        def run():
-            device_serial = get_connected_devices()[0]
-            device_info = get_device_info(device_serial)
-            self.show_info_in_text_widget(device_info)
+        async def run():
+            device_info = await services.device_info(await services.active_device())
+            ui.post(self.show_info_in_text_widget, device_info)
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Device info", serial=device_selection.active(wait=False), key="device-info")
 
     def show_info_in_text_widget(self, device_info):
         self.text.delete("1.0", tk.END)
         for key, value in device_info.items():
             self.text.insert(tk.END, f"{key.replace('_', ' ').title()}: {value}\n")
 
-    def volume_up(self):
-        def run():
-            device_serial = get_connected_devices()[0]
-            execute_command(f"adb -s {device_serial} shell input keyevent KEYCODE_VOLUME_UP")
+    def press_key(self, keycode, name):
+        async def run():
+            await services.press_key(keycode, await services.active_device())
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name=name, serial=device_selection.active(wait=False))
 
-    def volume_down(self):
-        def run():
-            device_serial = get_connected_devices()[0]
-            execute_command(f"adb -s {device_serial} shell input keyevent KEYCODE_VOLUME_DOWN")
+    def volume_up(self):
+        self.press_key("KEYCODE_VOLUME_UP", "Volume up")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+    def volume_down(self):
+        self.press_key("KEYCODE_VOLUME_DOWN", "Volume down")
 
     def power(self):
-        def run():
-            device_serial = get_connected_devices()[0]
-            execute_command(f"adb -s {device_serial} shell input keyevent KEYCODE_POWER")
-
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        self.press_key("KEYCODE_POWER", "Power key")
 
     def camera(self):
-        def run():
-            device_serial = get_connected_devices()[0]
-            execute_command(f"adb -s {device_serial} shell input keyevent KEYCODE_CAMERA")
-
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        self.press_key("KEYCODE_CAMERA", "Camera key")
 
     def reboot(self):
-        def run():
-            device_serial = get_connected_devices()[0]
-            execute_command(f"adb -s {device_serial} reboot")
+        async def run():
+            await services.reboot(await services.active_device())
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Reboot", serial=device_selection.active(wait=False), key="reboot")
 
     def reboot_recovery(self):
-        def run():
-            device_serial = get_connected_devices()[0]
+        async def run():
             try:
-                execute_command(f"adb -s {device_serial} reboot recovery")
+                await services.reboot(await services.active_device(), "recovery")
             except Exception as e:
                 print("Error: No Device Connected.")
             else:
                 messagebox.showinfo("Reboot Recovery", "Reboot to Recovery Mode started successfully!")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Reboot to recovery", serial=device_selection.active(wait=False), key="reboot-recovery")
 
     def reboot_bootloader(self):
-        def run():
-            device_serial = get_connected_devices()[0]
+        async def run():
             try:
-                execute_command(f"adb -s {device_serial} reboot bootloader")
+                await services.reboot(await services.active_device(), "bootloader")
             except Exception as e:
                 print("Error: No Device Connected.")
             else:
                 messagebox.showinfo("Reboot Bootloader", "Reboot to Bootloader Mode started successfully!")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Reboot to bootloader", serial=device_selection.active(wait=False), key="reboot-bootloader")
 
     def restart_adb(self):
         def run():
-            device_serial = get_connected_devices()[0]
-            execute_command(f"adb -s {device_serial} kill-server")
-            execute_command(f"adb -s {device_serial} start-server")
+            adb.kill_server()
+            adb.start_server()
             messagebox.showinfo("ADB Restart", "ADB Restart with successfully.")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Restart ADB server", key="restart-adb")
 
     def execute_scrcpy(self):
         def run():
@@ -216,20 +177,20 @@ class ToolsPage(ttk.Frame):
             else:
                 messagebox.showwarning("Scrcpy not found or not installed. Check if it's available.")
                 return  # Exit function if scrcpy is not supported
+            device_serial = device_selection.active()
+            # Mirror the selected device; without -s scrcpy refuses to choose when several are connected
+            serial_args = ["-s", device_serial] if device_serial else []
             if choice:
                 current_time = datetime.now().strftime("%Y%m%d-%H%M%S")
                 filename = f"Scrcpy_screenrecord-{current_time}.mp4"
-                connected_devices = get_connected_devices()
-                if connected_devices:
-                    device_serial = connected_devices[0]
-                    device_info = get_device_info(device_serial)
-                    device_model = device_info.get('model')
+                if device_serial:
+                    device_model = device_registry.model(device_serial)
                     if device_model:
                         directory_path = f"./device-pull/{device_model}-{device_serial}/screenrecord"
                         if not os.path.exists(directory_path):
                             os.makedirs(directory_path)
                         try:
-                            subprocess.Popen([scrcpy_path, "--record", os.path.join(directory_path, filename)])
+                            subprocess.Popen([scrcpy_path, *serial_args, "--record", os.path.join(directory_path, filename)])
                             print("scrcpy with screen recording started successfully!")
                         except FileNotFoundError:
                             print("Error: scrcpy executable not found.")
@@ -242,7 +203,7 @@ class ToolsPage(ttk.Frame):
                     print("Error: No connected devices.")
             else:
                 try:
-                    subprocess.Popen([scrcpy_path])
+                    subprocess.Popen([scrcpy_path, *serial_args])
                     print("scrcpy started successfully!")
                 except FileNotFoundError:
                     print("Error: scrcpy executable not found.")
@@ -250,51 +211,45 @@ class ToolsPage(ttk.Frame):
                 except Exception as e:
                     print(f"Error: {e}")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Scrcpy")
 
     def take_screenshot(self):
-        def run():
-            device_serial = get_connected_devices()[0]
-            capture_screenshot(device_serial)
-            messagebox.showinfo("Screenshot Captured", "Screenshot captured and saved successfully.")
+        async def run():
+            result = await services.take_screenshots(await services.target_devices())
+            if len(result) == 1 and result.ok:
+                messagebox.showinfo("Screenshot Captured", "Screenshot captured and saved successfully.")
+            else:
+                report_fleet_result(result, "Screenshots captured and saved successfully.", "Error capturing screenshot")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Screenshot")
 
     def start_screenrecord(self):
         def run():
-            device_serial = get_connected_devices()[0]
+            device_serial = device_selection.active()
             device_model, filename = capture_screenrecord(device_serial)
             if filename:
                 self.current_filename = filename
-                self.stop_screenrecord_button.config(state=tk.NORMAL)
+                ui.post(lambda: self.stop_screenrecord_button.config(state=tk.NORMAL))
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Start screen record", serial=device_selection.active(wait=False))
 
     def stop_screenrecord(self):
         def run():
-            device_serial = get_connected_devices()[0]
-            device_model = get_device_info(device_serial)['model']
+            device_serial = device_selection.active()
+            device_model = device_registry.model(device_serial)
             if device_model:
                 if self.current_filename:
                     stop_screenrecord(device_serial, device_model, self.current_filename)
                     self.current_filename = None
-                self.stop_screenrecord_button.config(state=tk.DISABLED)
+                ui.post(lambda: self.stop_screenrecord_button.config(state=tk.DISABLED))
             else:
                 messagebox.showwarning("Device Model Not Found", "Device model information not found.")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Stop screen record", serial=device_selection.active(wait=False))
 
     def open_pulled_device_folder(self):
         def run():
-            device_serial = get_connected_devices()[0]
+            device_serial = device_selection.active()
             device_model, device_serial = get_device_model_serial(device_serial)
             if device_model:
                 # Sanitize the device model and serial for use in file paths
@@ -325,7 +280,5 @@ class ToolsPage(ttk.Frame):
             else:
                 messagebox.showwarning("Device Model Not Found", "Device model information not found.")
 
-        # Start the operation in a separate thread
-        thread = threading.Thread(target=run)
-        thread.start()
+        tasks.submit(run, name="Open device folder", key="open-device-folder")
 
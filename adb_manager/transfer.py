@@ -0,0 +1,382 @@
+# transfer.py
+import collections
+import os
+import posixpath
+import shlex
+import stat
+import threading
+import time
+from .adb_client import SYNC_DATA_MAX, AdbError, adb
+
+WRITE_BUFFER_SIZE = 1024 * 1024  # Local writes are batched into 1 MiB chunks
+PART_SUFFIX = ".part"
+TRANSFER_WORKERS = 4  # Concurrent sync connections per device
+MKDIR_BATCH = 64  # Directories created per `mkdir -p` call
+
+
+class TransferCancelled(AdbError):
+    def __init__(self):
+        super().__init__("Transfer cancelled")
+
+
+class TransferControl:
+    """Pause/cancel switch shared by every worker of a transfer.
+
+    Workers call `checkpoint()` between chunks: it blocks while paused and
+    raises TransferCancelled once cancelled.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()
+
+    def checkpoint(self):
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise TransferCancelled()
+
+
+class TransferProgress:
+    """Byte counters shared between a transfer thread and whoever displays them.
+
+    The worker only bumps counters; the UI reads them on its own schedule,
+    so no Tk call ever happens on the worker thread.
+    """
+
+    def __init__(self):
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.total_files = 0
+        self.done_files = 0
+        self.current = ""
+        self.started = time.monotonic()
+        self.finished = False
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add_total(self, size, files=1):
+        with self._lock:
+            self.total_bytes += size
+            self.total_files += files
+
+    def advance(self, size):
+        with self._lock:
+            self.done_bytes += size
+
+    def file_done(self):
+        with self._lock:
+            self.done_files += 1
+
+    def finish(self, error=None):
+        self.error = error
+        self.finished = True
+
+    @property
+    def percent(self):
+        if not self.total_bytes:
+            return 100 if self.finished else 0
+        return min(int(self.done_bytes * 100 / self.total_bytes), 100)
+
+    def rate(self):
+        """Average throughput so far in bytes per second."""
+        elapsed = time.monotonic() - self.started
+        return self.done_bytes / elapsed if elapsed > 0 else 0.0
+
+
+class RemoteFile:
+    def __init__(self, remote_path, local_path, size, mtime):
+        self.remote_path = remote_path
+        self.local_path = local_path
+        self.size = size
+        self.mtime = mtime
+
+
+class LocalFile:
+    def __init__(self, local_path, remote_path, size, mtime, mode):
+        self.local_path = local_path
+        self.remote_path = remote_path
+        self.size = size
+        self.mtime = mtime
+        self.mode = mode
+
+
+def replace_file(source, destination):
+    """os.replace, also over a read-only destination such as a link into the object store.
+
+    Windows will not replace a read-only file, so its write bit is set
+    first there. The bit belongs to the content, so on Windows the other
+    links to the old object become writable too.
+    """
+    try:
+        os.replace(source, destination)
+    except PermissionError:
+        os.chmod(destination, stat.S_IREAD | stat.S_IWRITE)
+        os.replace(source, destination)
+
+
+def remove_file(path):
+    """os.remove that also removes a read-only link into the object store; see replace_file."""
+    try:
+        os.remove(path)
+    except PermissionError:
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+        os.remove(path)
+
+
+def part_path(local_path, size, mtime):
+    """Name of the partial download; it encodes the remote size and mtime so a
+    changed remote file never resumes onto stale bytes."""
+    return f"{local_path}.{size}-{mtime}{PART_SUFFIX}"
+
+
+def collect_remote_files(sync, remote_path, local_path):
+    """Walk `remote_path` over a sync session and return (files, directories).
+
+    The top-level path is resolved through symlinks (`/sdcard` is one);
+    inside the tree, links to files are pulled and links to directories
+    are skipped so a loop cannot recurse forever.
+    """
+    info = sync.stat(remote_path)
+    if info is None:
+        raise AdbError(f"remote object '{remote_path}' does not exist", cmd=remote_path)
+    if not stat.S_ISDIR(info.mode):
+        return [RemoteFile(remote_path, local_path, info.size, info.mtime)], []
+    files, directories = [], [local_path]
+    pending = [(remote_path.rstrip("/") or "/", local_path)]
+    while pending:
+        remote_dir, local_dir = pending.pop()
+        for entry in sync.list(remote_dir):
+            remote_child = posixpath.join(remote_dir, entry.name)
+            local_child = os.path.join(local_dir, entry.name)
+            if stat.S_ISLNK(entry.mode):
+                target = sync.stat(remote_child)
+                if target is None or not stat.S_ISREG(target.mode):
+                    continue
+                entry = entry._replace(mode=target.mode, size=target.size, mtime=target.mtime)
+            if stat.S_ISDIR(entry.mode):
+                directories.append(local_child)
+                pending.append((remote_child, local_child))
+            elif stat.S_ISREG(entry.mode):
+                files.append(RemoteFile(remote_child, local_child, entry.size, entry.mtime))
+    return files, directories
+
+
+def is_up_to_date(remote_file):
+    try:
+        info = os.stat(remote_file.local_path)
+    except OSError:
+        return False
+    return info.st_size == remote_file.size and int(info.st_mtime) == remote_file.mtime
+
+
+def pull_file(sync, remote_file, progress=None, resume=True, client=adb, serial=None, control=None):
+    """Stream one remote file to disk through a `.part` file, resuming a matching one."""
+    partial = part_path(remote_file.local_path, remote_file.size, remote_file.mtime)
+    offset = os.path.getsize(partial) if resume and os.path.exists(partial) else 0
+    if offset > remote_file.size:
+        offset = 0
+    with open(partial, "ab" if offset else "wb", buffering=WRITE_BUFFER_SIZE) as file:
+        def write(chunk):
+            if control is not None:
+                control.checkpoint()
+            file.write(chunk)
+            if progress is not None:
+                progress.advance(len(chunk))
+
+        if progress is not None and offset:
+            progress.advance(offset)
+        if offset == 0:
+            sync.recv(remote_file.remote_path, write)
+        elif offset < remote_file.size:
+            # RECV cannot seek, so stream the missing tail instead
+            for chunk in client.shell_stream(f"tail -c +{offset + 1} {shlex.quote(remote_file.remote_path)}", serial=serial):
+                write(chunk)
+    written = os.path.getsize(partial)
+    if written != remote_file.size:
+        raise AdbError(f"{remote_file.remote_path}: expected {remote_file.size} bytes, got {written}", cmd=remote_file.remote_path)
+    replace_file(partial, remote_file.local_path)
+    if remote_file.mtime:
+        os.utime(remote_file.local_path, (remote_file.mtime, remote_file.mtime))
+    if progress is not None:
+        progress.file_done()
+
+
+def collect_local_files(local_path, remote_path):
+    """Walk a local file or tree and return (files, remote directories to create)."""
+    if not os.path.isdir(local_path):
+        info = os.stat(local_path)
+        return [LocalFile(local_path, remote_path, info.st_size, int(info.st_mtime), stat.S_IMODE(info.st_mode))], []
+    files, directories = [], []
+    for dirpath, dirnames, filenames in os.walk(local_path):
+        relative = os.path.relpath(dirpath, local_path)
+        remote_dir = remote_path if relative == "." else posixpath.join(remote_path, *relative.split(os.sep))
+        directories.append(remote_dir)
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            info = os.stat(path)
+            files.append(LocalFile(path, posixpath.join(remote_dir, name), info.st_size, int(info.st_mtime), stat.S_IMODE(info.st_mode)))
+    return files, directories
+
+
+def push_file(sync, local_file, progress=None, control=None):
+    """Send one local file with SEND, in SYNC_DATA_MAX chunks."""
+    def chunks():
+        with open(local_file.local_path, "rb") as file:
+            while True:
+                if control is not None:
+                    control.checkpoint()
+                chunk = file.read(SYNC_DATA_MAX)
+                if not chunk:
+                    return
+                yield chunk
+                if progress is not None:
+                    progress.advance(len(chunk))
+
+    sync.send(local_file.remote_path, chunks(), mode=local_file.mode, mtime=local_file.mtime)
+    if progress is not None:
+        progress.file_done()
+
+
+class TransferScheduler:
+    """Run per-file jobs over several sync connections to one device.
+
+    Jobs are taken largest first, so a big file never starts last and
+    leaves the other connections idle while it finishes. Each worker keeps
+    one pooled sync session for all of its jobs. The first failure stops
+    the remaining jobs from starting and is re-raised by `run()`.
+    """
+
+    def __init__(self, client=adb, serial=None, workers=TRANSFER_WORKERS, control=None):
+        self.client = client
+        self.serial = serial
+        self.workers = workers
+        self.control = control if control is not None else TransferControl()
+
+    def run(self, jobs, action):
+        """Call `action(sync, job)` for every job; jobs need a `size` attribute."""
+        queue = collections.deque(sorted(jobs, key=lambda job: job.size, reverse=True))
+        lock = threading.Lock()
+        errors = []
+
+        def next_job():
+            with lock:
+                if errors or not queue:
+                    return None
+                return queue.popleft()
+
+        def work():
+            try:
+                job = next_job()
+                if job is None:
+                    return
+                with self.client.sync(self.serial) as sync:
+                    while job is not None:
+                        self.control.checkpoint()
+                        action(sync, job)
+                        job = next_job()
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=work, name=f"transfer-{index}", daemon=True)
+                   for index in range(min(self.workers, len(queue)))]
+        for thread in threads[1:]:
+            thread.start()
+        if threads:
+            work()  # The calling thread is one of the workers
+        for thread in threads[1:]:
+            thread.join()
+        if errors:
+            # A cancel shows up in every worker; report the real failure if there was one
+            raise next((e for e in errors if not isinstance(e, TransferCancelled)), errors[0])
+
+
+def pull_many(items, serial=None, progress=None, resume=True, client=adb, workers=TRANSFER_WORKERS, control=None):
+    """Pull several (remote path, local path) pairs to exactly those local paths.
+
+    Every tree is walked first so the byte total is known before the first
+    file starts; the files are then pulled in parallel by a
+    TransferScheduler. With `resume`, files that already match the remote
+    size and mtime are skipped and partial `.part` files are continued
+    where they stopped.
+    """
+    progress = progress if progress is not None else TransferProgress()
+    files = []
+    with client.sync(serial) as sync:
+        for remote_path, local_path in items:
+            item_files, directories = collect_remote_files(sync, remote_path, local_path)
+            progress.add_total(sum(remote_file.size for remote_file in item_files), len(item_files))
+            files.extend(item_files)
+            parent = os.path.dirname(local_path)
+            for directory in directories + ([parent] if parent else []):
+                os.makedirs(directory, exist_ok=True)
+    pending = []
+    for remote_file in files:
+        if resume and is_up_to_date(remote_file):
+            progress.advance(remote_file.size)
+            progress.file_done()
+        else:
+            pending.append(remote_file)
+
+    def action(sync, remote_file):
+        progress.current = remote_file.remote_path
+        pull_file(sync, remote_file, progress, resume, client, serial, scheduler.control)
+
+    scheduler = TransferScheduler(client, serial, workers, control)
+    scheduler.run(pending, action)
+    return progress
+
+
+def pull(remote_path, local_path, serial=None, progress=None, resume=True, client=adb, workers=TRANSFER_WORKERS, control=None):
+    """Pull a remote file or tree to exactly `local_path`; see pull_many()."""
+    return pull_many([(remote_path, local_path)], serial, progress, resume, client, workers, control)
+
+
+def push_many(items, serial=None, progress=None, client=adb, workers=TRANSFER_WORKERS, control=None):
+    """Push several (local path, remote path) pairs in parallel.
+
+    As with `adb push`, a remote path that is an existing directory
+    receives the local file or folder inside it.
+    """
+    progress = progress if progress is not None else TransferProgress()
+    files, directories = [], []
+    with client.sync(serial) as sync:
+        for local_path, remote_path in items:
+            target = sync.stat(remote_path)
+            if target is not None and stat.S_ISDIR(target.mode):
+                remote_path = posixpath.join(remote_path, os.path.basename(os.path.normpath(local_path)))
+            item_files, item_directories = collect_local_files(local_path, remote_path)
+            progress.add_total(sum(local_file.size for local_file in item_files), len(item_files))
+            files.extend(item_files)
+            directories.extend(item_directories)
+    for index in range(0, len(directories), MKDIR_BATCH):
+        paths = " ".join(shlex.quote(directory) for directory in directories[index:index + MKDIR_BATCH])
+        client.check_call(f"mkdir -p {paths}", serial=serial)
+
+    def action(sync, local_file):
+        progress.current = local_file.local_path
+        push_file(sync, local_file, progress, scheduler.control)
+
+    scheduler = TransferScheduler(client, serial, workers, control)
+    scheduler.run(files, action)
+    return progress
@@ -0,0 +1,154 @@
+# ui_dispatcher.py
+import collections
+import threading
+import time
+
+FRAME_INTERVAL_MS = 16  # How often the Tk loop drains the queue
+FRAME_BUDGET = 0.008  # Seconds of queued work run per frame; the rest waits for the next frame
+
+
+class UiDispatcher:
+    """The one way worker threads reach Tk.
+
+    Workers `post()` callbacks; the Tk main loop drains them every frame
+    and stops after FRAME_BUDGET so a burst of output never freezes the
+    window. Events posted with a `key` are coalesced: while one is still
+    queued, a newer post replaces its callback instead of adding another
+    (a progress label only needs its latest value).
+    """
+
+    def __init__(self, frame_interval_ms=FRAME_INTERVAL_MS, frame_budget=FRAME_BUDGET):
+        self.frame_interval_ms = frame_interval_ms
+        self.frame_budget = frame_budget
+        self.root = None
+        self.thread_id = threading.get_ident()
+        self._queue = collections.deque()
+        self._keyed = {}  # key -> [callback, args, posted_at] of the queued event with that key
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.events = 0
+        self.coalesced = 0
+        self.max_latency = 0.0  # Longest time an event waited in the queue
+        self.max_frame = 0.0  # Longest time one drain ran
+
+    def attach(self, root):
+        """Start draining on `root`'s event loop; must be called from the Tk thread."""
+        self.root = root
+        self.thread_id = threading.get_ident()
+        root.after(self.frame_interval_ms, self._pump)
+
+    def on_ui_thread(self):
+        return threading.get_ident() == self.thread_id
+
+    def post(self, callback, *args, key=None):
+        """Run `callback(*args)` on the Tk thread during the next frame."""
+        now = time.perf_counter()
+        with self._lock:
+            if key is not None:
+                pending = self._keyed.get(key)
+                if pending is not None:
+                    pending[0], pending[1] = callback, args
+                    self.coalesced += 1
+                    return
+                self._keyed[key] = [callback, args, now]
+                self._queue.append((key, None, None, None))
+            else:
+                self._queue.append((None, callback, args, now))
+
+    def call(self, callback, *args):
+        """Run `callback(*args)` on the Tk thread and return its result, waiting for it if needed."""
+        if self.root is None or self.on_ui_thread():
+            return callback(*args)
+        done = threading.Event()
+        result = {}
+
+        def run():
+            try:
+                result["value"] = callback(*args)
+            except Exception as e:
+                result["error"] = e
+            done.set()
+
+        self.post(run)
+        done.wait()
+        if "error" in result:
+            raise result["error"]
+        return result.get("value")
+
+    def drain(self):
+        """Run queued events until the queue is empty or the frame budget is spent."""
+        start = time.perf_counter()
+        while time.perf_counter() - start < self.frame_budget:
+            with self._lock:
+                if not self._queue:
+                    break
+                event = self._queue.popleft()
+                if event[0] is not None:
+                    callback, args, posted_at = self._keyed.pop(event[0])
+                else:
+                    _, callback, args, posted_at = event
+            self.max_latency = max(self.max_latency, time.perf_counter() - posted_at)
+            self.events += 1
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"UI callback {callback!r} failed: {e}")
+        self.frames += 1
+        self.max_frame = max(self.max_frame, time.perf_counter() - start)
+
+    def pending(self):
+        with self._lock:
+            return len(self._queue)
+
+    def _pump(self):
+        self.drain()
+        self.root.after(self.frame_interval_ms, self._pump)
+
+    def stats(self):
+        return (f"{self.events} events in {self.frames} frames, {self.coalesced} coalesced, "
+                f"max queue wait {self.max_latency * 1000:.1f} ms, max frame {self.max_frame * 1000:.1f} ms")
+
+
+ui = UiDispatcher()
+
+
+class ThreadSafeMessagebox:
+    """Drop-in for `tkinter.messagebox` that can be called from any thread.
+
+    Notices (`showinfo`, `showwarning`, `showerror`) from a worker are
+    posted and the worker carries on; questions wait for the answer on the
+    Tk thread. On the Tk thread everything runs directly.
+    """
+
+    def showinfo(self, title=None, message=None, **options):
+        return self._notify("showinfo", title, message, options)
+
+    def showwarning(self, title=None, message=None, **options):
+        return self._notify("showwarning", title, message, options)
+
+    def showerror(self, title=None, message=None, **options):
+        return self._notify("showerror", title, message, options)
+
+    def askyesno(self, title=None, message=None, **options):
+        return ui.call(lambda: _tk_messagebox().askyesno(title, message, **options))
+
+    def askyesnocancel(self, title=None, message=None, **options):
+        return ui.call(lambda: _tk_messagebox().askyesnocancel(title, message, **options))
+
+    def askokcancel(self, title=None, message=None, **options):
+        return ui.call(lambda: _tk_messagebox().askokcancel(title, message, **options))
+
+    def _notify(self, name, title, message, options):
+        show = getattr(_tk_messagebox(), name)
+        if ui.root is None or ui.on_ui_thread():
+            return show(title, message, **options)
+        ui.post(lambda: show(title, message, **options))
+        return "ok"
+
+
+def _tk_messagebox():
+    from tkinter import messagebox as tk_messagebox  # Imported on first use; the CLI never shows one
+    return tk_messagebox
+
+
+messagebox = ThreadSafeMessagebox()
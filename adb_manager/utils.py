@@ -3,57 +3,43 @@ import subprocess
 import os
 from datetime import datetime
 from time import sleep
-from tkinter import messagebox
 import threading
-
-def execute_command(command):
-    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    output, _ = process.communicate()
-    return output.decode().strip()
+from .adb_client import adb
+from .devices import device_registry, get_device_properties
+from .ui_dispatcher import messagebox
 
 def get_connected_devices():
-    adb_devices_output = execute_command("adb devices").split('\n')[1:]
-    devices = [line.split('\t')[0] for line in adb_devices_output if line.strip()]
-    return devices
+    return device_registry.serials()
 
 def get_device_info(device_serial):
-    info = {}
-    info['model'] = execute_command(f"adb -s {device_serial} shell getprop ro.product.model")
-    info['brand'] = execute_command(f"adb -s {device_serial} shell getprop ro.product.vendor.brand")
-    info['chipset'] = execute_command(f"adb -s {device_serial} shell getprop ro.product.board")
-    info['android_version'] = execute_command(f"adb -s {device_serial} shell getprop ro.build.version.release")
-    info['security_patch'] = execute_command(f"adb -s {device_serial} shell getprop ro.build.version.security_patch")
-    info['device'] = execute_command(f"adb -s {device_serial} shell getprop ro.product.vendor.device")
-    info['sim'] = execute_command(f"adb -s {device_serial} shell getprop gsm.sim.operator.alpha")
-    info['encryption_state'] = execute_command(f"adb -s {device_serial} shell getprop ro.crypto.state")
-    info['build_date'] = execute_command(f"adb -s {device_serial} shell getprop ro.build.date")
-    info['sdk_version'] = execute_command(f"adb -s {device_serial} shell getprop ro.build.version.sdk")
-    info['wifi_interface'] = execute_command(f"adb -s {device_serial} shell getprop wifi.interface")
-    info['abi'] = execute_command(f"adb -s {device_serial} shell getprop ro.product.cpu.abi")
-    return info
+    return get_device_properties(device_serial).as_info()
+
+def save_screenshot(device_serial):
+    """Take a screenshot and pull it into the device folder; returns the local path."""
+    device_model = get_device_properties(device_serial).model
+    if not device_model:
+        raise ValueError("Device model not found.")
+    current_time = datetime.now().strftime("%Y%m%d-%H%M%S")
+    adb.check_call(f"screencap -p /sdcard/screenshot-{current_time}.png", serial=device_serial)
+    sanitized_model = device_model.replace(":", "_").replace(".", "_")
+    sanitized_serial = device_serial.replace(":", "_").replace(".", "_")
+    directory_path = f"./device-pull/{sanitized_model}-{sanitized_serial}"
+    if not os.path.exists(directory_path):
+        os.makedirs(directory_path)
+    screenshot_folder_path = os.path.join(directory_path, "screenshot")
+    if not os.path.exists(screenshot_folder_path):
+        os.makedirs(screenshot_folder_path)
+    local_path = adb.pull(f"/sdcard/screenshot-{current_time}.png", screenshot_folder_path, serial=device_serial)
+    adb.check_call(f"rm /sdcard/screenshot-{current_time}.png", serial=device_serial)
+    return local_path
 
 def capture_screenshot(device_serial):
     def run():
-        device_model = execute_command(f"adb -s {device_serial} shell getprop ro.product.model")
-        if device_model:
-            current_time = datetime.now().strftime("%Y%m%d-%H%M%S")
-            adb_command = ["adb", "-s", device_serial, "shell", "screencap", "-p", f"/sdcard/screenshot-{current_time}.png"]
-            subprocess.run(adb_command, check=True)
-            sanitized_model = device_model.replace(":", "_").replace(".", "_")
-            sanitized_serial = device_serial.replace(":", "_").replace(".", "_")
-            directory_path = f"./device-pull/{sanitized_model}-{sanitized_serial}"
-            if not os.path.exists(directory_path):
-                os.makedirs(directory_path)
-            screenshot_folder_path = os.path.join(directory_path, "screenshot")
-            if not os.path.exists(screenshot_folder_path):
-                os.makedirs(screenshot_folder_path)
-            adb_command = ["adb", "-s", device_serial, "pull", f"/sdcard/screenshot-{current_time}.png", screenshot_folder_path]
-            subprocess.run(adb_command, check=True)
-            adb_command = ["adb", "-s", device_serial, "shell", "rm", f"/sdcard/screenshot-{current_time}.png"]
-            subprocess.run(adb_command, check=True)
+        try:
+            save_screenshot(device_serial)
             print("Screenshot process complete.")
-        else:
-            print("Device model not found.")
+        except (ValueError, subprocess.CalledProcessError) as e:
+            print(f"Error: {e}")
 
     # Start the operation in a separate thread
     thread = threading.Thread(target=run)
@@ -61,13 +47,13 @@ def capture_screenshot(device_serial):
 
 def capture_screenrecord(device_serial):
     global is_recording
-    device_model = execute_command(f"adb -s {device_serial} shell getprop ro.product.model")
+    device_model = get_device_properties(device_serial).model
     if device_model:
         try:
             current_time = datetime.now().strftime("%Y%m%d-%H%M%S")
             filename = f"screenrecord-{current_time}.mp4"
-            adb_command = ["adb", "-s", device_serial, "shell", "screenrecord", f"/sdcard/{filename}"]
-            subprocess.Popen(adb_command)
+            # The shell service stays open until screenrecord is killed
+            threading.Thread(target=adb.run, args=(f"screenrecord /sdcard/{filename}",), kwargs={"serial": device_serial}, daemon=True).start()
             is_recording = True
             messagebox.showinfo("Screen Recording Started", "Screen recording started successfully.")
             return device_model, filename
@@ -81,8 +67,7 @@ def stop_screenrecord(device_serial, device_model, filename):
     global is_recording
     try:
         if is_recording:
-            adb_command = ["adb", "-s", device_serial, "shell", "pkill", "-l", "2", "screenrecord"]
-            subprocess.run(adb_command, check=True)
+            adb.check_call("pkill -l 2 screenrecord", serial=device_serial)
             sleep(0.5)
             is_recording = False
             directory_path = f"./device-pull/{device_model}-{device_serial}"
@@ -91,10 +76,8 @@ def stop_screenrecord(device_serial, device_model, filename):
             screenrecord_folder_path = os.path.join(directory_path, "screenrecord")
             if not os.path.exists(screenrecord_folder_path):
                 os.makedirs(screenrecord_folder_path)
-            adb_command = ["adb", "-s", device_serial, "pull", f"/sdcard/{filename}", screenrecord_folder_path]
-            subprocess.run(adb_command, check=True)
-            adb_command = ["adb", "-s", device_serial, "shell", "rm", f"/sdcard/{filename}"]
-            subprocess.run(adb_command, check=True)
+            adb.pull(f"/sdcard/{filename}", screenrecord_folder_path, serial=device_serial)
+            adb.check_call(f"rm /sdcard/{filename}", serial=device_serial)
             messagebox.showinfo("Screen Recording Stopped", "Screen recording stopped and saved successfully.")
         else:
             messagebox.showwarning("Screen Recording Not Active", "No screen recording is currently active.")
@@ -103,22 +86,36 @@ def stop_screenrecord(device_serial, device_model, filename):
     except Exception as e:
         print("Error:", e)
 
+def get_device_pull_path(device_model, device_serial):
+    """Local folder that pulled data for a device goes into."""
+    sanitized_model = device_model.replace(":", "_").replace(".", "_")
+    sanitized_serial = device_serial.replace(":", "_").replace(".", "_")
+    return f"./device-pull/{sanitized_model}-{sanitized_serial}"
+
 def get_device_model_serial(device_identifier):
     if isinstance(device_identifier, int):
-        devices = subprocess.run(["adb", "devices"], capture_output=True, text=True).stdout.strip().split('\n')[1:]
+        devices = device_registry.serials()
         if len(devices) >= device_identifier:
-            device_serial = devices[device_identifier - 1].split('\t')[0]
-            device_model = subprocess.run(["adb", "-s", device_serial, "shell", "getprop", "ro.product.model"], capture_output=True, text=True).stdout.strip()
-            return device_model, device_serial
+            device_serial = devices[device_identifier - 1]
+            return device_registry.model(device_serial), device_serial
         else:
             return None, None
     elif isinstance(device_identifier, str):
         device_serial = device_identifier
-        device_model = subprocess.run(["adb", "-s", device_serial, "shell", "getprop", "ro.product.model"], capture_output=True, text=True).stdout.strip()
-        return device_model, device_serial
+        return device_registry.model(device_serial), device_serial
     else:
         return None, None
 
+def format_size(size_bytes):
+    """Human readable size: KB below 1000 KB, MB below 1000 MB, GB above."""
+    size_kb = size_bytes / 1024
+    if size_kb < 1000:
+        return f"{size_kb:.2f} KB"
+    elif size_kb < 1000 * 1000:
+        return f"{size_kb / 1024:.2f} MB"
+    else:
+        return f"{size_kb / (1024 * 1024):.2f} GB"
+
 def format_package_info(package_info):
     formatted_info = []
     entries = package_info.split("|")[1:]  # Remove empty strings before and after entries
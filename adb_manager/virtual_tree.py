@@ -0,0 +1,183 @@
+# virtual_tree.py
+POOL_SIZE = 150  # Tk items kept in the tree: a tall window's worth of rows plus a buffer on either side
+EDGE = 0.15  # Fraction of the pool that may be left above or below the view before the pool moves
+
+
+class VirtualTreeview:
+    """Shows the rows of a plain list in a ttk.Treeview through a fixed pool of Tk items.
+
+    However many rows there are, at most POOL_SIZE items exist. They show
+    the rows around the view, and when the view nears either end of the
+    pool the same items are given the rows of the new position. The
+    scrollbar works in rows of the whole list, so dragging it or pressing
+    Home/End goes anywhere at once.
+
+    Selection and focus are kept as indices into the backing list, not as
+    Tk items, since an item shows another row after every move; that also
+    lets select_all() select rows that are not shown. `make_row(row)`
+    returns the (text, values, image) of one item. `on_view()`, if given,
+    is called whenever the visible part changes, for work that only
+    matters on screen (see `visible()`), and `on_select()` whenever the
+    selected rows change.
+    """
+
+    def __init__(self, tree, make_row, scrollbar=None, on_view=None, on_select=None, pool_size=POOL_SIZE):
+        self.tree = tree
+        self.make_row = make_row
+        self.scrollbar = scrollbar
+        self.on_view = on_view
+        self.on_select = on_select
+        self.pool_size = pool_size
+        self.rows = []
+        self.start = 0  # Index of the row the first item shows
+        self.items = []  # The pool of Tk items, in display order
+        self.selected = set()  # Indices of the selected rows
+        self.focus = None  # Index of the focused row
+        tree.configure(yscrollcommand=self._on_yview)
+        tree.bind("<<TreeviewSelect>>", self._on_tree_select, add="+")
+        tree.bind("<Home>", lambda event: self._jump(0), add="+")
+        tree.bind("<End>", lambda event: self._jump(len(self.rows) - 1), add="+")
+        if scrollbar is not None:
+            scrollbar.configure(command=self._on_scroll)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def set_rows(self, rows):
+        """Replace the backing rows and show them from the top."""
+        self.rows = rows
+        self.start = 0
+        changed = bool(self.selected)
+        self.selected = set()
+        self.focus = None
+        self._fill_pool()
+        self.tree.yview_moveto(0)
+        self._after_change(changed)
+
+    def extend_rows(self, rows):
+        """Append rows that streamed in; they are shown at once while the pool is not full."""
+        self.rows.extend(rows)
+        if len(self.items) < self.pool_size:
+            self._fill_pool()
+        self._after_change(False)
+
+    def reorder(self, rows):
+        """Switch to `rows` (the same rows, sorted or filtered), keeping the selected rows selected."""
+        positions = {id(row): index for index, row in enumerate(rows)}
+        selected = {positions[id(self.rows[index])] for index in self.selected if id(self.rows[index]) in positions}
+        focus = positions.get(id(self.rows[self.focus])) if self.focus is not None else None
+        changed = len(selected) != len(self.selected)
+        self.rows = rows
+        self.selected = selected
+        self.focus = focus
+        self.start = max(min(self.start, len(rows) - self.pool_size), 0)
+        self._fill_pool()
+        self._after_change(changed)
+
+    def selected_rows(self):
+        """The selected rows, in display order, whether or not they are shown."""
+        return [self.rows[index] for index in sorted(self.selected)]
+
+    def select_all(self):
+        self._select(set(range(len(self.rows))), self.focus)
+
+    def visible(self, margin=2):
+        """(row, Tk item) of the rows scrolled into view, plus `margin` rows on each side."""
+        first, last = self.tree.yview()
+        count = len(self.items)
+        begin = max(int(first * count) - margin, 0)
+        end = min(int(last * count + 0.999) + margin, count)
+        return [(self.rows[self.start + offset], self.items[offset]) for offset in range(begin, end)]
+
+    def _fill_pool(self):
+        """Size the pool to the rows and have every item show its row of the current window."""
+        wanted = min(self.pool_size, len(self.rows))
+        while len(self.items) < wanted:
+            self.items.append(self.tree.insert("", "end"))
+        if len(self.items) > wanted:
+            self.tree.delete(*self.items[wanted:])
+            del self.items[wanted:]
+        for offset, item in enumerate(self.items):
+            text, values, image = self.make_row(self.rows[self.start + offset])
+            self.tree.item(item, text=text, values=values, image=image or "")
+        self._show_selection()
+
+    def _show_selection(self):
+        end = self.start + len(self.items)
+        self.tree.selection_set([self.items[index - self.start] for index in self.selected if self.start <= index < end])
+        if self.focus is not None and self.start <= self.focus < end:
+            self.tree.focus(self.items[self.focus - self.start])
+
+    def _after_change(self, selection_changed):
+        self._on_yview(*self.tree.yview())  # The row count changed, so the scrollbar did too
+        if selection_changed and self.on_select is not None:
+            self.on_select()
+
+    def _select(self, selected, focus):
+        changed = selected != self.selected
+        self.selected = selected
+        self.focus = focus
+        self._show_selection()
+        if changed and self.on_select is not None:
+            self.on_select()
+
+    def _on_tree_select(self, event):
+        """Clicks and arrow keys select items; record them as rows, keeping selected rows that are not shown."""
+        offsets = {item: offset for offset, item in enumerate(self.items)}
+        end = self.start + len(self.items)
+        selected = {index for index in self.selected if not self.start <= index < end}
+        selected.update(self.start + offsets[item] for item in self.tree.selection() if item in offsets)
+        focus = self.tree.focus()
+        if focus in offsets:
+            self.focus = self.start + offsets[focus]
+        if selected != self.selected:
+            self.selected = selected
+            if self.on_select is not None:
+                self.on_select()
+
+    def _scroll_to(self, top):
+        """Put row `top` at the top of the view, moving the pool there if it is not around it already."""
+        count = len(self.items)
+        first, last = self.tree.yview()
+        shown = (last - first) * count
+        top = max(min(top, len(self.rows) - shown), 0)
+        margin = EDGE * count
+        if not (self.start + margin <= top and top + shown <= self.start + count - margin):
+            start = max(min(int(top - (count - shown) / 2), len(self.rows) - count), 0)
+            if start != self.start:
+                self.start = start
+                self._fill_pool()
+        self.tree.yview_moveto((top - self.start) / count)
+
+    def _jump(self, index):
+        """Home/End: select and show the first or last row."""
+        if self.rows:
+            self._scroll_to(index)
+            self._select({index}, index)
+        return "break"
+
+    def _on_scroll(self, *args):
+        """Scrollbar command: a drag is a position in the whole list; the arrows and the trough scroll the tree."""
+        if args[0] == "moveto" and self.items:
+            self._scroll_to(float(args[1]) * len(self.rows))
+        else:
+            self.tree.yview(*args)
+
+    def _on_yview(self, first, last):
+        first, last = float(first), float(last)
+        count = len(self.items)
+        near_end = last > 1 - EDGE and self.start + count < len(self.rows)
+        near_start = first < EDGE and self.start > 0
+        if near_end or near_start:
+            start = self.start
+            self._scroll_to(self.start + first * count)
+            if self.start != start:
+                return  # Moving the view calls this again with the new position
+        if self.scrollbar is not None:
+            total = len(self.rows)
+            if total:
+                self.scrollbar.set((self.start + first * count) / total, (self.start + last * count) / total)
+            else:
+                self.scrollbar.set(0.0, 1.0)
+        if self.on_view is not None:
+            self.on_view()
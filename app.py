@@ -1,56 +1,84 @@
 # main.py
+import time
+LAUNCHED = time.perf_counter()  # Before the imports, so the startup report includes them
 import tkinter as tk
 from tkinter import ttk
-from adb_manager import FileManagerPage, APKManagerPage, NetworkManagerPage, ToolsPage, TerminalPage
-from PIL import Image, ImageTk  # For loading PNG icons
-import os
+import adb_manager
+from adb_manager import DeviceSelector, TaskStatus, icon_cache, startup, ui
+
+# Tab name, label and page class; a page is imported and built when its tab is first selected
+PAGES = (
+    ("file_manager", "File Manager", "FileManagerPage"),
+    ("apk_manager", "APK Manager", "APKManagerPage"),
+    ("network_manager", "Network Manager", "NetworkManagerPage"),
+    ("tools", "Tools", "ToolsPage"),
+    ("terminal", "Terminal", "TerminalPage"),
+)
 
 class ADBApp(tk.Tk):
     def __init__(self):
         super().__init__()
+        ui.attach(self)  # Worker threads reach the widgets through this dispatcher
         self.title("ADB Manager")
         #self.geometry("800x600")  # Set a default window size
         style = ttk.Style()
         style.theme_use("clam")
 
         # Load PNG icons for tabs
-        self.icons = {
-            "file_manager": self.load_icon("file_manager.png", 30, 30),
-            "apk_manager": self.load_icon("apk_manager.png", 30, 30),
-            "network_manager": self.load_icon("network_manager.png", 30, 30),
-            "tools": self.load_icon("tools.png", 30, 30),
-            "terminal": self.load_icon("terminal.png", 30, 30),
-        }
+        with startup.phase("tab icons"):
+            self.icons = {name: icon_cache.get(name, 30) for name, _label, _page in PAGES}
+
+        # Device picker shared by all pages
+        with startup.phase("device selector"):
+            self.device_selector = DeviceSelector(self)
+            self.device_selector.pack(fill=tk.X, pady=5)
+            self.task_status = TaskStatus(self.device_selector)
+            self.task_status.pack(side=tk.RIGHT, padx=5)
 
         # Create a notebook (tabbed interface)
         self.pages = ttk.Notebook(self)
         self.pages.pack(fill=tk.BOTH, expand=True)
 
-        # Initialize all pages
-        self.file_manager_page = FileManagerPage(self.pages)
-        self.apk_manager_page = APKManagerPage(self.pages)
-        self.network_manager_page = NetworkManagerPage(self.pages)
-        self.tools_page = ToolsPage(self.pages)
-        self.terminal_page = TerminalPage(self.pages)
-
-        # Add pages to the notebook with icons and labels
-        self.pages.add(self.file_manager_page, text="File Manager", image=self.icons["file_manager"], compound=tk.LEFT)
-        self.pages.add(self.apk_manager_page, text="APK Manager", image=self.icons["apk_manager"], compound=tk.LEFT)
-        self.pages.add(self.network_manager_page, text="Network Manager", image=self.icons["network_manager"], compound=tk.LEFT)
-        self.pages.add(self.tools_page, text="Tools", image=self.icons["tools"], compound=tk.LEFT)
-        self.pages.add(self.terminal_page, text="Terminal", image=self.icons["terminal"], compound=tk.LEFT)
-
-    def load_icon(self, icon_name, width, height):
-        """Load and resize a PNG icon."""
-        try:
-            icon_path = os.path.join("icons", icon_name)  # Path to the icons folder
-            icon = Image.open(icon_path)
-            icon = icon.resize((width, height), Image.Resampling.LANCZOS)
-            return ImageTk.PhotoImage(icon)
-        except Exception as e:
-            print(f"Error loading icon {icon_name}: {e}")
+        # Add an empty frame per tab; the page is built into it on first selection
+        self.page_slots = {}  # Slot widget name -> (tab name, label, page class name)
+        self.built_pages = {}  # Tab name -> page
+        for name, label, page_class in PAGES:
+            slot = ttk.Frame(self.pages)
+            self.pages.add(slot, text=label, image=self.icons[name], compound=tk.LEFT)
+            self.page_slots[str(slot)] = (name, label, page_class)
+        self.pages.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+        self.after_idle(self.on_first_window)
+
+    def on_first_window(self):
+        startup.mark("first window")
+        self.build_page(self.pages.select())
+        startup.mark("first page ready")
+        startup.report()
+
+    def on_tab_changed(self, event=None):
+        self.build_page(self.pages.select())
+
+    def build_page(self, slot_name):
+        """Import and build the page behind a tab the first time it is shown."""
+        if slot_name not in self.page_slots:
             return None
+        name, label, page_class = self.page_slots[slot_name]
+        if name not in self.built_pages:
+            with startup.phase(f"{label} page"):
+                page = getattr(adb_manager, page_class)(self.nametowidget(slot_name))
+                page.pack(fill=tk.BOTH, expand=True)
+                self.built_pages[name] = page
+        return self.built_pages[name]
+
+    def page(self, name):
+        """The page of tab `name` (see PAGES), built now if it has not been shown yet."""
+        for slot_name, (tab_name, _label, _page) in self.page_slots.items():
+            if tab_name == name:
+                return self.build_page(slot_name)
+        raise KeyError(name)
 
 if __name__ == "__main__":
+    startup.begin(LAUNCHED)
     app = ADBApp()
     app.mainloop()
@@ -0,0 +1,22 @@
+import pytest
+
+from adb_manager.adb_client import AdbClient
+from adb_manager.fake_adb import FakeAdbServer, FakeDevice
+
+
+@pytest.fixture
+def device():
+    return FakeDevice("emulator-5554", model="Pixel 7")
+
+
+@pytest.fixture
+def server(device):
+    with FakeAdbServer([device]) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    client = AdbClient(port=server.port)
+    yield client
+    client.close_all()
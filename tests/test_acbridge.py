@@ -0,0 +1,52 @@
+import asyncio
+import posixpath
+import threading
+import time
+
+from adb_manager.acbridge import OUTPUTS, REMOTE_DIR, stat_outputs, wait_for_outputs
+from adb_manager.adb_client import AdbClient
+from adb_manager.fake_adb import FakeAdbServer, FakeDevice
+
+
+def device_with_outputs(mtime=1700000000):
+    device = FakeDevice("emulator-5554")
+    for name in OUTPUTS:
+        device.add_file(posixpath.join(REMOTE_DIR, name), b"old " + name.encode(), mtime=mtime)
+    return device
+
+
+def test_outputs_left_unchanged_are_ready_after_the_quiet_period():
+    device = device_with_outputs()
+    with FakeAdbServer([device]) as server:
+        client = AdbClient(port=server.port)
+        baseline = stat_outputs("emulator-5554", client)
+        started = time.monotonic()
+        outputs = asyncio.run(wait_for_outputs("emulator-5554", baseline, timeout=10, client=client, quiet=0.5))
+    assert outputs == baseline
+    assert time.monotonic() - started < 5
+
+
+def test_rewritten_outputs_are_ready_once_stable():
+    device = device_with_outputs()
+    with FakeAdbServer([device]) as server:
+        client = AdbClient(port=server.port)
+        baseline = stat_outputs("emulator-5554", client)
+
+        def export():
+            time.sleep(0.3)
+            for name in OUTPUTS:
+                device.add_file(posixpath.join(REMOTE_DIR, name), b"new " + name.encode(), mtime=1700000100)
+
+        writer = threading.Thread(target=export)
+        writer.start()
+        outputs = asyncio.run(wait_for_outputs("emulator-5554", baseline, timeout=10, client=client, quiet=60))
+        writer.join()
+    assert all(info.mtime == 1700000100 for info in outputs.values())
+
+
+def test_missing_outputs_time_out():
+    device = FakeDevice("emulator-5554")
+    with FakeAdbServer([device]) as server:
+        client = AdbClient(port=server.port)
+        baseline = stat_outputs("emulator-5554", client)
+        assert asyncio.run(wait_for_outputs("emulator-5554", baseline, timeout=0.5, client=client, quiet=0.1)) is None
@@ -0,0 +1,64 @@
+import stat
+
+import pytest
+
+from adb_manager.adb_client import AdbClient, AdbCommandError, AdbError
+from adb_manager.fake_adb import FakeAdbServer, FakeDevice
+
+
+def test_host_requests_over_the_smart_socket(client):
+    assert client.version() > 0
+    assert client.devices() == [("emulator-5554", "device")]
+    assert "shell_v2" in client.features("emulator-5554")
+
+
+def test_unknown_device_is_an_adb_error(client):
+    with pytest.raises(AdbError):
+        client.run("true", serial="emulator-9999")
+
+
+def test_shell_v2_keeps_stdout_stderr_and_exit_code(client):
+    result = client.run("echo hello; ls /nope", serial="emulator-5554")
+    assert result.stdout == "hello\n"
+    assert "No such file or directory" in result.stderr
+    assert result.returncode == 1
+    with pytest.raises(AdbCommandError):
+        client.check_call("false", serial="emulator-5554")
+
+
+def test_legacy_shell_recovers_the_exit_code():
+    device = FakeDevice("old-device", features=())
+    with FakeAdbServer([device]) as server:
+        client = AdbClient(port=server.port)
+        result = client.run("echo hello; false", serial="old-device")
+    assert result.stdout == "hello\n"
+    assert result.returncode == 1
+
+
+@pytest.mark.parametrize("features", [("stat_v2", "ls_v2"), ()])
+def test_sync_stat_list_recv_send(features):
+    device = FakeDevice("emulator-5554", features=features)
+    device.add_file("/sdcard/a.txt", b"alpha", mtime=1700000000)
+    device.add_dir("/sdcard/Music")
+    with FakeAdbServer([device]) as server:
+        client = AdbClient(port=server.port)
+        with client.sync("emulator-5554") as sync:
+            info = sync.stat("/sdcard/a.txt")
+            assert (info.size, info.mtime) == (5, 1700000000)
+            assert stat.S_ISREG(info.mode)
+            assert sync.stat("/sdcard/missing") is None
+
+            entries = {entry.name: entry for entry in sync.list("/sdcard")}
+            assert set(entries) == {"a.txt", "Music"}
+            assert stat.S_ISDIR(entries["Music"].mode)
+
+            chunks = []
+            assert sync.recv("/sdcard/a.txt", chunks.append) == 5
+            assert b"".join(chunks) == b"alpha"
+
+            data = bytes(range(256)) * 1000
+            assert sync.send("/sdcard/b.bin", [data], mtime=1700000100) == len(data)
+            assert sync.stat("/sdcard/b.bin").mtime == 1700000100
+            with pytest.raises(AdbError):
+                sync.recv("/sdcard/missing", chunks.append)
+    assert device.lookup("/sdcard/b.bin").data == data
@@ -0,0 +1,20 @@
+import asyncio
+import sys
+
+from adb_manager.aio import STREAM_CHUNK_SIZE, stream_process
+
+
+async def collect(code):
+    return [part async for part in stream_process([sys.executable, "-c", code])]
+
+
+def test_stream_process_splits_lines():
+    parts = asyncio.run(collect("print('one'); print('two', end='')"))
+    assert parts == ["one\n", "two"]
+
+
+def test_stream_process_survives_lines_longer_than_a_chunk():
+    length = STREAM_CHUNK_SIZE * 3
+    parts = asyncio.run(collect(f"print('x' * {length}); print('é' * 1000)"))
+    assert "".join(parts) == "x" * length + "\n" + "é" * 1000 + "\n"
+    assert all(len(part) < 2 * STREAM_CHUNK_SIZE for part in parts)
@@ -0,0 +1,23 @@
+import hashlib
+import os
+
+from adb_manager import dedup
+from adb_manager.dedup import ObjectStore
+from adb_manager.extract import MANIFEST_NAME, ExtractManifest, extract_apks
+
+
+def test_extract_hashes_each_pulled_apk_once(tmp_path, device, client, monkeypatch):
+    device.add_package("com.example.app", apks=(b"base apk", b"split apk"))
+    hashed = []
+    file_sha256 = dedup.file_sha256
+    monkeypatch.setattr(dedup, "file_sha256", lambda path: hashed.append(path) or file_sha256(path))
+    store = ObjectStore(str(tmp_path / ".objects"))
+    local_dir = str(tmp_path / "apks")
+
+    extracted, missing, _stats = extract_apks(["com.example.app"], local_dir, device.serial, client=client, store=store)
+    assert missing == []
+    assert sorted(hashed) == sorted(extracted["com.example.app"])
+
+    files = ExtractManifest.load(os.path.join(local_dir, MANIFEST_NAME)).packages["com.example.app"]["files"]
+    assert sorted(entry["sha256"] for entry in files) == sorted(
+        hashlib.sha256(data).hexdigest() for data in (b"base apk", b"split apk"))
@@ -0,0 +1,29 @@
+import hashlib
+import os
+
+from adb_manager.icons import ThumbnailCache
+
+
+def test_prepare_hashes_once_and_finds_the_resized_copy(tmp_path):
+    source_dir, cache_dir = tmp_path / "icons", tmp_path / "thumbnails"
+    source_dir.mkdir()
+    cache_dir.mkdir()
+    icon = b"not really a png"
+    (source_dir / "com.example.app.png").write_bytes(icon)
+    digest = hashlib.sha1(icon).hexdigest()
+    (cache_dir / f"{digest}-50.png").write_bytes(b"resized")
+
+    cache = ThumbnailCache(str(source_dir), str(cache_dir))
+    assert cache.has("com.example.app") and not cache.has("com.example.other")
+    assert cache.prepare("com.example.app") == (digest, os.path.join(str(cache_dir), f"{digest}-50.png"))
+    assert cache.prepare("com.example.other") is None
+    cache.save_index()
+
+    # A new process trusts the saved index while the icon's mtime and size are unchanged
+    mtime_ns = os.stat(source_dir / "com.example.app.png").st_mtime_ns
+    (source_dir / "com.example.app.png").write_bytes(b"edited, same len")
+    os.utime(source_dir / "com.example.app.png", ns=(mtime_ns, mtime_ns))
+    assert ThumbnailCache(str(source_dir), str(cache_dir)).prepare("com.example.app")[0] == digest
+    os.utime(source_dir / "com.example.app.png", ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+    assert ThumbnailCache(str(source_dir), str(cache_dir)).prepare("com.example.app")[0] == \
+        hashlib.sha1(b"edited, same len").hexdigest()
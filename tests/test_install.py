@@ -0,0 +1,71 @@
+import pytest
+
+from adb_manager import install
+from adb_manager.adb_client import AdbClient, AdbError
+from adb_manager.install import ApkFile, InstallJob, InstallProgress, install_with_retry
+from adb_manager.transfer import TransferCancelled, TransferControl
+
+APK = b"package=com.example.app\n" + b"x" * 200000
+
+
+class FlakyClient(AdbClient):
+    """Fails the first shell command that contains `fail`, and every one that contains `broken`."""
+
+    def __init__(self, fail="", broken=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fail = fail
+        self.broken = broken
+
+    def run(self, command, *args, **kwargs):
+        if self.fail and self.fail in command:
+            self.fail = ""
+            raise AdbError("connection reset", cmd=command)
+        if self.broken is not None and self.broken in command:
+            raise AdbError("device offline", cmd=command)
+        return super().run(command, *args, **kwargs)
+
+
+@pytest.fixture
+def job(tmp_path):
+    path = tmp_path / "app.apk"
+    path.write_bytes(APK)
+    return InstallJob("app.apk", [ApkFile(str(path))])
+
+
+def staged_files(device):
+    return [name for name in device.lookup("/data/local/tmp").children if name.startswith("adb-manager-")]
+
+
+def test_retry_does_not_count_the_pushed_bytes_twice(job, device, server, monkeypatch):
+    monkeypatch.setattr(install, "RETRY_DELAY", 0)
+    progress = InstallProgress()
+    progress.add(device.serial, job)
+
+    install_with_retry(job, device.serial, FlakyClient(fail="pm install", port=server.port), progress)
+    assert "com.example.app" in device.packages
+    assert progress.done_bytes == job.size
+    assert progress.percent == 100
+    assert staged_files(device) == []
+
+
+def test_cancel_stops_the_push_under_way(job, device, server):
+    progress, control = InstallProgress(), TransferControl()
+    progress.add(device.serial, job)
+    client = AdbClient(port=server.port)
+
+    def cancel_after_first_chunk(size):
+        InstallProgress.advance(progress, size)
+        control.cancel()
+
+    progress.advance = cancel_after_first_chunk
+    with pytest.raises(TransferCancelled):
+        install_with_retry(job, device.serial, client, progress, control=control)
+    assert "com.example.app" not in device.packages
+    assert progress.done_bytes == 0
+    assert staged_files(device) == []
+
+
+def test_failed_cleanup_keeps_the_install_error(job, device, server):
+    client = FlakyClient(fail="pm install", broken="rm -f", port=server.port)
+    with pytest.raises(AdbError, match="connection reset"):
+        install_with_retry(job, device.serial, client, attempts=1)
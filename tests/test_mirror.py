@@ -0,0 +1,58 @@
+import os
+import stat
+
+from adb_manager.adb_client import AdbClient
+from adb_manager.dedup import ObjectStore
+from adb_manager.fake_adb import FakeAdbServer, FakeDevice
+from adb_manager.mirror import MirrorManifest, manifest_path, mirror
+
+CONTENT = b"same photo on both devices" * 100
+
+
+def test_mirror_two_devices_keeps_each_devices_mtime(tmp_path):
+    device_a = FakeDevice("device-a")
+    device_a.add_file("/sdcard/DCIM/photo.jpg", CONTENT, mtime=1700000000)
+    device_b = FakeDevice("device-b")
+    device_b.add_file("/sdcard/DCIM/photo.jpg", CONTENT, mtime=1600000000)
+    store = ObjectStore(str(tmp_path / ".objects"))
+    local_a, local_b = str(tmp_path / "a"), str(tmp_path / "b")
+
+    with FakeAdbServer([device_a, device_b]) as server:
+        client = AdbClient(port=server.port)
+        mirror("/sdcard/DCIM", local_a, "device-a", client=client, store=store)
+        result = mirror("/sdcard/DCIM", local_b, "device-b", client=client, store=store)
+        assert result.dedup.linked_files == 1
+
+        photo_a, photo_b = os.path.join(local_a, "photo.jpg"), os.path.join(local_b, "photo.jpg")
+        assert os.path.samefile(photo_a, photo_b)
+        assert int(os.stat(photo_a).st_mtime) == 1700000000
+        assert not os.stat(photo_a).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+        manifest = MirrorManifest.load(manifest_path(local_b))
+        assert manifest.entries["/sdcard/DCIM/photo.jpg"][:2] == (len(CONTENT), 1600000000)
+
+        # Both devices re-sync as unchanged, whatever mtime the shared file has
+        assert mirror("/sdcard/DCIM", local_a, "device-a", client=client, store=store).unchanged == 1
+        assert mirror("/sdcard/DCIM", local_b, "device-b", client=client, store=store).unchanged == 1
+
+
+def test_mirror_replaces_a_changed_linked_file_without_touching_the_store(tmp_path):
+    device_a = FakeDevice("device-a")
+    device_a.add_file("/sdcard/notes.txt", CONTENT, mtime=1700000000)
+    device_b = FakeDevice("device-b")
+    device_b.add_file("/sdcard/notes.txt", CONTENT, mtime=1700000000)
+    store = ObjectStore(str(tmp_path / ".objects"))
+    local_a, local_b = str(tmp_path / "a"), str(tmp_path / "b")
+
+    with FakeAdbServer([device_a, device_b]) as server:
+        client = AdbClient(port=server.port)
+        mirror("/sdcard", local_a, "device-a", client=client, store=store)
+        mirror("/sdcard", local_b, "device-b", client=client, store=store)
+
+        device_b.add_file("/sdcard/notes.txt", b"edited on b", mtime=1700000100)
+        assert mirror("/sdcard", local_b, "device-b", client=client, store=store).transferred == 1
+
+    with open(os.path.join(local_b, "notes.txt"), "rb") as file:
+        assert file.read() == b"edited on b"
+    with open(os.path.join(local_a, "notes.txt"), "rb") as file:
+        assert file.read() == CONTENT
@@ -0,0 +1,88 @@
+import zipfile
+
+from adb_manager.devices import parse_getprop
+from adb_manager.install import collect_install_jobs
+from adb_manager.packages import INVENTORY_COMMAND, parse_inventory, parse_package_line
+from adb_manager.search_index import SearchIndex
+
+
+def test_parse_getprop_joins_multi_line_values():
+    output = ("[ro.product.model]: [Pixel 7]\n"
+              "[ro.build.fingerprint]: [google/panther\n"
+              "continued]\n"
+              "garbage line\n"
+              "[empty.prop]: []\n")
+    assert parse_getprop(output) == {
+        "ro.product.model": "Pixel 7",
+        "ro.build.fingerprint": "google/panther\ncontinued",
+        "empty.prop": "",
+    }
+
+
+def test_parse_package_line_splits_the_path_at_the_last_equals_sign():
+    record = parse_package_line("package:/data/app/~~Ab1==/com.example-Zx==/base.apk=com.example "
+                                "versionCode:42 uid:10123 installer=com.android.vending")
+    assert record == {"name": "com.example", "path": "/data/app/~~Ab1==/com.example-Zx==/base.apk",
+                      "version_code": 42, "uid": 10123, "installer": "com.android.vending"}
+    assert parse_package_line("package:com.example installer=null")["installer"] == ""
+    assert parse_package_line("not a package line") is None
+
+
+def test_parse_inventory_from_the_device(device, client):
+    device.add_package("com.example.camera", version_code=7, version_name="7.0", installer="com.android.vending",
+                       size=4096)
+    device.add_package("com.android.settings", system=True, enabled=False)
+    table = parse_inventory(client.run(INVENTORY_COMMAND, serial="emulator-5554").stdout)
+
+    assert table.names == ["com.android.settings", "com.example.camera"]
+    assert table.get("com.example.camera", "version_code") == 7
+    assert table.get("com.example.camera", "version_name") == "7.0"
+    assert table.get("com.example.camera", "installer") == "com.android.vending"
+    assert table.get("com.example.camera", "enabled")
+    assert not table.get("com.android.settings", "enabled")
+    assert table.get("com.android.settings", "system")
+
+
+def test_search_index_ranks_exact_prefix_word_substring_then_fuzzy():
+    rows = ["whatsapp business", "com.whatsapp", "whatsapp", "not whatsapp", "w-h-a-t-s-app", "camera"]
+    index = SearchIndex(rows)
+    assert index.search("whatsapp") == ["whatsapp", "whatsapp business", "com.whatsapp", "not whatsapp",
+                                        "w-h-a-t-s-app"]
+    # Fuzzy: the letters in order, but not spread over more than FUZZY_MAX_SPREAD times the query
+    assert index.search("wapp") == ["whatsapp", "whatsapp business", "com.whatsapp", "not whatsapp"]
+    assert index.search("") == rows
+    assert index.search("zzz") == []
+
+
+def test_search_index_narrows_as_the_query_grows():
+    # Equal matches rank the shorter text first
+    index = SearchIndex([("Camera", "com.android.camera"), ("Calendar", "com.android.calendar")],
+                        fields=lambda row: row)
+    assert index.search("ca") == [("Camera", "com.android.camera"), ("Calendar", "com.android.calendar")]
+    assert index.search("cam") == [("Camera", "com.android.camera")]
+
+
+def test_collect_install_jobs_detects_bundles_and_split_folders(tmp_path):
+    (tmp_path / "single.apk").write_bytes(b"apk")
+    with zipfile.ZipFile(tmp_path / "app.apks", "w") as archive:
+        archive.writestr("splits/base-master.apk", b"base")
+        archive.writestr("splits/base-arm64_v8a.apk", b"abi")
+        archive.writestr("standalones/standalone.apk", b"ignored")
+        archive.writestr("toc.pb", b"")
+    with zipfile.ZipFile(tmp_path / "app.xapk", "w") as archive:
+        archive.writestr("config.en.apk", b"lang")
+        archive.writestr("com.example.apk", b"base")
+        archive.writestr("manifest.json", b"{}")
+    splits = tmp_path / "split-app"
+    splits.mkdir()
+    (splits / "base.apk").write_bytes(b"base")
+    (splits / "split_config.xxhdpi.apk").write_bytes(b"dpi")
+    (tmp_path / "readme.txt").write_text("not an apk")
+
+    jobs = {job.name: [apk.name for apk in job.apks] for job in collect_install_jobs([str(tmp_path)])}
+    assert jobs == {
+        "app.apks": ["base-arm64_v8a.apk", "base-master.apk"],
+        "app.xapk": ["com.example.apk", "config.en.apk"],
+        "single.apk": ["single.apk"],
+        "split-app": ["base.apk", "split_config.xxhdpi.apk"],
+    }
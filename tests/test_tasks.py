@@ -0,0 +1,28 @@
+from adb_manager.tasks import DONE, FAILED, TaskExecutor
+
+
+def fail():
+    raise ValueError("no such package")
+
+
+def test_unhandled_errors_reach_the_error_callback():
+    executor = TaskExecutor(max_workers=1)
+    errors = []
+    task = executor.submit(fail, name="Uninstall", on_error=errors.append)
+    assert task.wait(5)
+    assert task.state == FAILED
+    assert [str(error) for error in errors] == ["no such package"]
+
+
+def test_a_failing_error_callback_does_not_stop_the_worker(capsys):
+    executor = TaskExecutor(max_workers=1)
+    executor.submit(fail, name="Uninstall", on_error=lambda error: 1 / 0).wait(5)
+    assert "reporting it failed too" in capsys.readouterr().out
+    task = executor.submit(lambda: "listed", name="List packages")
+    assert task.wait(5) and task.state == DONE and task.result == "listed"
+
+
+def test_without_a_window_errors_are_printed(capsys):
+    executor = TaskExecutor(max_workers=1)
+    executor.submit(fail, name="Uninstall").wait(5)
+    assert "Task 'Uninstall' failed: no such package" in capsys.readouterr().out
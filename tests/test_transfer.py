@@ -0,0 +1,37 @@
+import os
+
+from adb_manager.transfer import RemoteFile, TransferProgress, part_path, pull_file
+
+DATA = os.urandom(300 * 1024)
+
+
+def test_pull_file_resumes_a_matching_part_file(device, client, tmp_path):
+    device.add_file("/sdcard/video.mp4", DATA, mtime=1700000000)
+    remote_file = RemoteFile("/sdcard/video.mp4", str(tmp_path / "video.mp4"), len(DATA), 1700000000)
+    partial = part_path(remote_file.local_path, remote_file.size, remote_file.mtime)
+    with open(partial, "wb") as file:
+        file.write(DATA[:100000])
+
+    progress = TransferProgress()
+    progress.add_total(len(DATA), 1)
+    with client.sync("emulator-5554") as sync:
+        pull_file(sync, remote_file, progress, resume=True, client=client, serial="emulator-5554")
+
+    with open(remote_file.local_path, "rb") as file:
+        assert file.read() == DATA
+    assert int(os.path.getmtime(remote_file.local_path)) == 1700000000
+    assert not os.path.exists(partial)
+    assert progress.done_bytes == len(DATA)
+
+
+def test_pull_file_starts_over_when_the_part_file_is_too_long(device, client, tmp_path):
+    device.add_file("/sdcard/notes.txt", b"short", mtime=1700000000)
+    remote_file = RemoteFile("/sdcard/notes.txt", str(tmp_path / "notes.txt"), 5, 1700000000)
+    with open(part_path(remote_file.local_path, 5, 1700000000), "wb") as file:
+        file.write(b"much longer than the remote file")
+
+    with client.sync("emulator-5554") as sync:
+        pull_file(sync, remote_file, client=client, serial="emulator-5554")
+
+    with open(remote_file.local_path, "rb") as file:
+        assert file.read() == b"short"
@@ -0,0 +1,46 @@
+import pytest
+
+tk = pytest.importorskip("tkinter")
+from tkinter import ttk
+
+from adb_manager.virtual_tree import POOL_SIZE, VirtualTreeview
+
+
+@pytest.fixture
+def tree():
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        pytest.skip(f"no display: {e}")
+    root.withdraw()
+    yield ttk.Treeview(root)
+    root.destroy()
+
+
+def make_row(row):
+    return f"row {row[0]}", (), None
+
+
+def test_pool_stays_fixed_whatever_is_scrolled_to_or_selected(tree):
+    rows = [(index,) for index in range(10000)]
+    view = VirtualTreeview(tree, make_row)
+    view.set_rows(rows)
+    assert len(tree.get_children()) == POOL_SIZE
+
+    view.select_all()
+    view._jump(len(rows) - 1)
+    tree.update()
+    children = tree.get_children()
+    assert len(children) == POOL_SIZE
+    assert tree.item(children[-1], "text") == "row 9999"
+    assert view.selected_rows() == [rows[-1]]
+
+
+def test_selection_follows_rows_through_reorder(tree):
+    rows = [(index,) for index in range(1000)]
+    view = VirtualTreeview(tree, make_row)
+    view.set_rows(rows)
+    view.select_all()
+    view.reorder(rows[::-2])
+    assert len(view.selected_rows()) == 500
+    assert view.selected_rows()[0] == (999,)